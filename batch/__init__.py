@@ -0,0 +1,2 @@
+from .io import read_profiles, normalize_profile, open_writer, CheckpointLog
+from .runner import BatchRunner, ProgressBar
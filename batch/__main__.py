@@ -0,0 +1,118 @@
+"""
+Command line entry point for batch plan generation.
+
+Usage:
+    python -m batch profiles.csv plans.jsonl [--concurrency 8] [--restart]
+    python -m batch profiles.csv --validate-only [--errors invalid.jsonl]
+"""
+import argparse
+import logging
+import os
+import sys
+from dotenv import load_dotenv
+from config import AppConfig
+from utils import setup_logging
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m batch",
+        description="Generate fitness and nutrition plans for every profile in a CSV or JSONL file."
+    )
+    parser.add_argument("input", help="CSV (with header) or JSONL file of user profiles")
+    parser.add_argument("output", nargs="?", help="JSONL file, or a directory ending in .parquet for Parquet part files")
+    parser.add_argument("--errors", help="JSONL file for rows that failed (default: <output>.errors.jsonl)")
+    parser.add_argument("--validate-only", action="store_true",
+                        help="Only validate the profiles and write the invalid rows to the error file")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="Output format (default: from the output name)")
+    parser.add_argument("--concurrency", type=int, help="Plans generated at the same time (default: API_MAX_CONCURRENCY)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and overwrite earlier output")
+    parser.add_argument("--no-progress", action="store_true", help="Do not show the progress bar")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    load_dotenv()
+    config = AppConfig()
+    setup_logging(
+        config.LOG_DIR,
+        level=config.LOG_LEVEL,
+        console=False,
+        max_bytes=config.LOG_MAX_BYTES,
+        rotate_hours=config.LOG_ROTATE_HOURS,
+        backup_count=config.LOG_BACKUP_COUNT,
+        json_format=config.LOG_FORMAT == "json",
+        debug_sample_rate=config.LOG_DEBUG_SAMPLE_RATE
+    )
+    logger = logging.getLogger("batch")
+
+    if args.validate_only:
+        from batch.runner import validate_file
+        summary = validate_file(args.input, args.errors or f"{args.input}.errors.jsonl")
+        print(f"Invalid {summary['invalid']} of {summary['total']} rows", file=sys.stderr)
+        return 0 if summary["invalid"] == 0 else 2
+    if not args.output:
+        print("An output path is required unless --validate-only is given", file=sys.stderr)
+        return 1
+
+    api_key = os.getenv("ANTHROPIC_KEY")
+    if not api_key:
+        print("ANTHROPIC_KEY is not set", file=sys.stderr)
+        return 1
+
+    # Imported late so logging is configured first
+    from data import load_exercise_data, load_food_table
+    from models import AnthropicService, PlanGenerator
+    from batch.runner import BatchRunner
+
+    concurrency = args.concurrency or config.API_MAX_CONCURRENCY
+    ai_service = AnthropicService(
+        api_key=api_key,
+        model=config.AI_MODEL,
+        max_retries=config.API_MAX_RETRIES,
+        timeout=config.API_TIMEOUT,
+        max_concurrency=config.API_MAX_CONCURRENCY
+    )
+    planner = PlanGenerator(
+        load_exercise_data(config.DATASET_PATH),
+        workout_mode=config.WORKOUT_GENERATION_MODE,
+        food_data=load_food_table(config.FOOD_TABLE_PATH),
+        nutrition_mode=config.NUTRITION_GENERATION_MODE,
+        # Each plan runs its workout and nutrition stages side by side
+        max_workers=max(config.PLAN_WORKERS, concurrency * 2)
+    )
+
+    runner = BatchRunner(planner, ai_service, concurrency=concurrency)
+    if config.TRACING_ENABLED:
+        from utils import enable_tracing
+        enable_tracing()
+    if config.PROFILE_NEXT_PLANS:
+        from utils import plan_profiler
+        plan_profiler.arm(config.PROFILE_NEXT_PLANS, config.LOG_DIR, config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+    if config.METRICS_PORT:
+        from utils import start_metrics_server
+        start_metrics_server(config.METRICS_PORT, config.METRICS_HOST)
+    try:
+        summary = runner.run(
+            args.input, args.output, args.errors, args.format,
+            restart=args.restart, progress=not args.no_progress
+        )
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume.", file=sys.stderr)
+        return 130
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    logger.info(f"Batch summary: {summary}")
+    if config.TRACING_ENABLED:
+        from utils import export_chrome_trace
+        export_chrome_trace(config.LOG_DIR)
+    print(
+        f"Generated {summary['generated']}, invalid {summary['invalid']}, failed {summary['failed']}, "
+        f"skipped {summary['skipped']} of {summary['total']} rows",
+        file=sys.stderr
+    )
+    return 0 if summary["failed"] == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Streaming input and output for batch plan generation.
+Profiles are read one row at a time and results are appended as they
+complete, so memory use does not grow with the size of the cohort.
+"""
+import csv
+import json
+import logging
+from pathlib import Path
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Form defaults used when a profile leaves a choice out
+DEFAULT_USER_INFO = {
+    "activity_level": "Sedentary",
+    "location": "Mumbai",
+    "diet_preference": "Non-Vegetarian",
+    "food_type": "Maharashtrian",
+}
+
+# Numeric fields and the type they are converted to
+NUMERIC_FIELDS = {
+    "height_cm": float,
+    "height_ft": int,
+    "height_inch": int,
+    "weight": float,
+    "goal_weight": float,
+    "time_frame": int,
+    "age": int,
+    "time_constraint": int,
+}
+
+# Rows per Parquet part file
+PARQUET_ROWS_PER_PART = 1000
+
+def count_rows(path):
+    """
+    Count the profiles in an input file without loading it.
+
+    Args:
+        path (str): CSV or JSONL file
+
+    Returns:
+        int: Number of profiles
+    """
+    with open(path, encoding="utf-8") as f:
+        lines = sum(1 for line in f if line.strip())
+    return max(lines - 1, 0) if Path(path).suffix.lower() == ".csv" else lines
+
+def read_profiles(path):
+    """
+    Stream profiles from a CSV or JSONL file.
+
+    Args:
+        path (str): CSV file with a header row, or JSONL with one object per line
+
+    Yields:
+        tuple: (row_index, record) where record is the raw dict, or None for
+            a line that is not valid JSON
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if Path(path).suffix.lower() == ".csv":
+            for index, record in enumerate(csv.DictReader(f)):
+                yield index, record
+        else:
+            index = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                yield index, record
+                index += 1
+
+def normalize_profile(record):
+    """
+    Turn a raw input record into the user info the planner expects.
+
+    Values that cannot be converted are passed through unchanged, so that
+    validation reports them.
+
+    Args:
+        record (dict): Raw profile from the input file
+
+    Returns:
+        dict: User information in the shape returned by the sidebar form
+    """
+    user_info = dict(DEFAULT_USER_INFO)
+    for key, value in record.items():
+        if value is None or value == "":
+            continue
+        if key in NUMERIC_FIELDS:
+            try:
+                value = NUMERIC_FIELDS[key](float(value))
+            except (TypeError, ValueError):
+                pass
+        user_info[key] = value.strip() if isinstance(value, str) else value
+
+    if "height_cm" not in user_info and "height_ft" in user_info:
+        try:
+            user_info["height_cm"] = user_info["height_ft"] * 30.48 + user_info.get("height_inch", 0) * 2.54
+        except TypeError:
+            pass
+    return user_info
+
+class CheckpointLog:
+    """Append-only log of the input rows that are finished."""
+
+    def __init__(self, path):
+        """
+        Initialize the checkpoint.
+
+        Args:
+            path (str): Checkpoint file, one row index per line
+        """
+        self.path = Path(path)
+        self.file = None
+
+    def load(self):
+        """
+        Read the rows finished by earlier runs.
+
+        Returns:
+            set: Finished row indices
+        """
+        if not self.path.exists():
+            return set()
+        done = set()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                # A torn last line from a crash is simply not counted
+                if line.strip().isdigit():
+                    done.add(int(line))
+        return done
+
+    def open(self, restart=False):
+        """Open the log for appending, or truncate it when restarting."""
+        self.file = open(self.path, "w" if restart else "a", encoding="utf-8")
+
+    def mark(self, rows):
+        """
+        Record rows as finished.
+
+        Args:
+            rows (iterable): Row indices whose results are safely written
+        """
+        for row in rows:
+            self.file.write(f"{row}\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+class JsonlWriter:
+    """Appends one JSON object per line and flushes after every record."""
+
+    def __init__(self, path, restart=False):
+        """
+        Open the output file.
+
+        Args:
+            path (str): Output file
+            restart (bool): Truncate instead of appending
+        """
+        self.file = open(path, "w" if restart else "a", encoding="utf-8")
+
+    def write(self, record):
+        """
+        Write a record.
+
+        Args:
+            record (dict): Result record with a "row" key
+
+        Returns:
+            list: Row indices now durably written
+        """
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        return [record["row"]]
+
+    def close(self):
+        """
+        Close the file.
+
+        Returns:
+            list: Row indices written on close (always none for JSONL)
+        """
+        self.file.close()
+        return []
+
+class ParquetWriter:
+    """
+    Buffers records and writes them as numbered Parquet part files.
+
+    A part file is complete once written, so a crash loses at most the
+    records still in the buffer, which are redone on resume.
+    """
+
+    def __init__(self, path, restart=False, rows_per_part=PARQUET_ROWS_PER_PART):
+        """
+        Prepare the output directory.
+
+        Args:
+            path (str): Output directory for the part files
+            restart (bool): Remove existing part files first
+            rows_per_part (int): Records per part file
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError(f"Parquet output requires a working pyarrow installation: {e}") from e
+
+        self.directory = Path(path)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if restart:
+            for part in self.directory.glob("part-*.parquet"):
+                part.unlink()
+        self.part = len(list(self.directory.glob("part-*.parquet")))
+        self.rows_per_part = rows_per_part
+        self.buffer = []
+
+    def write(self, record):
+        """
+        Buffer a record and write a part file when the buffer is full.
+
+        Args:
+            record (dict): Result record with a "row" key
+
+        Returns:
+            list: Row indices now durably written
+        """
+        self.buffer.append(record)
+        if len(self.buffer) >= self.rows_per_part:
+            return self._flush()
+        return []
+
+    def _flush(self):
+        if not self.buffer:
+            return []
+        # Plans vary in shape, so they are stored as JSON text
+        frame = pd.DataFrame([
+            {**{k: v for k, v in record.items() if k != "plan"},
+             "user_id": str(record.get("user_id")),
+             "plan": json.dumps(record.get("plan"), ensure_ascii=False)}
+            for record in self.buffer
+        ])
+        frame.to_parquet(self.directory / f"part-{self.part:05d}.parquet", index=False)
+        self.part += 1
+        rows = [record["row"] for record in self.buffer]
+        self.buffer = []
+        return rows
+
+    def close(self):
+        """
+        Write the remaining buffered records.
+
+        Returns:
+            list: Row indices written on close
+        """
+        return self._flush()
+
+def open_writer(path, output_format=None, restart=False):
+    """
+    Open a result writer for the output path.
+
+    Args:
+        path (str): Output file (JSONL) or directory (Parquet)
+        output_format (str, optional): "jsonl" or "parquet", inferred from the
+            extension when omitted
+        restart (bool): Discard earlier output
+
+    Returns:
+        JsonlWriter or ParquetWriter: Writer instance
+    """
+    output_format = output_format or ("parquet" if str(path).endswith(".parquet") else "jsonl")
+    if output_format == "parquet":
+        return ParquetWriter(path, restart)
+    return JsonlWriter(path, restart)
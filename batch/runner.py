@@ -0,0 +1,267 @@
+"""
+Batch plan generation for a cohort of user profiles.
+Runs the planner with bounded concurrency, writes results as they finish
+and resumes from the checkpoint of an interrupted run.
+"""
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+import pandas as pd
+from batch.io import CheckpointLog, count_rows, normalize_profile, open_writer, read_profiles
+from models import check_request, preflight_stats
+from utils import BulkValidator
+
+logger = logging.getLogger(__name__)
+
+# Rows validated together as one column batch
+VALIDATION_CHUNK_ROWS = 1000
+
+def read_validated(input_path, skip=(), chunk_rows=VALIDATION_CHUNK_ROWS):
+    """
+    Stream profiles with their validation errors, validating in column batches.
+
+    Args:
+        input_path (str): CSV or JSONL file of profiles
+        skip (set): Row indices to leave out
+        chunk_rows (int): Rows validated together
+
+    Yields:
+        tuple: (row, user_info or None, errors) for every row not skipped
+    """
+    def validate_chunk(chunk):
+        profiles = [(row, normalize_profile(record)) for row, record in chunk if record is not None]
+        frame = pd.DataFrame([user_info for _, user_info in profiles], index=[row for row, _ in profiles])
+        _, messages = BulkValidator.validate(frame) if profiles else (None, {})
+        profiles = dict(profiles)
+        for row, record in chunk:
+            if record is None:
+                yield row, None, ["Row is not valid JSON"]
+            else:
+                yield row, profiles[row], messages.get(row, [])
+
+    chunk = []
+    for row, record in read_profiles(input_path):
+        if row in skip:
+            continue
+        chunk.append((row, record))
+        if len(chunk) >= chunk_rows:
+            yield from validate_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield from validate_chunk(chunk)
+
+def validate_file(input_path, errors_path):
+    """
+    Validate every profile in a file without generating plans.
+
+    Args:
+        input_path (str): CSV or JSONL file of profiles
+        errors_path (str): JSONL file for the rows that fail
+
+    Returns:
+        dict: Counts of total and invalid rows
+    """
+    summary = {"total": 0, "invalid": 0}
+    with open(errors_path, "w", encoding="utf-8") as error_file:
+        for row, user_info, errors in read_validated(input_path):
+            summary["total"] += 1
+            if errors:
+                summary["invalid"] += 1
+                error_file.write(json.dumps({
+                    "row": row, "user_id": (user_info or {}).get("user_id", row),
+                    "stage": "validation", "errors": errors,
+                }, ensure_ascii=False) + "\n")
+    logger.info(f"Validated {input_path}: {summary}")
+    return summary
+
+class ProgressBar:
+    """Single-line progress bar with throughput and ETA on stderr."""
+
+    def __init__(self, total, already_done=0, width=30, stream=None):
+        """
+        Initialize the progress bar.
+
+        Args:
+            total (int): Total number of rows
+            already_done (int): Rows finished by earlier runs
+            width (int): Bar width in characters
+            stream (file, optional): Output stream, stderr by default
+        """
+        self.total = total
+        self.done = already_done
+        self.failed = 0
+        self.width = width
+        self.stream = stream or sys.stderr
+        self.start_done = already_done
+        self.start_time = time.time()
+
+    def update(self, failed=False):
+        """Count one processed row and redraw."""
+        self.done += 1
+        self.failed += int(failed)
+        self.draw()
+
+    def draw(self):
+        elapsed = max(time.time() - self.start_time, 1e-9)
+        rate = (self.done - self.start_done) / elapsed
+        fraction = self.done / self.total if self.total else 1
+        filled = int(self.width * fraction)
+        eta = (self.total - self.done) / rate if rate > 0 else 0
+        hours, rest = divmod(int(eta), 3600)
+        self.stream.write(
+            f"\r[{'#' * filled}{'.' * (self.width - filled)}] {self.done}/{self.total} "
+            f"{fraction:6.1%}  {rate:.2f} rows/s  ETA {hours:02d}:{rest // 60:02d}:{rest % 60:02d}"
+            f"  errors {self.failed}"
+        )
+        self.stream.flush()
+
+    def close(self):
+        self.stream.write("\n")
+        self.stream.flush()
+
+class BatchRunner:
+    """Generates plans for many profiles with bounded concurrency."""
+
+    def __init__(self, planner, ai_service, concurrency=4, max_pending=None):
+        """
+        Initialize the runner.
+
+        Args:
+            planner (PlanGenerator): Planner shared by all rows
+            ai_service (AnthropicService): Service for AI interactions
+            concurrency (int): Plans generated at the same time
+            max_pending (int, optional): Rows read ahead of the writer, twice the
+                concurrency by default; reading pauses when this many are in flight
+        """
+        self.planner = planner
+        self.ai_service = ai_service
+        self.concurrency = concurrency
+        self.max_pending = max_pending or concurrency * 2
+
+    def validate(self, user_info):
+        """
+        Run the pre-flight safety checks for one profile that passed bulk
+        validation.
+
+        Args:
+            user_info (dict): Normalized, validated profile
+
+        Returns:
+            dict: Pre-flight result with "passed" and "reasons"
+        """
+        result = check_request(user_info, validated=True)
+        preflight_stats.record(not result["passed"], self.planner.expected_api_calls())
+        return result
+
+    def generate(self, user_info, preflight=None):
+        """
+        Generate the plan for one profile.
+
+        Args:
+            user_info (dict): Validated profile
+            preflight (dict, optional): Passing pre-flight result from validate
+
+        Returns:
+            tuple: (plan or error dict, seconds taken)
+        """
+        start = time.time()
+        plan = self.planner.generate_plan(user_info, self.ai_service, preflight)
+        return plan, time.time() - start
+
+    def run(self, input_path, output_path, errors_path=None, output_format=None, restart=False, progress=True):
+        """
+        Generate plans for every profile in the input file.
+
+        Rows that fail validation are written to the error file and
+        checkpointed; rows whose generation fails are written to the error
+        file but not checkpointed, so a resumed run retries them.
+
+        Args:
+            input_path (str): CSV or JSONL file of profiles
+            output_path (str): JSONL file or Parquet directory for the plans
+            errors_path (str, optional): JSONL error file, next to the output by default
+            output_format (str, optional): "jsonl" or "parquet"
+            restart (bool): Ignore the checkpoint and start over
+            progress (bool): Show the progress bar
+
+        Returns:
+            dict: Counts of generated, invalid, failed and skipped rows
+        """
+        errors_path = errors_path or f"{output_path}.errors.jsonl"
+        checkpoint = CheckpointLog(f"{output_path}.checkpoint")
+        done = set() if restart else checkpoint.load()
+        if done:
+            logger.info(f"Resuming: {len(done)} rows already finished")
+
+        total = count_rows(input_path)
+        summary = {"total": total, "generated": 0, "invalid": 0, "failed": 0, "skipped": len(done)}
+        bar = ProgressBar(total, len(done)) if progress else None
+
+        writer = open_writer(output_path, output_format, restart)
+        checkpoint.open(restart)
+        with open(errors_path, "w" if restart else "a", encoding="utf-8") as error_file:
+
+            def write_error(row, user_id, stage, errors):
+                error_file.write(json.dumps({
+                    "row": row, "user_id": user_id, "stage": stage, "errors": errors,
+                    "at": datetime.now().isoformat(timespec="seconds"),
+                }, ensure_ascii=False) + "\n")
+                error_file.flush()
+
+            def collect(futures):
+                for future in futures:
+                    row, user_id = pending.pop(future)
+                    try:
+                        plan, elapsed = future.result()
+                    except Exception as e:
+                        logger.error(f"Row {row} failed: {e}", exc_info=True)
+                        plan, elapsed = {"error": str(e)}, 0
+
+                    if "error" in plan:
+                        summary["failed"] += 1
+                        write_error(row, user_id, "generation", [plan["error"]])
+                    else:
+                        summary["generated"] += 1
+                        checkpoint.mark(writer.write({
+                            "row": row, "user_id": user_id,
+                            "elapsed_s": round(elapsed, 3), "plan": plan,
+                        }))
+                    if bar:
+                        bar.update(failed="error" in plan)
+
+            pending = {}
+            try:
+                with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor:
+                    for row, user_info, errors in read_validated(input_path, done):
+                        user_id = None if user_info is None else user_info.get("user_id", row)
+                        preflight = None
+                        if not errors:
+                            preflight = self.validate(user_info)
+                            errors = [reason["message"] for reason in preflight["reasons"]]
+
+                        if errors:
+                            summary["invalid"] += 1
+                            write_error(row, user_id, "validation", errors)
+                            checkpoint.mark([row])
+                            if bar:
+                                bar.update(failed=True)
+                            continue
+
+                        # Backpressure: stop reading until a slot frees up
+                        while len(pending) >= self.max_pending:
+                            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            collect(finished)
+                        pending[executor.submit(self.generate, user_info, preflight)] = (row, user_id)
+
+                    collect(list(wait(pending).done))
+            finally:
+                checkpoint.mark(writer.close())
+                checkpoint.close()
+                if bar:
+                    bar.close()
+
+        logger.info(f"Batch finished: {summary}; pre-flight: {preflight_stats.summary()}")
+        return summary
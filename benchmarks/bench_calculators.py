@@ -0,0 +1,86 @@
+"""
+Benchmark the batch FitnessCalculator methods against the scalar ones.
+
+Usage:
+    python -m benchmarks.bench_calculators [--rows 100000]
+"""
+import argparse
+import logging
+import time
+import numpy as np
+import pandas as pd
+from utils import FitnessCalculator
+
+ACTIVITY_LEVELS = ["Sedentary", "Lightly active", "Moderately active", "Very active", "Extra active"]
+
+def make_cohort(rows, seed=0):
+    """
+    Build a random cohort of profiles.
+
+    Args:
+        rows (int): Number of profiles
+        seed (int): Random seed
+
+    Returns:
+        DataFrame: Profiles with the columns the calculator needs
+    """
+    rng = np.random.default_rng(seed)
+    weight = rng.uniform(45, 150, rows).round(1)
+    return pd.DataFrame({
+        "weight": weight,
+        "goal_weight": (weight - rng.uniform(-2, 20, rows)).round(1),
+        "height_cm": rng.uniform(145, 200, rows).round(1),
+        "age": rng.integers(18, 80, rows),
+        "gender": rng.choice(["Male", "Female"], rows),
+        "activity_level": rng.choice(ACTIVITY_LEVELS, rows),
+        "time_frame": rng.integers(4, 31, rows),
+    })
+
+def scalar_metrics(calculator, cohort):
+    """Compute the cohort metrics one row at a time with the scalar methods."""
+    rows = []
+    for weight, goal, height, age, gender, activity, weeks in zip(
+        cohort["weight"], cohort["goal_weight"], cohort["height_cm"], cohort["age"],
+        cohort["gender"], cohort["activity_level"], cohort["time_frame"]
+    ):
+        bmi = calculator.calculate_bmi(weight, height)
+        bmr = calculator.calculate_bmr(weight, height, age, gender)
+        rows.append({
+            "bmi": bmi,
+            "bmi_category": calculator.get_bmi_category(bmi),
+            "bmr": bmr,
+            "tdee": calculator.calculate_tdee(bmr, activity),
+            **calculator.calculate_weight_loss_calories(weight, goal, weeks),
+        })
+    return pd.DataFrame(rows, index=cohort.index)
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="Cohort size (default: 100000)")
+    args = parser.parse_args(argv)
+    # The scalar path warns once per row without a loss goal, which would dominate its timing
+    logging.disable(logging.WARNING)
+
+    calculator = FitnessCalculator()
+    cohort = make_cohort(args.rows)
+
+    scalar, scalar_time = timed(scalar_metrics, calculator, cohort)
+    batch, batch_time = timed(calculator.calculate_cohort_metrics, cohort)
+
+    numeric = scalar.columns.drop("bmi_category")
+    max_diff = float(np.abs(scalar[numeric].to_numpy() - batch[numeric].to_numpy()).max())
+    categories_match = bool((scalar["bmi_category"] == batch["bmi_category"]).all())
+
+    print(f"Rows:            {args.rows:,}")
+    print(f"Scalar loop:     {scalar_time:8.3f} s")
+    print(f"Batch:           {batch_time:8.3f} s")
+    print(f"Speedup:         {scalar_time / batch_time:8.1f}x")
+    print(f"Max difference:  {max_diff:.4f} (categories match: {categories_match})")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import hashlib
 import json
 from datetime import datetime
-from constants import workout_prompt, nutrition_plan
+from constants import (workout_prompt, nutrition_plan, workout_coaching_prompt,
+                       workout_day_prompt, meal_prompt, workout_ids_prompt,
+                       workout_day_ids_prompt)
+from utils import traced
 import logging
 
 
@@ -17,6 +21,14 @@ class PromptManager:
                 },
                 "current": "v1"  # Points to the version that should be used
             },
+            "workout_ids": {
+                "v1": {
+                    "created": "2026-10-18",
+                    "description": "Workout plan referencing exercises by catalog id",
+                    "template": workout_ids_prompt
+                },
+                "current": "v1"  # Points to the version that should be used
+            },
             "nutrition_plan": {
                 "v1": {
                     "created": "2025-03-01",
@@ -24,6 +36,38 @@ class PromptManager:
                     "template": nutrition_plan
                 },
                 "current": "v1"  # Points to the version that should be used
+            },
+            "workout_coaching": {
+                "v1": {
+                    "created": "2026-10-18",
+                    "description": "Coaching text for a locally built workout plan",
+                    "template": workout_coaching_prompt
+                },
+                "current": "v1"  # Points to the version that should be used
+            },
+            "workout_day": {
+                "v1": {
+                    "created": "2026-10-18",
+                    "description": "Single workout day for targeted repairs",
+                    "template": workout_day_prompt
+                },
+                "current": "v1"  # Points to the version that should be used
+            },
+            "workout_day_ids": {
+                "v1": {
+                    "created": "2026-10-18",
+                    "description": "Single workout day referencing exercises by catalog id",
+                    "template": workout_day_ids_prompt
+                },
+                "current": "v1"  # Points to the version that should be used
+            },
+            "meal": {
+                "v1": {
+                    "created": "2026-10-18",
+                    "description": "Single meal for targeted repairs",
+                    "template": meal_prompt
+                },
+                "current": "v1"  # Points to the version that should be used
             }
         }
     
@@ -43,19 +87,18 @@ class PromptManager:
     def get_current_prompt(self, prompt_name):
         """Get the current version of a prompt template."""
         return self.get_prompt(prompt_name)
+
+    def version_fingerprint(self):
+        """Get a short hash of the current version and text of every prompt."""
+        current = {
+            name: [entry["current"], self.get_current_prompt(name)]
+            for name, entry in sorted(self.prompts.items())
+        }
+        return hashlib.sha256(json.dumps(current, sort_keys=True).encode()).hexdigest()[:16]
     
-    def format_workout_prompt(self, exercise_data, user_data, custom_data = None):
-        """Format the workout prompt with exercise data and user preferences."""
-        prompt = self.get_current_prompt("workout_plan")
-        
-        # Replace placeholders in the template
-        formatted_prompt = prompt.replace(
-            "{exercise_data}", 
-            json.dumps(exercise_data)
-        ).replace(
-            "{user_preferences}", 
-            json.dumps(user_data)
-        )
+    @staticmethod
+    def _substitute(prompt, custom_data=None):
+        """Replace {key} placeholders in a prompt with the values of custom_data."""
         if custom_data:
           for key, value in custom_data.items():
               placeholder = f"{{{key}}}"
@@ -69,8 +112,23 @@ class PromptManager:
               else:
                   str_value = str(value)
                   
-              formatted_prompt = formatted_prompt.replace(placeholder, str_value)
-        return formatted_prompt
+              prompt = prompt.replace(placeholder, str_value)
+        return prompt
+
+    @traced("format_workout_prompt")
+    def format_workout_prompt(self, exercise_data, user_data, custom_data = None, prompt_name="workout_plan"):
+        """Format the workout prompt with exercise data and user preferences."""
+        prompt = self.get_current_prompt(prompt_name)
+        
+        # Replace placeholders in the template
+        formatted_prompt = prompt.replace(
+            "{exercise_data}", 
+            json.dumps(exercise_data)
+        ).replace(
+            "{user_preferences}", 
+            json.dumps(user_data)
+        )
+        return self._substitute(formatted_prompt, custom_data)
     
     def format_nutrition_prompt(self, user_data, custom_data = None):
         """Format the nutrition prompt with user preferences."""
@@ -81,19 +139,14 @@ class PromptManager:
             "{user_preferences}", 
             json.dumps(user_data)
         )
-        if custom_data:
-          for key, value in custom_data.items():
-              placeholder = f"{{{key}}}"
-              
-              if isinstance(value, (int, float)):
-                  str_value = str(value)
-              elif isinstance(value, bool):
-                  str_value = str(value).lower()
-              elif isinstance(value, (list, dict)):
-                  str_value = json.dumps(value)
-              else:
-                  str_value = str(value)
-                  
-              formatted_prompt = formatted_prompt.replace(placeholder, str_value)
-              
-        return formatted_prompt
+        return self._substitute(formatted_prompt, custom_data)
+
+    def format_coaching_prompt(self, weekly_schedule, custom_data = None):
+        """Format the workout coaching prompt with a locally built schedule."""
+        return self.format_section_prompt(
+            "workout_coaching", {"weekly_schedule": weekly_schedule, **(custom_data or {})}
+        )
+
+    def format_section_prompt(self, prompt_name, custom_data = None):
+        """Format a single-section prompt (workout day or meal) with its data."""
+        return self._substitute(self.get_current_prompt(prompt_name), custom_data)
@@ -12,8 +12,32 @@ class AppConfig:
         # File paths
         self.BASE_DIR = Path(__file__).resolve().parent.parent
         self.DATASET_PATH = os.getenv("DATASET_PATH", str(self.BASE_DIR / "data" / "dataset.csv"))
+        self.FOOD_TABLE_PATH = os.getenv("FOOD_TABLE_PATH", str(self.BASE_DIR / "data" / "food_composition.csv"))
         self.LOG_DIR = os.getenv("LOG_DIR", str(self.BASE_DIR / "logs"))
         
+        # Logging: level, and size (bytes) or age (hours) at which the log
+        # file is rotated, keeping LOG_BACKUP_COUNT rotated files
+        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+        self.LOG_ROTATE_HOURS = float(os.getenv("LOG_ROTATE_HOURS", "24"))
+        self.LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "10"))
+        # "text" or "json" lines; share of requests whose debug records are kept
+        self.LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+        self.LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+        # Record tracing spans and write a Chrome trace per request to LOG_DIR
+        self.TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+        # Local port serving Prometheus metrics at /metrics (0 disables)
+        self.METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+        self.METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+        # Profile the next N plan generations after startup (CPU samples and
+        # tracemalloc snapshots in LOG_DIR); ADMIN_MODE adds a sidebar toggle
+        self.PROFILE_NEXT_PLANS = int(os.getenv("PROFILE_NEXT_PLANS", "0"))
+        self.PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+        self.ADMIN_MODE = os.getenv("ADMIN_MODE", "false").lower() in ("1", "true", "yes")
+        
+        # SQLite database of generated plans
+        self.PLAN_STORE_PATH = os.getenv("PLAN_STORE_PATH", str(self.BASE_DIR / "data" / "plans.db"))
+        
         # Ensure log directory exists
         Path(self.LOG_DIR).mkdir(exist_ok=True, parents=True)
         
@@ -23,6 +47,19 @@ class AppConfig:
         self.API_TEMPERATURE = float(os.getenv("API_TEMPERATURE", "0"))
         self.API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
         self.API_TIMEOUT = int(os.getenv("API_TIMEOUT", "60"))
+        self.API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "4"))
+        
+        # Plan generation modes
+        # "full": AI builds the whole workout plan
+        # "hybrid": exercises and numbers are computed locally, AI writes coaching text only
+        # "ids": AI picks exercise ids, names and numbers are filled in from the dataset
+        self.WORKOUT_GENERATION_MODE = os.getenv("WORKOUT_GENERATION_MODE", "full")
+        # "ai": AI builds the meal plan
+        # "local": meals are built offline from the food composition table
+        # "meals": one small AI request per meal, sent concurrently
+        self.NUTRITION_GENERATION_MODE = os.getenv("NUTRITION_GENERATION_MODE", "ai")
+        # Size of the worker pool shared by all plan generation stages
+        self.PLAN_WORKERS = int(os.getenv("PLAN_WORKERS", "4"))
         
         # Default user parameters
         self.DEFAULT_HEIGHT_FT = 5
@@ -32,6 +69,18 @@ class AppConfig:
         self.DEFAULT_TIME_FRAME = 4
         self.DEFAULT_AGE = 22
         self.DEFAULT_TIME_CONSTRAINT = 30
+        self.DEFAULT_GENDER = "Male"
+        self.DEFAULT_ACTIVITY_LEVEL = "Sedentary"
+        self.DEFAULT_LOCATION = "Mumbai"
+        self.DEFAULT_DIET_PREFERENCE = "Non-Vegetarian"
+        self.DEFAULT_FOOD_TYPE = "Maharashtrian"
+        
+        # Cache warm-up: profiles pre-generated per run (0 disables), the local
+        # hours scheduled runs happen in and how far back requests are ranked
+        self.WARMUP_BUDGET = int(os.getenv("WARMUP_BUDGET", "0"))
+        self.WARMUP_HOURS = os.getenv("WARMUP_HOURS", "2-6")
+        self.WARMUP_LOOKBACK_DAYS = int(os.getenv("WARMUP_LOOKBACK_DAYS", "7"))
+        self.REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH", str(Path(self.LOG_DIR) / "requests.jsonl"))
         
         # Calculation constants
         self.CALORIES_PER_KG_LOSS = 7700
@@ -1 +1,3 @@
-from .prompts import workout_prompt, nutrition_plan
\ No newline at end of file
+from .prompts import (workout_prompt, nutrition_plan, workout_coaching_prompt,
+                      workout_day_prompt, meal_prompt, workout_ids_prompt,
+                      workout_day_ids_prompt)
\ No newline at end of file
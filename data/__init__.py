@@ -1 +1,4 @@
-from .loader import load_exercise_data
\ No newline at end of file
+from .loader import load_exercise_data, load_food_table
+from .catalog import ExerciseCatalog, WORKOUT_DAYS, REST_DAYS
+from .food_table import FoodTable, MEAL_SLOTS
+from .plan_store import PlanStore, dataset_version
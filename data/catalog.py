@@ -0,0 +1,297 @@
+"""
+Exercise catalog for building workout plans locally.
+Indexes the exercise dataset by id and computes per-user durations and calories.
+"""
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Weekly structure shared by every plan
+WORKOUT_DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+REST_DAYS = ("Saturday", "Sunday")
+
+# Scheduling limits
+TIME_BUFFER_MINS = 5
+MAX_DAILY_WORKOUT_CALORIES = 300
+
+class ExerciseCatalog:
+    """Indexed view of the exercise dataset for a single user."""
+
+    def __init__(self, exercise_data, weight):
+        """
+        Initialize the catalog.
+
+        Args:
+            exercise_data (DataFrame): Processed exercise data
+            weight (float): User's weight in kilograms
+        """
+        self.weight = weight
+        self.by_id = {}
+
+        for record in exercise_data.to_dict(orient='records'):
+            entry = self._build_entry(record)
+            self.by_id[entry["id"]] = entry
+
+    def _build_entry(self, record):
+        """
+        Convert a dataset row into a workout entry for this user.
+
+        Args:
+            record (dict): Exercise dataset row
+
+        Returns:
+            dict: Exercise entry with user-specific calories
+        """
+        duration = record.get("total_time") or record["exercise_duration"]
+        calories = record["calories_burned_per_kg"] * self.weight
+
+        return {
+            "id": int(record["id"]),
+            "name": str(record["name"]).strip(),
+            "type": record.get("exercise_type", "Strength Training"),
+            "duration_mins": int(round(duration)),
+            "calories_burned": round(calories, 1),
+            "met_value": float(record.get("met_value") or 0),
+        }
+
+    def get(self, exercise_id):
+        """
+        Look up an exercise by id.
+
+        Args:
+            exercise_id (int): Exercise id from the dataset
+
+        Returns:
+            dict: Exercise entry, or None if the id is unknown
+        """
+        try:
+            return self.by_id.get(int(exercise_id))
+        except (TypeError, ValueError):
+            return None
+
+    def eligible(self, allow_hiit=True, unique=True):
+        """
+        List exercises the user may do, most calorie-efficient first.
+
+        Args:
+            allow_hiit (bool): Whether HIIT exercises are allowed
+            unique (bool): List exercises sharing a name (translated variants,
+                repeats) only once
+
+        Returns:
+            list: Exercise entries sorted by calories per minute
+        """
+        seen_names = set()
+        entries = []
+        for entry in self.by_id.values():
+            if not allow_hiit and entry["type"] == "HIIT":
+                continue
+            key = re.sub(r"\s*\(.*\)$", "", entry["name"]).lower()
+            if unique and key in seen_names:
+                continue
+            seen_names.add(key)
+            entries.append(entry)
+
+        entries.sort(key=lambda e: (-e["calories_burned"] / max(e["duration_mins"], 1), e["id"]))
+        return entries
+
+    def alternatives(self, entry, pool, exclude=(), count=2):
+        """
+        Pick alternatives of the same type and similar duration.
+
+        Args:
+            entry (dict): Exercise to find alternatives for
+            pool (list): Candidate exercise entries
+            exclude (iterable): Exercise ids that must not be suggested
+            count (int): Number of alternatives
+
+        Returns:
+            list: Alternative exercise names
+        """
+        excluded = set(exclude) | {entry["id"]}
+        candidates = [
+            e for e in pool
+            if e["type"] == entry["type"] and e["id"] not in excluded
+            and e["duration_mins"] <= entry["duration_mins"] + TIME_BUFFER_MINS
+        ]
+        candidates.sort(key=lambda e: abs(e["duration_mins"] - entry["duration_mins"]))
+
+        names = []
+        for candidate in candidates:
+            if candidate["name"] != entry["name"] and candidate["name"] not in names:
+                names.append(candidate["name"])
+        return names[:count]
+
+    def to_workout(self, entry, pool, exclude=()):
+        """
+        Build a plan workout entry from a catalog entry.
+
+        Args:
+            entry (dict): Catalog exercise entry
+            pool (list): Candidate entries used for alternatives
+            exclude (iterable): Exercise ids not to suggest as alternatives
+
+        Returns:
+            dict: Workout entry in the plan schema
+        """
+        return {
+            "id": entry["id"],
+            "name": entry["name"],
+            "type": entry["type"],
+            "duration_mins": entry["duration_mins"],
+            "calories_burned": entry["calories_burned"],
+            "alternatives": self.alternatives(entry, pool, exclude),
+        }
+
+    def build_day(self, pool, time_constraint, calorie_target, preferred_type=None, weekly_usage=None):
+        """
+        Fill one day with exercises that add up to the calorie target within the time limit.
+
+        The day aims at the calorie target, capped at MAX_DAILY_WORKOUT_CALORIES.
+        Exercises that fit in the calories still to burn are preferred, paced
+        to spread them over the time left; an exercise overshooting the target
+        is only added when it lands closer to the target than stopping would.
+
+        Args:
+            pool (list): Eligible exercise entries, most efficient first
+            time_constraint (int): Available workout time in minutes
+            calorie_target (float): Calories the day should burn
+            preferred_type (str, optional): Exercise type to open the day with
+            weekly_usage (dict, optional): Exercise id -> times already used this week
+
+        Returns:
+            list: Selected catalog entries
+        """
+        weekly_usage = weekly_usage if weekly_usage is not None else {}
+        time_left = time_constraint + TIME_BUFFER_MINS
+        calories_left = min(calorie_target, MAX_DAILY_WORKOUT_CALORIES)
+        calorie_cap = MAX_DAILY_WORKOUT_CALORIES
+        selected = []
+
+        def rank(entry):
+            type_bonus = 0 if not selected and entry["type"] == preferred_type else 1
+            return (type_bonus, weekly_usage.get(entry["id"], 0))
+
+        while time_left > 0 and (calories_left > 0 or not selected):
+            chosen_ids = {e["id"] for e in selected}
+            fitting = [
+                e for e in pool
+                if e["id"] not in chosen_ids
+                and e["duration_mins"] <= time_left
+                and e["calories_burned"] <= calorie_cap
+            ]
+            if not fitting:
+                break
+
+            within_target = [e for e in fitting if e["calories_burned"] <= calories_left]
+            if within_target:
+                # Least used first, then the intensity that spreads the remaining calories over the remaining time
+                pace = calories_left / max(time_left - TIME_BUFFER_MINS, 1)
+                entry = min(within_target, key=lambda e: (
+                    *rank(e), abs(e["calories_burned"] / max(e["duration_mins"], 1) - pace)))
+            else:
+                entry = min(fitting, key=lambda e: (rank(e)[0], e["calories_burned"]))
+                if selected and entry["calories_burned"] - calories_left >= calories_left:
+                    break
+
+            selected.append(entry)
+            weekly_usage[entry["id"]] = weekly_usage.get(entry["id"], 0) + 1
+            time_left -= entry["duration_mins"]
+            calories_left -= entry["calories_burned"]
+            calorie_cap -= entry["calories_burned"]
+
+        return selected
+
+    def build_weekly_plan(self, time_constraint, daily_calorie_target, allow_hiit=True):
+        """
+        Build a 5-day weekly plan entirely from the catalog.
+
+        Args:
+            time_constraint (int): Available workout time in minutes
+            daily_calorie_target (float): Exercise calories to burn per workout day
+            allow_hiit (bool): Whether HIIT exercises are allowed
+
+        Returns:
+            dict: Weekly plan keyed by day in the plan schema
+        """
+        pool = self.eligible(allow_hiit)
+        types = sorted({e["type"] for e in pool})
+        weekly_usage = {}
+        weekly_plan = {}
+
+        for index, day in enumerate(WORKOUT_DAYS):
+            preferred_type = types[index % len(types)] if types else None
+            entries = self.build_day(pool, time_constraint, daily_calorie_target,
+                                     preferred_type, weekly_usage)
+            day_ids = [e["id"] for e in entries]
+            workouts = [self.to_workout(e, pool, day_ids) for e in entries]
+            weekly_plan[day] = self.summarize_day(workouts)
+
+        logger.info(f"Built local weekly plan from {len(pool)} eligible exercises")
+        return weekly_plan
+
+    def hydrate_day(self, exercise_ids, pool, time_constraint, calorie_target, weekly_usage=None):
+        """
+        Turn exercise ids returned by the AI into workout entries.
+
+        Unknown ids, ids the user is not allowed to do and duplicates are
+        rejected; the time and calories they leave free are refilled from
+        the catalog.
+
+        Args:
+            exercise_ids (list): Exercise ids for the day
+            pool (list): Exercise entries the user may do
+            time_constraint (int): Available workout time in minutes
+            calorie_target (float): Calories the day should burn
+            weekly_usage (dict, optional): Exercise id -> times already used this week
+
+        Returns:
+            tuple: (workouts, rejected_ids)
+        """
+        weekly_usage = weekly_usage if weekly_usage is not None else {}
+        allowed_ids = {e["id"] for e in pool}
+        entries = []
+        rejected = []
+
+        for raw_id in exercise_ids or []:
+            entry = self.get(raw_id)
+            if entry is None or entry["id"] not in allowed_ids or entry in entries:
+                rejected.append(raw_id)
+                continue
+            entries.append(entry)
+            weekly_usage[entry["id"]] = weekly_usage.get(entry["id"], 0) + 1
+
+        if rejected:
+            used_time = sum(e["duration_mins"] for e in entries)
+            used_calories = sum(e["calories_burned"] for e in entries)
+            if used_calories < calorie_target or not entries:
+                remaining_pool = [e for e in pool if e not in entries]
+                entries += self.build_day(remaining_pool, time_constraint - used_time,
+                                          calorie_target - used_calories, weekly_usage=weekly_usage)
+
+        day_ids = [e["id"] for e in entries]
+        return [self.to_workout(e, pool, day_ids) for e in entries], rejected
+
+    @staticmethod
+    def summarize_day(workouts, focus=None):
+        """
+        Wrap workouts in a day entry with recomputed totals.
+
+        Args:
+            workouts (list): Workout entries for the day
+            focus (str, optional): Focus label, derived from types if omitted
+
+        Returns:
+            dict: Day entry in the plan schema
+        """
+        if not focus:
+            day_types = list(dict.fromkeys(w.get("type") for w in workouts if w.get("type")))
+            focus = " & ".join(day_types)
+
+        return {
+            "focus": focus,
+            "workouts": workouts,
+            "total_time": sum(w.get("duration_mins", 0) for w in workouts),
+            "total_calories": round(sum(w.get("calories_burned", 0) for w in workouts), 1),
+        }
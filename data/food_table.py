@@ -0,0 +1,138 @@
+"""
+Indexed food composition table.
+Looks up foods by cuisine, meal slot and diet preference, and matches
+free-text food names from AI-generated plans back to table entries.
+"""
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Cuisine shared by every regional cuisine
+COMMON_CUISINE = "Common"
+
+# Meal slot each meal of the day draws its foods from
+MEAL_SLOTS = {
+    "Breakfast": ("breakfast", "side"),
+    "Morning_Snack": ("snack",),
+    "Lunch": ("main", "side"),
+    "Evening_Snack": ("snack",),
+    "Dinner": ("main", "side"),
+}
+
+class FoodTable:
+    """Food composition table indexed by cuisine, slot and diet."""
+
+    def __init__(self, food_data):
+        """
+        Build the indexes.
+
+        Args:
+            food_data (DataFrame): Food composition data, values per 100 g
+        """
+        self.foods = []
+        self.by_id = {}
+        self.by_name = {}
+        self.index = {}
+
+        for record in food_data.to_dict(orient='records'):
+            food = {
+                "id": int(record["id"]),
+                "name": str(record["name"]).strip(),
+                "cuisine": str(record["cuisine"]).strip(),
+                "slots": tuple(s.strip() for s in str(record["slots"]).split("|")),
+                "vegetarian": bool(record["vegetarian"]),
+                "vegan": bool(record["vegan"]),
+                "protein": float(record["protein"]),
+                "carbs": float(record["carbs"]),
+                "fat": float(record["fat"]),
+                "calories": float(record["calories"]),
+                "max_portion_g": float(record["max_portion_g"]),
+            }
+            self.foods.append(food)
+            self.by_id[food["id"]] = food
+            self.by_name[self._normalize(food["name"])] = food
+
+            for slot in food["slots"]:
+                self.index.setdefault((food["cuisine"], slot), []).append(food)
+
+        logger.info(f"Indexed {len(self.foods)} foods across {len(self.index)} cuisine/slot pairs")
+
+    @staticmethod
+    def _normalize(name):
+        """Normalize a food name for lookups."""
+        name = re.sub(r"\(.*?\)", "", str(name).lower())
+        return " ".join(re.sub(r"[^a-z ]", " ", name).split())
+
+    @staticmethod
+    def allows(food, diet_preference):
+        """
+        Check whether a food fits a diet preference.
+
+        Args:
+            food (dict): Food entry
+            diet_preference (str): "Non-Vegetarian", "Vegetarian" or "Vegan"
+
+        Returns:
+            bool: True if the food is allowed
+        """
+        preference = str(diet_preference).lower()
+        if preference == "vegan":
+            return food["vegan"]
+        if preference == "vegetarian":
+            return food["vegetarian"]
+        return True
+
+    def candidates(self, cuisine, slots, diet_preference):
+        """
+        List foods for a cuisine and meal slots that fit a diet.
+        Cuisine-specific foods come first, followed by common foods.
+
+        Args:
+            cuisine (str): Preferred cuisine
+            slots (iterable): Meal slots to draw from
+            diet_preference (str): Diet preference
+
+        Returns:
+            list: Matching food entries without duplicates
+        """
+        seen = set()
+        foods = []
+        for source in (cuisine, COMMON_CUISINE):
+            for slot in slots:
+                for food in self.index.get((source, slot), []):
+                    if food["id"] in seen or not self.allows(food, diet_preference):
+                        continue
+                    seen.add(food["id"])
+                    foods.append(food)
+        return foods
+
+    def match(self, name):
+        """
+        Match a free-text food name to a table entry.
+
+        Args:
+            name (str): Food name, e.g. from an AI-generated plan
+
+        Returns:
+            dict: Food entry, or None if no confident match exists
+        """
+        key = self._normalize(name)
+        if not key:
+            return None
+        if key in self.by_name:
+            return self.by_name[key]
+
+        # Fall back to whole-word matches: the table name with the most words
+        # found in the given name, then the one table name containing it.
+        # Ties mean the name is ambiguous and nothing is matched.
+        padded = f" {key} "
+        contained = [food_key for food_key in self.by_name if food_key and f" {food_key} " in padded]
+        if contained:
+            most_words = max(len(food_key.split()) for food_key in contained)
+            best = [food_key for food_key in contained if len(food_key.split()) == most_words]
+            return self.by_name[best[0]] if len(best) == 1 else None
+        containing = [food_key for food_key in self.by_name if padded in f" {food_key} "]
+        if len(containing) == 1:
+            return self.by_name[containing[0]]
+        return None
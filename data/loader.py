@@ -2,9 +2,43 @@ import pandas as pd
 import logging
 import streamlit as st
 import os
+from utils import traced
 
 logger = logging.getLogger(__name__)
 
+# Keywords used to derive an exercise type from its name
+HIIT_KEYWORDS = ('hiit',)
+YOGA_KEYWORDS = ('yoga', 'asana', 'suryanamaskar', 'stretch', 'flow', 'relax', 'pranayama',
+                 'mantra', 'sleep', 'mobility', 'balanc', 'warrior', 'pelvi', 'kegel',
+                 'calm', 'recharge', 'rejuvenate', 'joints')
+STRENGTH_KEYWORDS = ('strength', 'strong', 'core', 'legs', 'back', 'glutes', 'abs', 'chest',
+                     'shoulders', 'body')
+
+def classify_exercise(name, met_value):
+    """
+    Classify an exercise as HIIT, Yoga or Strength Training.
+    
+    Args:
+        name (str): Exercise name from the dataset
+        met_value (float): Metabolic Equivalent of Task value
+        
+    Returns:
+        str: Exercise type
+    """
+    lowered = str(name).lower()
+    met = float(met_value) if pd.notna(met_value) else 0.0
+    
+    if any(keyword in lowered for keyword in HIIT_KEYWORDS) or met >= 9:
+        return "HIIT"
+    if any(keyword in lowered for keyword in YOGA_KEYWORDS):
+        return "Yoga"
+    if any(keyword in lowered for keyword in STRENGTH_KEYWORDS):
+        return "Strength Training"
+    if met >= 8:
+        return "HIIT"
+    return "Strength Training"
+
+@traced("load_exercise_data")
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def load_exercise_data(file_path='data/dataset.csv'):
     """
@@ -55,7 +89,13 @@ def load_exercise_data(file_path='data/dataset.csv'):
         # 4. Drop rows with missing values in critical columns
         df = df.dropna(subset=numeric_columns)
         
-        # 5. Log data quality metrics
+        # 5. Derive exercise type from name and intensity
+        met_values = df['met_value'] if 'met_value' in df.columns else pd.Series(0, index=df.index)
+        df['exercise_type'] = [
+            classify_exercise(name, met) for name, met in zip(df['name'], met_values)
+        ]
+        
+        # 6. Log data quality metrics
         logger.info(f"Processed dataset: {len(df)} valid exercises")
         logger.info(f"Exercise duration range: {df['exercise_duration'].min()}-{df['exercise_duration'].max()} minutes")
         
@@ -69,4 +109,53 @@ def load_exercise_data(file_path='data/dataset.csv'):
         raise
     except Exception as e:
         logger.error(f"Error loading exercise data: {e}", exc_info=True)
-        raise ValueError(f"Failed to load exercise data: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Failed to load exercise data: {str(e)}")
+
+@st.cache_data(ttl=3600)  # Cache for 1 hour
+def load_food_table(file_path='data/food_composition.csv'):
+    """
+    Load the bundled food composition table.
+    
+    Args:
+        file_path (str): Path to the food composition CSV
+        
+    Returns:
+        DataFrame: Food composition data, values per 100 g
+        
+    Raises:
+        FileNotFoundError: If the file is not found
+        ValueError: If the table doesn't have required columns
+    """
+    try:
+        logger.info(f"Loading food composition table from: {file_path}")
+        
+        if not os.path.exists(file_path):
+            alt_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), file_path)
+            if os.path.exists(alt_path):
+                file_path = alt_path
+            else:
+                raise FileNotFoundError(f"Food composition table not found at {file_path}")
+        
+        df = pd.read_csv(file_path)
+        
+        required_columns = ['id', 'name', 'cuisine', 'slots', 'vegetarian', 'vegan',
+                            'protein', 'carbs', 'fat', 'calories', 'max_portion_g']
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        
+        if missing_columns:
+            raise ValueError(f"Food table missing required columns: {', '.join(missing_columns)}")
+        
+        df = df.drop_duplicates(subset=['id'])
+        logger.info(f"Loaded {len(df)} foods from composition table")
+        
+        return df
+        
+    except FileNotFoundError as e:
+        logger.error(f"Food table file not found: {e}")
+        raise
+    except ValueError as e:
+        logger.error(f"Food table validation error: {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Error loading food table: {e}", exc_info=True)
+        raise ValueError(f"Failed to load food table: {str(e)}")
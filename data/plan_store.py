@@ -0,0 +1,202 @@
+"""
+SQLite store for generated plans.
+Plans are addressed by a hash of the inputs they were built from, so an
+identical request is answered from disk. Plan bodies are kept as
+compressed blobs shared by every record with the same content.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import zlib
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+from utils import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+STORE_LOOKUPS = metrics_registry.counter(
+    "plan_store_lookups_total", "Plan store lookups by identical inputs, by result", ("result",))
+STORE_HIT_RATIO = metrics_registry.gauge(
+    "plan_store_hit_ratio", "Share of plan store lookups answered from disk",
+    function=lambda: STORE_LOOKUPS.value(result="hit") / max(
+        STORE_LOOKUPS.value(result="hit") + STORE_LOOKUPS.value(result="miss"), 1))
+
+DEFAULT_PAGE_SIZE = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plan_blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    raw_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    content_key TEXT NOT NULL,
+    blob_hash TEXT NOT NULL REFERENCES plan_blobs(hash),
+    created_at TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plans_user_created ON plans (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_plans_content_key ON plans (content_key, created_at DESC);
+"""
+
+# Plan inputs copied into the listing summary
+SUMMARY_FIELDS = ("weight", "goal_weight", "time_frame", "diet_preference", "food_type")
+
+def dataset_version(*frames):
+    """
+    Fingerprint the data a plan is built from.
+
+    Args:
+        *frames (DataFrame): Exercise and food tables; None entries are skipped
+
+    Returns:
+        str: Short hash that changes whenever any table changes
+    """
+    digest = hashlib.sha256()
+    for frame in frames:
+        if frame is not None:
+            digest.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+            digest.update(",".join(map(str, frame.columns)).encode())
+    return digest.hexdigest()[:16]
+
+class PlanStore:
+    """Content-addressed plan store with per-user listing."""
+
+    def __init__(self, path, prompt_version="", dataset_version=""):
+        """
+        Open the store, creating the database if needed.
+
+        Args:
+            path (str): SQLite database file
+            prompt_version (str): Fingerprint of the prompts in use
+            dataset_version (str): Fingerprint of the exercise and food data
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.prompt_version = prompt_version
+        self.dataset_version = dataset_version
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # A connection per call keeps the store safe to share between sessions
+        return sqlite3.connect(self.path, timeout=10)
+
+    def content_key(self, plan_inputs):
+        """
+        Hash the canonical inputs of a plan together with the prompt and
+        dataset versions.
+
+        Args:
+            plan_inputs (dict): Inputs from PlanGenerator.plan_inputs
+
+        Returns:
+            str: Hex digest identifying plans built from these inputs
+        """
+        canonical = {
+            field: round(value, 2) if isinstance(value, float) else value
+            for field, value in plan_inputs.items()
+        }
+        payload = json.dumps({
+            "inputs": canonical,
+            "prompt_version": self.prompt_version,
+            "dataset_version": self.dataset_version,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def save(self, user_id, plan):
+        """
+        Store a plan for a user.
+
+        Args:
+            user_id (str): Owner of the plan
+            plan (dict): Complete plan including its plan_inputs
+
+        Returns:
+            int: Id of the new plan record
+        """
+        # Key order is kept, since it is the display order of days and meals
+        body = json.dumps(plan, ensure_ascii=False).encode()
+        blob_hash = hashlib.sha256(body).hexdigest()
+        inputs = plan.get("plan_inputs", {})
+        summary = {field: inputs.get(field) for field in SUMMARY_FIELDS}
+
+        with self._connect() as conn:
+            # Identical plans share one blob
+            conn.execute(
+                "INSERT OR IGNORE INTO plan_blobs (hash, data, raw_size) VALUES (?, ?, ?)",
+                (blob_hash, zlib.compress(body, 6), len(body))
+            )
+            cursor = conn.execute(
+                "INSERT INTO plans (user_id, content_key, blob_hash, created_at, summary) VALUES (?, ?, ?, ?, ?)",
+                (str(user_id), self.content_key(inputs), blob_hash,
+                 datetime.now().isoformat(timespec="seconds"), json.dumps(summary))
+            )
+            plan_id = cursor.lastrowid
+        logger.info(f"Stored plan {plan_id} for user {user_id} ({len(body)} bytes raw)")
+        return plan_id
+
+    def find(self, plan_inputs):
+        """
+        Look up the newest plan built from the same inputs and versions.
+
+        Args:
+            plan_inputs (dict): Inputs from PlanGenerator.plan_inputs
+
+        Returns:
+            dict or None: Stored plan, or None if there is none
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT b.data FROM plans p JOIN plan_blobs b ON b.hash = p.blob_hash "
+                "WHERE p.content_key = ? ORDER BY p.created_at DESC, p.id DESC LIMIT 1",
+                (self.content_key(plan_inputs),)
+            ).fetchone()
+        STORE_LOOKUPS.inc(result="hit" if row else "miss")
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def get(self, plan_id):
+        """
+        Load a stored plan.
+
+        Args:
+            plan_id (int): Plan record id
+
+        Returns:
+            dict or None: Stored plan, or None if the id is unknown
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT b.data FROM plans p JOIN plan_blobs b ON b.hash = p.blob_hash WHERE p.id = ?",
+                (plan_id,)
+            ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def list_plans(self, user_id, page=1, page_size=DEFAULT_PAGE_SIZE):
+        """
+        List a user's plans, newest first.
+
+        Args:
+            user_id (str): Owner of the plans
+            page (int): Page number starting at 1
+            page_size (int): Plans per page
+
+        Returns:
+            tuple: (list of {id, created_at, summary fields}, total number of plans)
+        """
+        page = max(int(page), 1)
+        with self._connect() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM plans WHERE user_id = ?", (str(user_id),)).fetchone()[0]
+            rows = conn.execute(
+                "SELECT id, created_at, summary FROM plans WHERE user_id = ? "
+                "ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                (str(user_id), page_size, (page - 1) * page_size)
+            ).fetchall()
+        plans = [{"id": plan_id, "created_at": created_at, **json.loads(summary)}
+                 for plan_id, created_at, summary in rows]
+        return plans, total
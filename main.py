@@ -3,22 +3,37 @@ from dotenv import load_dotenv
 import os
 import streamlit as st
 from config import AppConfig
-from utils import setup_logging
-from data import load_exercise_data
-from models import PlanGenerator, AnthropicService
+from utils import (setup_logging, derive_profile, request_context, enable_tracing, tracing_enabled, export_chrome_trace,
+                   start_metrics_server, plan_profiler)
+from data import load_exercise_data, load_food_table, PlanStore, dataset_version
+from config.prompts import PromptManager
+from models import PlanGenerator, AnthropicService, CacheWarmer, RequestLog
 from ui import (render_header, user_info_form, user_profile_card, 
-                          weight_loss_chart, display_workout_day, render_meal_table,
-                          export_plan_button, load_custom_css)
+                          weight_loss_chart, render_progress_tracker, render_feasibility_panel, display_workout_day, render_meal_table,
+                          render_calorie_summary, saved_plans_browser, profiling_controls, export_plan_button, load_custom_css,
+                          plan_fingerprint)
 
 # Load environment variables
 load_dotenv()
 
-# Setup logging
-logger = setup_logging()
-
 # Load application configuration
 config = AppConfig()
 
+# Setup logging; only the first run in the process configures it
+logger = setup_logging(
+    config.LOG_DIR,
+    level=config.LOG_LEVEL,
+    max_bytes=config.LOG_MAX_BYTES,
+    rotate_hours=config.LOG_ROTATE_HOURS,
+    backup_count=config.LOG_BACKUP_COUNT,
+    json_format=config.LOG_FORMAT == "json",
+    debug_sample_rate=config.LOG_DEBUG_SAMPLE_RATE
+)
+
+# Serve metrics for scraping; only the first run in the process starts the server
+if config.METRICS_PORT:
+    start_metrics_server(config.METRICS_PORT, config.METRICS_HOST)
+
 # Set page configuration
 st.set_page_config(
     page_title=config.APP_TITLE,
@@ -29,6 +44,276 @@ st.set_page_config(
 # Load custom CSS
 load_custom_css()
 
+@st.cache_resource
+def arm_startup_profiling():
+    """
+    Arm the profiler for the first PROFILE_NEXT_PLANS generations, once per process.
+
+    Returns:
+        bool: True once armed
+    """
+    plan_profiler.arm(config.PROFILE_NEXT_PLANS, config.LOG_DIR, config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+    return True
+
+if config.PROFILE_NEXT_PLANS:
+    arm_startup_profiling()
+
+@st.cache_resource
+def get_ai_service(api_key):
+    """
+    Create the AI service once per process, so its response cache is
+    shared by every session and survives reruns.
+
+    Args:
+        api_key (str): Anthropic API key
+
+    Returns:
+        AnthropicService: Shared service
+    """
+    return AnthropicService(
+        api_key=api_key,
+        model=config.AI_MODEL,
+        max_retries=config.API_MAX_RETRIES,
+        timeout=config.API_TIMEOUT,
+        max_concurrency=config.API_MAX_CONCURRENCY
+    )
+
+def create_planner(exercise_df, food_df):
+    """
+    Create a plan generator with the configured generation modes.
+
+    Args:
+        exercise_df (DataFrame): Exercise data
+        food_df (DataFrame): Food composition table
+
+    Returns:
+        PlanGenerator: Plan generator
+    """
+    return PlanGenerator(
+        exercise_df,
+        workout_mode=config.WORKOUT_GENERATION_MODE,
+        food_data=food_df,
+        nutrition_mode=config.NUTRITION_GENERATION_MODE,
+        max_workers=config.PLAN_WORKERS
+    )
+
+@st.cache_resource
+def get_plan_store(_exercise_df, _food_df):
+    """
+    Open the plan store once per process.
+
+    Args:
+        _exercise_df (DataFrame): Exercise data, part of the dataset version
+        _food_df (DataFrame): Food composition table, part of the dataset version
+
+    Returns:
+        PlanStore: Shared plan store
+    """
+    return PlanStore(
+        config.PLAN_STORE_PATH,
+        prompt_version=PromptManager().version_fingerprint(),
+        dataset_version=dataset_version(_exercise_df, _food_df)
+    )
+
+@st.cache_resource
+def start_cache_warmer(api_key, _exercise_df, _food_df):
+    """
+    Start the background warm-up of popular profiles once per process.
+
+    Args:
+        api_key (str): Anthropic API key of the shared AI service
+        _exercise_df (DataFrame): Exercise data
+        _food_df (DataFrame): Food composition table
+
+    Returns:
+        CacheWarmer: Running warmer
+    """
+    warmer = CacheWarmer(
+        create_planner(_exercise_df, _food_df),
+        get_ai_service(api_key),
+        RequestLog(config.REQUEST_LOG_PATH),
+        budget=config.WARMUP_BUDGET,
+        default_profile={
+            "height_ft": config.DEFAULT_HEIGHT_FT,
+            "height_inch": config.DEFAULT_HEIGHT_IN,
+            "weight": config.DEFAULT_WEIGHT,
+            "goal_weight": config.DEFAULT_GOAL_WEIGHT,
+            "time_frame": config.DEFAULT_TIME_FRAME,
+            "age": config.DEFAULT_AGE,
+            "gender": config.DEFAULT_GENDER,
+            "activity_level": config.DEFAULT_ACTIVITY_LEVEL,
+            "time_constraint": config.DEFAULT_TIME_CONSTRAINT,
+            "location": config.DEFAULT_LOCATION,
+            "diet_preference": config.DEFAULT_DIET_PREFERENCE,
+            "food_type": config.DEFAULT_FOOD_TYPE,
+        },
+        off_peak_hours=config.WARMUP_HOURS,
+        lookback_days=config.WARMUP_LOOKBACK_DAYS
+    )
+    warmer.start()
+    return warmer
+
+def show_plan_error(plan):
+    """
+    Show a plan generation error and the raw AI response if there is one.
+
+    Args:
+        plan (dict): Error information returned by the planner
+    """
+    preflight = plan.get("preflight")
+    if preflight:
+        # Rejected before any API call; show each reason and how to fix it
+        st.error("This plan can't be generated safely:\n" + "\n".join(
+            f"- {reason['message']}" for reason in preflight["reasons"]
+        ))
+        if preflight["suggestions"]:
+            st.info("Try instead:\n" + "\n".join(
+                f"- {suggestion['message']}" for suggestion in preflight["suggestions"]
+            ))
+        return
+    st.error(plan["error"])
+    if "raw_response" in plan:
+        with st.expander("View raw AI response"):
+            st.text(plan["raw_response"])
+
+def apply_plan_update(plan, plan_store, user_id):
+    """
+    Save an updated plan, store it in session state and redraw, or show the error.
+
+    Args:
+        plan (dict): Updated plan or error information
+        plan_store (PlanStore): Store the plan is saved to
+        user_id (str): Owner of the plan
+    """
+    if "error" in plan:
+        show_plan_error(plan)
+        return
+    try:
+        plan_store.save(user_id, plan)
+    except Exception as e:
+        logger.error(f"Could not save updated plan: {e}", exc_info=True)
+    st.session_state["current_plan"] = plan
+    st.rerun()
+
+def render_plan(plan, user_info, planner, ai_service, plan_store):
+    """
+    Display a complete plan with controls to regenerate single days and meals.
+
+    Args:
+        plan (dict): Complete plan
+        user_info (dict): User input values
+        planner (PlanGenerator): Planner used for partial regeneration
+        ai_service (AnthropicService): Service for AI interactions
+        plan_store (PlanStore): Store regenerated plans are saved to
+    """
+    # Rendered sections are memoized under the plan's content hash
+    plan_key = plan_fingerprint(plan)
+
+    # Display user profile
+    user_profile_card(
+        plan['user_profile'],
+        user_info["height_ft"],
+        user_info["height_inch"],
+        user_info["height_cm"]
+    )
+
+    # Display weight loss calculation
+    weight_loss_calc = plan.get("weight_loss_calculation", {})
+    weight_loss_chart(weight_loss_calc)
+
+    # Simulate the trajectory from the inputs the plan was built from
+    inputs = {**user_info, **plan.get("plan_inputs", {})}
+    render_progress_tracker(
+        inputs["weight"],
+        inputs["goal_weight"],
+        inputs["time_frame"],
+        derive_profile(
+            inputs["height_cm"], inputs["weight"], inputs["goal_weight"], inputs["time_frame"],
+            inputs["age"], inputs["gender"], inputs["activity_level"]
+        )
+    )
+
+    # Display daily calorie intake recommendation
+    st.markdown('<div class="section-header">Recommended Daily Calorie Intake</div>', unsafe_allow_html=True)
+    calorie_intake = plan.get("daily_calorie_intake", {})
+    col1, col2 = st.columns(2)
+    with col1:
+        render_calorie_summary(plan['user_profile'], calorie_intake, (plan_key, "calorie_summary"))
+
+    # Display workout plan
+    st.markdown('<div class="section-header">5-Day Workout Plan</div>', unsafe_allow_html=True)
+
+    workout_plan = plan.get("workout_plan", {})
+
+    st.markdown('<div class="subsection-header">Workout Strategy</div>', unsafe_allow_html=True)
+    st.markdown(f"""
+    <div class="info-box">
+        {workout_plan.get('strategy')}
+    </div>
+    """, unsafe_allow_html=True)
+    steps = (
+        (weight_loss_calc.get("exercise_portion_calories") * 200)
+        / (3 * user_info.get("weight") * 3.5)
+        * (
+            ((2.5 * 5280) / 60)
+            / ((0.413 * user_info.get("height_cm") * 0.394) / 12)
+        )
+    )
+    st.markdown(
+        f'<div class="subsection-header">Note: To Burn {weight_loss_calc.get("exercise_portion_calories"):,.0f} Calories Per Day, you need to complete {steps:,.0f} steps</div>',
+        unsafe_allow_html=True,
+    )
+
+    # Display detailed workout plan
+    st.markdown('<div class="subsection-header">Detailed Weekly Plan</div>', unsafe_allow_html=True)
+
+    weekly_plan = workout_plan.get("weekly_plan", {})
+    progression = workout_plan.get("progression", [])
+    week = 1
+    if len(progression) > 1:
+        week = st.selectbox("Week", [entry["week"] for entry in progression], index=0)
+        week_entry = progression[week - 1]
+        weekly_plan = week_entry["weekly_plan"]
+        st.markdown(f"""
+        <div class="info-box">
+            <p><strong>Week {week}{' (deload)' if week_entry['deload'] else ''}:</strong>
+            projected weight {week_entry['projected_weight']} kg,
+            daily intake target {week_entry['target_daily_intake']:,.0f} kcal,
+            daily exercise target {week_entry['exercise_calorie_target']:,.0f} kcal</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    for i, (day, info) in enumerate(weekly_plan.items()):
+        display_workout_day(day, info, i, (plan_key, f"workout:{week}:{i}:{day}"))
+        # Later weeks are derived from the base week, so only it can be regenerated
+        if week == 1 and st.button(f"Regenerate {day}", key=f"regenerate_day_{day}"):
+            with st.spinner(f"Regenerating {day}..."):
+                updated_plan = planner.regenerate_workout_day(plan, day, ai_service)
+                apply_plan_update(updated_plan, plan_store, user_info["user_id"])
+
+    # Display rest days
+    rest_days = workout_plan.get("rest_days", ["Saturday", "Sunday"])
+    st.markdown(f'<div class="day-header">{" & ".join(rest_days)}: Rest Days</div>', unsafe_allow_html=True)
+
+    # Display nutrition plan
+    nutrition_plan = plan.get("nutrition_plan", {})
+    st.markdown(
+        f'<div class="section-header">Nutrition Plan for {user_info.get("diet_preference")} in {user_info.get("location")}</div>',
+        unsafe_allow_html=True,
+    )
+
+    # Display meal plan
+    meals = nutrition_plan.get("meals", {})
+    for meal_name, meal_data in meals.items():
+        render_meal_table(meal_name, meal_data, (plan_key, f"meal:{meal_name}"))
+        if st.button(f"Regenerate {meal_name.replace('_', ' ')}", key=f"regenerate_meal_{meal_name}"):
+            with st.spinner(f"Regenerating {meal_name.replace('_', ' ')}..."):
+                updated_plan = planner.regenerate_meal(plan, meal_name, ai_service)
+                apply_plan_update(updated_plan, plan_store, user_info["user_id"])
+
+    # Add export functionality
+    export_plan_button(plan)
+
 # Application main function
 def main():
     # Render header
@@ -43,12 +328,7 @@ def main():
             st.stop()
 
     # Initialize AI service
-    ai_service = AnthropicService(
-        api_key=api_key,
-        model=config.AI_MODEL,
-        max_retries=config.API_MAX_RETRIES,
-        timeout=config.API_TIMEOUT
-    )
+    ai_service = get_ai_service(api_key)
 
     # Load exercise data
     try:
@@ -58,101 +338,65 @@ def main():
         st.error(f"Error loading exercise data: {e}")
         st.stop()
 
+    # Load food composition table
+    try:
+        food_df = load_food_table(config.FOOD_TABLE_PATH)
+    except Exception as e:
+        st.error(f"Error loading food composition data: {e}")
+        st.stop()
+
+    planner = create_planner(exercise_df, food_df)
+    start_cache_warmer(api_key, exercise_df, food_df)
+
+    plan_store = get_plan_store(exercise_df, food_df)
+
     # Get user information from sidebar form
     user_info = user_info_form()
     # Generate plan when button is clicked
     if user_info["submit"]:
         with st.spinner('Generating your personalized fitness and nutrition plan...'):
             try:
-                planner = PlanGenerator(exercise_df)
-                plan = planner.generate_plan(user_info, ai_service)
-                # Display plan if successful
+                RequestLog(config.REQUEST_LOG_PATH).record(user_info)
+                # A plan built from the same inputs, prompts and data is read back from the store
+                plan = plan_store.find(planner.plan_inputs(user_info))
+                if plan is None:
+                    # Regenerate only the parts of the current plan the form changes affect
+                    plan = planner.update_plan(user_info, st.session_state.get("current_plan"), ai_service)
+                    if "error" not in plan:
+                        plan_store.save(user_info["user_id"], plan)
+                else:
+                    logger.info("Reusing stored plan for identical inputs")
                 if "error" in plan:
-                    st.error(plan["error"])
-                    if "raw_response" in plan:
-                        with st.expander("View raw AI response"):
-                            st.text(plan["raw_response"])
+                    show_plan_error(plan)
                 else:
                     # Save plan to session state
                     st.session_state["current_plan"] = plan
-                    # Display user profile
-                    user_profile_card(
-                        plan['user_profile'],
-                        user_info["height_ft"],
-                        user_info["height_inch"],
-                        user_info["height_cm"]
-                    )
-
-                    # Display weight loss calculation
-                    weight_loss_calc = plan.get("weight_loss_calculation", {})
-                    weight_loss_chart(weight_loss_calc)
-
-                    # Display daily calorie intake recommendation
-                    st.markdown('<div class="section-header">Recommended Daily Calorie Intake</div>', unsafe_allow_html=True)
-                    calorie_intake = plan.get("daily_calorie_intake", {})
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.markdown(f"""
-                        <div class="summary-box">
-                            <p><strong>Baseline Calories:</strong> {calorie_intake.get('baseline_calories'):,.0f} kcal</p>
-                            <p><strong>Diet Calorie Deficit:</strong> {calorie_intake.get('diet_calorie_deficit'):,.0f} kcal</p>
-                            <p><strong>Target Daily Intake:</strong> {calorie_intake.get('target_daily_intake'):,.0f} kcal</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                    # Display workout plan
-                    st.markdown('<div class="section-header">5-Day Workout Plan</div>', unsafe_allow_html=True)
-
-                    workout_plan = plan.get("workout_plan", {})
-
-                    st.markdown('<div class="subsection-header">Workout Strategy</div>', unsafe_allow_html=True)
-                    st.markdown(f"""
-                    <div class="info-box">
-                        {workout_plan.get('strategy')}
-                    </div>
-                    """, unsafe_allow_html=True)
-                    steps = (
-                        (weight_loss_calc.get("exercise_portion_calories") * 200)
-                        / (3 * user_info.get("weight") * 3.5)
-                        * (
-                            ((2.5 * 5280) / 60)
-                            / ((0.413 * user_info.get("height_cm") * 0.394) / 12)
-                        )
-                    )
-                    st.markdown(
-                        f'<div class="subsection-header">Note: To Burn {weight_loss_calc.get("exercise_portion_calories"):,.0f} Calories Per Day, you need to complete {steps:,.0f} steps</div>',
-                        unsafe_allow_html=True,
-                    )
-
-                    # Display detailed workout plan
-                    st.markdown('<div class="subsection-header">Detailed Weekly Plan</div>', unsafe_allow_html=True)
-
-                    weekly_plan = workout_plan.get("weekly_plan", {})
-                    for i, (day, info) in enumerate(weekly_plan.items()):
-                        display_workout_day(day, info, i)
-
-                    # Display rest days
-                    rest_days = workout_plan.get("rest_days", ["Saturday", "Sunday"])
-                    st.markdown(f'<div class="day-header">{" & ".join(rest_days)}: Rest Days</div>', unsafe_allow_html=True)
-
-                    # Display nutrition plan
-                    nutrition_plan = plan.get("nutrition_plan", {})
-                    st.markdown(
-                        f'<div class="section-header">Nutrition Plan for {user_info.get("diet_preference")} in {user_info.get("location")}</div>',
-                        unsafe_allow_html=True,
-                    )
-
-                    # Display meal plan
-                    meals = nutrition_plan.get("meals", {})
-                    for meal_name, meal_data in meals.items():
-                        render_meal_table(meal_name, meal_data)
-
-                    # Add export functionality
-                    export_plan_button(plan)
 
             except Exception as e:
                 st.error(f"Error generating plan: {e}")
                 logger.error(f"Plan generation error: {e}", exc_info=True)
+
+    # Check the goal locally before spending a generation on it
+    with st.expander("What-if: which goals are feasible for you?", expanded=not st.session_state.get("current_plan")):
+        render_feasibility_panel(user_info)
+
+    # Reopen a saved plan without generating it again
+    open_plan_id = saved_plans_browser(lambda page: plan_store.list_plans(user_info["user_id"], page))
+    if open_plan_id is not None:
+        stored_plan = plan_store.get(open_plan_id)
+        if stored_plan:
+            st.session_state["current_plan"] = stored_plan
+
+    # Profile the next plan generations on request
+    if config.ADMIN_MODE:
+        profile_count = profiling_controls(plan_profiler.status())
+        if profile_count is not None:
+            plan_profiler.arm(profile_count, config.LOG_DIR, config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+
+    # Display the plan kept in session state so it survives reruns
+    plan = st.session_state.get("current_plan")
+    if plan:
+        render_plan(plan, user_info, planner, ai_service, plan_store)
     else:
         # Show welcome screen
         st.markdown("""
@@ -179,4 +423,10 @@ def main():
             """)
 
 if __name__ == "__main__":
-    main()
+    if config.TRACING_ENABLED and not tracing_enabled():
+        enable_tracing()
+    # Generation and rendering in one script run share a request id and trace
+    with request_context() as request_id:
+        main()
+    if config.TRACING_ENABLED:
+        export_chrome_trace(config.LOG_DIR, request_id)
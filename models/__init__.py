@@ -1,4 +1,8 @@
 from .workout import WorkoutModel
+from .meal_builder import MealBuilder
 from .nutrition import NutritionModel
 from .ai_service import AnthropicService
-from .plan_generator import PlanGenerator
\ No newline at end of file
+from .progression import ProgressionEngine
+from .preflight import check_request, preflight_stats
+from .plan_generator import PlanGenerator
+from .warmup import CacheWarmer, RequestLog
\ No newline at end of file
@@ -3,18 +3,47 @@ import time
 import logging
 import re
 import hashlib
+import threading
 import anthropic
 from anthropic import Anthropic
+from utils import span, traced, get_stage, metrics_registry
 
 logger = logging.getLogger(__name__)
 
+API_REQUESTS = metrics_registry.counter(
+    "anthropic_requests_total", "Claude API requests by model and status code", ("model", "status"))
+API_RETRIES = metrics_registry.counter(
+    "anthropic_retries_total", "Claude API requests retried, by the status code that caused the retry",
+    ("model", "status"))
+API_LATENCY = metrics_registry.histogram(
+    "anthropic_request_seconds", "Claude API request latency by model and plan stage", ("model", "stage"))
+API_TOKENS = metrics_registry.counter(
+    "anthropic_tokens_total", "Tokens sent to and received from the Claude API", ("model", "direction"))
+API_IN_FLIGHT = metrics_registry.gauge(
+    "anthropic_requests_in_flight", "Claude API requests currently in flight", ("model",))
+CACHE_LOOKUPS = metrics_registry.counter(
+    "response_cache_lookups_total", "AI response cache lookups by result", ("result",))
+CACHE_HIT_RATIO = metrics_registry.gauge(
+    "response_cache_hit_ratio", "Share of AI response cache lookups that hit",
+    function=lambda: CACHE_LOOKUPS.value(result="hit") / max(
+        CACHE_LOOKUPS.value(result="hit") + CACHE_LOOKUPS.value(result="miss"), 1))
+
+def _error_status(error):
+    """Status label for a failed request: the HTTP status code, or the kind of failure."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return str(status_code)
+    return "connection" if isinstance(error, anthropic.APIConnectionError) else "error"
+
 class AnthropicService:
-    def __init__(self, api_key, model="claude-3-haiku-20240307", max_retries=3, timeout=60):
+    def __init__(self, api_key, model="claude-3-haiku-20240307", max_retries=3, timeout=60, max_concurrency=4):
 
         self.api_key = api_key
         self.model = model
         self.max_retries = max_retries
         self.timeout = timeout
+        # Limits requests in flight across all threads sharing this service
+        self.rate_limiter = threading.BoundedSemaphore(max_concurrency)
         
         try:
             self.client = Anthropic(api_key=api_key)
@@ -25,6 +54,8 @@ class AnthropicService:
         
         # Response cache to avoid duplicate requests
         self.response_cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
         
     def _create_cache_key(self, system_message, user_message):
 
@@ -32,13 +63,18 @@ class AnthropicService:
         content = f"{system_message}|||{user_message}"
         return hashlib.md5(content.encode()).hexdigest()
         
-    def send_message(self, system_message, user_message, use_cache=True):
+    def send_message(self, system_message, user_message, use_cache=True, max_tokens=2500):
         cache_key = self._create_cache_key(system_message, user_message)
         
         # Check cache first if enabled
         if use_cache and cache_key in self.response_cache:
-            logger.info("Using cached response")
+            logger.info("Using cached response", extra={"cache_hit": True, "model": self.model})
+            self.cache_hits += 1
+            CACHE_LOOKUPS.inc(result="hit")
             return self.response_cache[cache_key]
+        if use_cache:
+            self.cache_misses += 1
+            CACHE_LOOKUPS.inc(result="miss")
             
         # Initialize error tracking
         last_error = None
@@ -46,33 +82,51 @@ class AnthropicService:
         # Implement retry logic with exponential backoff
         for attempt in range(self.max_retries):
             try:
-                logger.info(f"Sending request to Claude API (attempt {attempt+1}/{self.max_retries})")
+                logger.info(f"Sending request to Claude API (attempt {attempt+1}/{self.max_retries})",
+                            extra={"attempt": attempt + 1})
                 
-                start_time = time.time()
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=2500,
-                    temperature=0,
-                    system=system_message,
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": user_message
-                        },
-                    ]
-                )
-                
-                # Log request statistics
-                request_time = time.time() - start_time
-                logger.info(f"Request completed in {request_time:.2f}s")
+                with self.rate_limiter, span("anthropic.messages.create", model=self.model, attempt=attempt + 1), \
+                        API_IN_FLIGHT.track_inprogress(model=self.model):
+                    start_time = time.time()
+                    response = self.client.messages.create(
+                        model=self.model,
+                        max_tokens=max_tokens,
+                        temperature=0,
+                        system=system_message,
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": user_message
+                            },
+                        ]
+                    )
                 
                 # Calculate cost (approximate)
+                request_time = time.time() - start_time
                 input_tokens = response.usage.input_tokens
                 output_tokens = response.usage.output_tokens
                 cost_usd = (input_tokens / 1_000_000) * 0.80 + (output_tokens / 1_000_000) * 4
                 cost_inr = cost_usd * 86.93  # Approximate conversion to INR
                 
-                logger.info(f"Request tokens: {input_tokens} in, {output_tokens} out (est. cost: ${cost_usd:.6f}, ₹{cost_inr:.2f})")
+                API_REQUESTS.inc(model=self.model, status="200")
+                API_LATENCY.observe(request_time, model=self.model, stage=get_stage() or "none")
+                API_TOKENS.inc(input_tokens, model=self.model, direction="in")
+                API_TOKENS.inc(output_tokens, model=self.model, direction="out")
+                
+                # Log request statistics
+                logger.info(
+                    f"Request completed in {request_time:.2f}s: {input_tokens} tokens in, {output_tokens} out "
+                    f"(est. cost: ${cost_usd:.6f}, ₹{cost_inr:.2f})",
+                    extra={
+                        "attempt": attempt + 1,
+                        "latency_ms": round(request_time * 1000, 1),
+                        "input_tokens": input_tokens,
+                        "output_tokens": output_tokens,
+                        "cost_usd": round(cost_usd, 6),
+                        "cache_hit": False,
+                        "model": self.model,
+                    }
+                )
                 # Parse the response
                 result = self._parse_response(response)
                 
@@ -84,7 +138,9 @@ class AnthropicService:
                 
             except anthropic.APIError as e:
                 last_error = e
-                logger.warning(f"API error on attempt {attempt+1}: {e}")
+                API_REQUESTS.inc(model=self.model, status=_error_status(e))
+                logger.warning(f"API error on attempt {attempt+1}: {e}",
+                               extra={"attempt": attempt + 1, "status_code": getattr(e, "status_code", None)})
                 
                 # Don't retry on certain error types
                 if hasattr(e, 'status_code') and e.status_code in [400, 401, 403]:
@@ -94,21 +150,25 @@ class AnthropicService:
                 # Exponential backoff
                 if attempt < self.max_retries - 1:
                     sleep_time = 2 ** attempt
+                    API_RETRIES.inc(model=self.model, status=_error_status(e))
                     logger.info(f"Retrying in {sleep_time}s...")
                     time.sleep(sleep_time)
                     
             except anthropic.APIConnectionError as e:
                 last_error = e
-                logger.warning(f"Connection error on attempt {attempt+1}: {e}")
+                API_REQUESTS.inc(model=self.model, status=_error_status(e))
+                logger.warning(f"Connection error on attempt {attempt+1}: {e}", extra={"attempt": attempt + 1})
                 
                 # Exponential backoff
                 if attempt < self.max_retries - 1:
                     sleep_time = 2 ** attempt
+                    API_RETRIES.inc(model=self.model, status=_error_status(e))
                     logger.info(f"Retrying in {sleep_time}s...")
                     time.sleep(sleep_time)
                     
             except Exception as e:
                 last_error = e
+                API_REQUESTS.inc(model=self.model, status=_error_status(e))
                 logger.error(f"Unexpected error on attempt {attempt+1}: {e}", exc_info=True)
                 # Don't retry on unexpected errors
                 break
@@ -122,6 +182,7 @@ class AnthropicService:
             "success": False
         }
         
+    @traced("_parse_response")
     def _parse_response(self, response):
         try:
             message = response.content[0].text
@@ -158,7 +219,8 @@ class AnthropicService:
             
         except (json.JSONDecodeError, ValueError) as e:
             logger.error(f"Error parsing response: {e}")
-            logger.debug(f"Raw response content: {response.content[0].text}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Raw response content: {response.content[0].text}")
             
             return {
                 "error": f"Failed to parse JSON response: {e}",
@@ -0,0 +1,384 @@
+"""
+Local meal builder over the food composition table.
+Fills the daily meal slots with portions that hit calorie and macro targets,
+and corrects portions in AI-generated nutrition plans.
+"""
+import copy
+import itertools
+import logging
+import re
+import numpy as np
+from data import MEAL_SLOTS
+
+logger = logging.getLogger(__name__)
+
+MACROS = ("protein", "carbs", "fat")
+CALORIES_PER_GRAM = np.array([4.0, 4.0, 9.0])
+
+# Portion limits
+MIN_PORTION_G = 20
+ITEMS_PER_MEAL = 3
+MAX_ITEMS_PER_MEAL = 5
+
+# Calorie-weighted macro miss of a meal that is accepted without adding foods
+MISS_TOLERANCE_KCAL = 10
+
+# Regularization of the portion fit, small enough not to move a well-posed solution
+FIT_RIDGE = 1e-9
+
+# Portion state of a food in a bounded solve: at its minimum, at its maximum or free
+AT_MIN, AT_MAX, FREE = 0, 1, 2
+
+# Meals filled with fruit only
+SNACK_MEALS = ("Morning_Snack", "Evening_Snack")
+
+class MealBuilder:
+    """Builds meals from the food composition table to exact macro targets."""
+
+    def __init__(self, food_table):
+        """
+        Initialize the meal builder.
+
+        Args:
+            food_table (FoodTable, optional): Indexed food composition table;
+                without it only portion rescaling is available
+        """
+        self.food_table = food_table
+
+    def build_day(self, meal_calories, macro_targets, cuisine, diet_preference):
+        """
+        Build all meals of a day.
+
+        Snacks are filled with fruit to their calorie share first; the
+        remaining macros are spread over the main meals by calorie share and
+        solved per meal as a bounded least-squares fit over the candidate foods.
+
+        Args:
+            meal_calories (dict): Calorie target per meal
+            macro_targets (dict): Daily protein, carbs and fat targets in grams
+            cuisine (str): Preferred cuisine
+            diet_preference (str): Diet preference
+
+        Returns:
+            dict: Meals in the nutrition plan schema
+        """
+        used = set()
+        meal_items = {}
+
+        for meal_name in SNACK_MEALS:
+            if meal_name in meal_calories:
+                candidates = self.food_table.candidates(cuisine, MEAL_SLOTS[meal_name], diet_preference)
+                meal_items[meal_name] = self._build_snack(meal_calories[meal_name], candidates, used)
+
+        remaining = np.array([float(macro_targets[m]) for m in MACROS])
+        for items in meal_items.values():
+            remaining -= self._macro_totals(items)
+
+        main_meals = [m for m in meal_calories if m not in SNACK_MEALS]
+        remaining_share = sum(meal_calories[m] for m in main_meals)
+
+        for meal_name in main_meals:
+            share = meal_calories[meal_name] / remaining_share if remaining_share else 0
+            targets = np.maximum(remaining * share, 0)
+            candidates = self.food_table.candidates(cuisine, MEAL_SLOTS.get(meal_name, ("main", "side")), diet_preference)
+            items = self._solve_meal(targets, candidates, used)
+            meal_items[meal_name] = items
+
+            # Carry any shortfall over to the remaining meals
+            remaining -= self._macro_totals(items)
+            remaining_share -= meal_calories[meal_name]
+
+        return {
+            meal_name: self.summarize_meal([self._item(food, grams) for food, grams in meal_items[meal_name]])
+            for meal_name in meal_calories
+        }
+
+    def _macro_totals(self, items):
+        """Sum protein, carbs and fat over (food, grams) pairs."""
+        totals = np.zeros(len(MACROS))
+        for food, grams in items:
+            totals += np.array([food[m] for m in MACROS]) * grams / 100
+        return totals
+
+    def _build_snack(self, calories, candidates, used):
+        """
+        Fill a snack with one or two fruits to its calorie target.
+
+        Args:
+            calories (float): Calorie target for the snack
+            candidates (list): Snack food entries
+            used (set): Food ids already used today, updated in place
+
+        Returns:
+            list: (food, grams) pairs
+        """
+        items = []
+        remaining = calories
+        ordered = [f for f in candidates if f["id"] not in used] + [f for f in candidates if f["id"] in used]
+
+        for food in ordered:
+            if remaining < food["calories"] * MIN_PORTION_G / 100:
+                break
+            grams = round(min(remaining / food["calories"] * 100, food["max_portion_g"]))
+            items.append((food, grams))
+            used.add(food["id"])
+            remaining -= food["calories"] * grams / 100
+            if len(items) == 2:
+                break
+
+        return items
+
+    @staticmethod
+    def _bounded_fit(systems, targets, lower, upper):
+        """
+        Solve batched box-bounded least-squares portion problems exactly.
+
+        The optimum of a box-bounded least-squares problem is the
+        unconstrained fit of its free foods once the others are held at a
+        bound, so every assignment of minimum, maximum or free to each food
+        is solved and the best in-bounds fit kept.
+
+        Args:
+            systems (ndarray): (problems, macros, foods) calorie-weighted macros per gram
+            targets (ndarray): Calorie-weighted macro targets
+            lower (ndarray): (problems, foods) minimum portions in grams
+            upper (ndarray): (problems, foods) maximum portions in grams
+
+        Returns:
+            ndarray: (problems, foods) optimal portions in grams
+        """
+        problems, _, foods = systems.shape
+        best = np.clip((lower + upper) / 2, lower, upper)
+        best_cost = np.full(problems, np.inf)
+        pending = np.arange(problems)
+
+        # All foods free first: problems whose unconstrained fit is in bounds are solved
+        patterns = sorted(itertools.product((AT_MIN, AT_MAX, FREE), repeat=foods), key=lambda p: -p.count(FREE))
+        for pattern in patterns:
+            pattern = np.array(pattern)
+            free = pattern == FREE
+            subset, low, high = systems[pending], lower[pending], upper[pending]
+            portions = np.where(pattern == AT_MIN, low, high)
+            if free.any():
+                portions[:, free] = 0
+                rest = targets - np.einsum('kij,kj->ki', subset, portions)
+                # Normal equations with a tiny ridge: the minimum-norm fit, also for more foods than macros
+                free_systems = subset[:, :, free]
+                transposed = free_systems.transpose(0, 2, 1)
+                gram = transposed @ free_systems + FIT_RIDGE * np.eye(int(free.sum()))
+                portions[:, free] = np.linalg.solve(gram, transposed @ rest[:, :, None])[:, :, 0]
+            in_bounds = np.all((portions >= low - 1e-6) & (portions <= high + 1e-6), axis=1)
+            cost = np.where(in_bounds, np.sum((np.einsum('kij,kj->ki', subset, portions) - targets) ** 2, axis=1), np.inf)
+            better = cost < best_cost[pending]
+            best[pending[better]] = portions[better]
+            best_cost[pending[better]] = cost[better]
+            if free.all():
+                pending = pending[~in_bounds]
+                if not pending.size:
+                    break
+
+        return np.clip(best, lower, upper)
+
+    def _solve_meal(self, targets, candidates, used):
+        """
+        Choose foods and portions that hit the macro targets of one meal.
+
+        Every combination of three candidate foods gets its portions from an
+        exact bounded least-squares fit (calorie-weighted, each portion
+        between MIN_PORTION_G and the food's maximum) in one batched solve,
+        and the combination with the best miss and preference score is kept.
+        While the miss exceeds MISS_TOLERANCE_KCAL, e.g. for high calorie
+        targets the portion limits cannot reach with three foods, the food
+        that improves the fit most is added, up to MAX_ITEMS_PER_MEAL.
+
+        Args:
+            targets (ndarray): Protein, carbs and fat targets in grams
+            candidates (list): Candidate food entries
+            used (set): Food ids already used today, updated in place
+
+        Returns:
+            list: (food, grams) pairs
+        """
+        if len(candidates) < ITEMS_PER_MEAL:
+            logger.warning(f"Only {len(candidates)} candidate foods available for a meal")
+            return []
+
+        per_gram = np.array([[food[m] / 100 for m in MACROS] for food in candidates]) * CALORIES_PER_GRAM
+        weighted_targets = targets * CALORIES_PER_GRAM
+        upper = np.array([food["max_portion_g"] for food in candidates])
+
+        # Preferences: regional dishes, variety across meals, at least one staple
+        regional = np.array([food["cuisine"] != "Common" for food in candidates])
+        repeated = np.array([food["id"] in used for food in candidates])
+        side_only = np.array([food["slots"] == ("side",) for food in candidates])
+
+        def score(combos):
+            # Macros (rows) by foods (columns) for every combination
+            systems = per_gram[combos].transpose(0, 2, 1)
+            bounds = upper[combos]
+            portions = self._bounded_fit(systems, weighted_targets, np.full(bounds.shape, float(MIN_PORTION_G)), bounds)
+            miss = np.abs(np.einsum('kij,kj->ki', systems, portions) - weighted_targets).sum(axis=1)
+            preference = (
+                10 * repeated[combos].sum(axis=1)
+                - 3 * regional[combos].sum(axis=1)
+                + 25 * side_only[combos].all(axis=1)
+                + (portions / bounds).sum(axis=1)
+            )
+            best = int(np.argmin(miss * 100 + preference))
+            return combos[best], portions[best], miss[best]
+
+        combo, portions, miss = score(np.array(list(itertools.combinations(range(len(candidates)), ITEMS_PER_MEAL))))
+        while miss > MISS_TOLERANCE_KCAL and len(combo) < MAX_ITEMS_PER_MEAL:
+            extra = np.setdiff1d(np.arange(len(candidates)), combo)
+            if not extra.size:
+                break
+            extended = np.column_stack([np.tile(combo, (extra.size, 1)), extra])
+            next_combo, next_portions, next_miss = score(extended)
+            if next_miss >= miss - 1:
+                break
+            combo, portions, miss = next_combo, next_portions, next_miss
+
+        if miss > MISS_TOLERANCE_KCAL:
+            logger.info(f"No exact portion solution for meal, closest miss {miss:.0f} kcal")
+
+        items = []
+        for food_index, grams in zip(combo, portions):
+            food = candidates[food_index]
+            used.add(food["id"])
+            items.append((food, round(float(grams))))
+        return items
+
+    @staticmethod
+    def _item(food, grams):
+        """Build a meal item in the nutrition plan schema."""
+        return {
+            "name": food["name"],
+            "quantity": f"{grams:.0f}g",
+            "calories": round(food["calories"] * grams / 100),
+            "protein": round(food["protein"] * grams / 100, 1),
+            "carbs": round(food["carbs"] * grams / 100, 1),
+            "fat": round(food["fat"] * grams / 100, 1),
+        }
+
+    @staticmethod
+    def summarize_meal(items):
+        """
+        Wrap items in a meal entry with recomputed totals.
+
+        Args:
+            items (list): Meal items
+
+        Returns:
+            dict: Meal in the nutrition plan schema
+        """
+        return {
+            "calories": round(sum(item.get("calories") or 0 for item in items)),
+            "items": items,
+            "total_protein": round(sum(item.get("protein") or 0 for item in items), 1),
+            "total_carbs": round(sum(item.get("carbs") or 0 for item in items), 1),
+            "total_fat": round(sum(item.get("fat") or 0 for item in items), 1),
+        }
+
+    @staticmethod
+    def summarize_day(meals):
+        """
+        Compute daily calories and macros from the meals.
+
+        Args:
+            meals (dict): Meals in the nutrition plan schema
+
+        Returns:
+            tuple: (daily_calories, macros)
+        """
+        daily_calories = round(sum(meal.get("calories") or 0 for meal in meals.values()))
+        macros = {
+            "protein": round(sum(meal.get("total_protein") or 0 for meal in meals.values()), 1),
+            "carbs": round(sum(meal.get("total_carbs") or 0 for meal in meals.values()), 1),
+            "fat": round(sum(meal.get("total_fat") or 0 for meal in meals.values()), 1),
+        }
+        return daily_calories, macros
+
+    @staticmethod
+    def _parse_grams(quantity):
+        """Extract a gram amount from a quantity string such as '150g'."""
+        match = re.search(r"(\d+(?:\.\d+)?)\s*(?:g|gm|gms|grams?)\b", str(quantity).lower())
+        return float(match.group(1)) if match else None
+
+    def correct_portions(self, nutrition_plan, meal_calories):
+        """
+        Correct the portions of an AI-generated nutrition plan.
+
+        Items found in the food composition table get their calories and
+        macros recomputed from the table, then every meal is rescaled to its
+        calorie target and all totals are recomputed.
+
+        Args:
+            nutrition_plan (dict): Nutrition plan section with "meals"
+            meal_calories (dict): Calorie target per meal
+
+        Returns:
+            dict: Corrected copy of the nutrition plan section
+        """
+        corrected = copy.deepcopy(nutrition_plan)
+        meals = corrected.get("meals", {})
+
+        for meal_name, meal in meals.items():
+            items = meal.get("items", [])
+            max_portions = []
+            for item in items:
+                food = self.food_table.match(item.get("name")) if self.food_table else None
+                grams = self._parse_grams(item.get("quantity"))
+                if food and grams:
+                    name = item.get("name")
+                    item.update(self._item(food, grams))
+                    item["name"] = name
+                max_portions.append(food["max_portion_g"] if food and grams else None)
+
+            actual = sum(item.get("calories") or 0 for item in items)
+            target = meal_calories.get(meal_name)
+            if target and actual > 0:
+                self._scale_items(items, target, max_portions)
+
+            meals[meal_name] = self.summarize_meal(items)
+
+        corrected["daily_calories"], corrected["macros"] = self.summarize_day(meals)
+        return corrected
+
+    def _scale_items(self, items, target, max_portions):
+        """
+        Scale item portions and nutrient values in place to a meal calorie target.
+
+        Items are held to their maximum portion; the calories a held item
+        cannot take are spread over the items that still have room.
+
+        Args:
+            items (list): Meal items
+            target (float): Calorie target for the meal
+            max_portions (list): Maximum grams per item, None where unknown
+        """
+        grams = [self._parse_grams(item.get("quantity")) for item in items]
+        factors = [None] * len(items)
+        free = [i for i, item in enumerate(items) if item.get("calories")]
+        remaining = target
+        factor = 1.0
+
+        while free:
+            factor = max(remaining, 0) / sum(items[i]["calories"] for i in free)
+            held = [i for i in free if max_portions[i] and grams[i] * factor > max_portions[i]]
+            if not held:
+                break
+            for i in held:
+                factors[i] = max_portions[i] / grams[i]
+                remaining -= items[i]["calories"] * factors[i]
+            free = [i for i in free if i not in held]
+
+        for i, item in enumerate(items):
+            item_factor = factor if factors[i] is None else factors[i]
+            if grams[i]:
+                item["quantity"] = f"{grams[i] * item_factor:.0f}g"
+            elif item.get("quantity"):
+                item["quantity"] = f"{item_factor:.2f} x {item['quantity']}"
+
+            item["calories"] = round((item.get("calories") or 0) * item_factor)
+            for macro in MACROS:
+                item[macro] = round((item.get(macro) or 0) * item_factor, 1)
@@ -1,16 +1,33 @@
+import copy
 import logging
 import json
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from config import PromptManager
+from data import FoodTable
+from models.meal_builder import MealBuilder
+from models.plan_repair import CALORIE_TOLERANCE
+from utils import FitnessCalculator, profile_for_preferences, submit_in_context
 
 logger = logging.getLogger(__name__)
 
+# Output budget for a single regenerated meal
+MEAL_MAX_TOKENS = 600
+
 class NutritionModel:
     """Model for generating personalized nutrition plans."""
 
-    def __init__(self):
-        """Initialize the nutrition model."""
+    def __init__(self, food_data=None):
+        """
+        Initialize the nutrition model.
+        
+        Args:
+            food_data (DataFrame, optional): Food composition table for local meal building
+        """
         self.prompt_manager = PromptManager()
+        self.food_table = FoodTable(food_data) if food_data is not None else None
+        self.meal_builder = MealBuilder(self.food_table)
+        self.calculator = FitnessCalculator()
 
         # Standard calorie values per gram
         self.calories_per_gram = {
@@ -39,33 +56,7 @@ class NutritionModel:
         Returns:
             dict: Macronutrient targets in grams
         """
-        # Determine macronutrient percentages based on activity level
-        if activity_level.lower() in ["sedentary", "lightly active", "moderately active"]:
-            protein_pct = 0.30
-            carbs_pct = 0.45
-            fat_pct = 0.25
-        else:
-            protein_pct = 0.30
-            carbs_pct = 0.50
-            fat_pct = 0.20
-
-        # Calculate grams for each macronutrient
-        protein_calories = daily_calories * protein_pct
-        carbs_calories = daily_calories * carbs_pct
-        fat_calories = daily_calories * fat_pct
-
-        protein_grams = round(protein_calories / self.calories_per_gram["protein"], 1)
-        carbs_grams = round(carbs_calories / self.calories_per_gram["carbs"], 1)
-        fat_grams = round(fat_calories / self.calories_per_gram["fat"], 1)
-
-        return {
-            "protein": protein_grams,
-            "carbs": carbs_grams,
-            "fat": fat_grams,
-            "protein_pct": round(protein_pct * 100),
-            "carbs_pct": round(carbs_pct * 100),
-            "fat_pct": round(fat_pct * 100)
-        }
+        return self.calculator.calculate_macro_targets(daily_calories, activity_level)
 
     def calculate_meal_calories(self, daily_calories):
         """
@@ -83,50 +74,312 @@ class NutritionModel:
 
         return meal_calories
 
-    def generate_nutrition_plan(self, user_preferences, ai_service):
+    def build_local_nutrition_plan(self, user_preferences):
+        """
+        Build a nutrition plan offline from the food composition table.
+        
+        Args:
+            user_preferences (dict): User preferences and information
+            
+        Returns:
+            dict: Nutrition plan data or error information
+        """
         try:
-            # Calculate macro distribution
-            macros = self.calculate_macro_targets(
-                user_preferences['target_daily_intake'],
-                user_preferences['activity_level']
-            )
+            if self.food_table is None:
+                return {"error": "Food composition data not available"}
+
+            meal_calories = self.calculate_meal_calories(user_preferences['target_daily_intake'])
+            macro_targets = {
+                "protein": user_preferences["protein_target"],
+                "carbs": user_preferences["carbs_target"],
+                "fat": user_preferences["fat_target"],
+            }
 
-            # Calculate meal distribution
-            meal_calories = self.calculate_meal_calories(
-                user_preferences['target_daily_intake']
+            meals = self.meal_builder.build_day(
+                meal_calories,
+                macro_targets,
+                user_preferences["cusine_type"],
+                user_preferences["dietary_type"]
             )
+            daily_calories, macros = self.meal_builder.summarize_day(meals)
+
+            logger.info(f"Built local nutrition plan with {daily_calories} kcal "
+                       f"for target {user_preferences['target_daily_intake']}")
+            return {
+                "nutrition_plan": {
+                    "strategy": (
+                        f"Portions are calculated from our food composition table so that your "
+                        f"{user_preferences['cusine_type']} meals add up to {daily_calories:,.0f} kcal "
+                        f"with {macros['protein']}g protein, {macros['carbs']}g carbs and {macros['fat']}g fat. "
+                        "Snacks are fruits to keep you full between meals."
+                    ),
+                    "diet_preference": user_preferences["dietary_type"],
+                    "daily_calories": daily_calories,
+                    "meals": meals,
+                    "macros": macros,
+                },
+                "success": True
+            }
 
-            # Add calculated values to user preferences
-            user_preferences['macro_targets'] = macros
-            user_preferences['meal_calories'] = meal_calories
-
-            custom_nutrition_data = {
-                "weight": user_preferences["weight"],
-                "goal_weight": user_preferences["goal_weight"],
-                "daily_maintenance_calories": user_preferences[
-                    "daily_maintenance_calories"
-                ],
-                "target_daily_intake": user_preferences["target_daily_intake"],
-                "protein_target": user_preferences["protein_target"],
-                "carbs_target": user_preferences["carbs_target"],
-                "fat_target": user_preferences["fat_target"],
+        except Exception as e:
+            logger.error(f"Error building local nutrition plan: {e}", exc_info=True)
+            return {"error": f"Error generating nutrition plan: {str(e)}"}
+
+    def correct_portions(self, plan_data, user_preferences):
+        """
+        Correct portions of an AI-generated plan against the food composition table
+        (when available) and rescale each meal to its calorie share.
+        
+        Args:
+            plan_data (dict): Generated nutrition plan
+            user_preferences (dict): User preferences and information
+            
+        Returns:
+            dict: Plan data with corrected nutrition plan
+        """
+        if "nutrition_plan" not in plan_data:
+            return plan_data
+
+        meal_calories = self.calculate_meal_calories(user_preferences['target_daily_intake'])
+        corrected = dict(plan_data)
+        corrected["nutrition_plan"] = self.meal_builder.correct_portions(
+            plan_data["nutrition_plan"], meal_calories
+        )
+        return corrected
+
+    def calculate_meal_targets(self, meal_name, user_preferences):
+        """
+        Calculate the calorie and macro targets of a single meal.
+        
+        Args:
+            meal_name (str): Meal name, e.g. "Lunch"
+            user_preferences (dict): User preferences and information
+            
+        Returns:
+            dict: Calorie, protein, carbs and fat targets for the meal
+        """
+        share = self.meal_distribution.get(meal_name, 0)
+        return {
+            "calories": round(user_preferences["target_daily_intake"] * share),
+            "protein": round(user_preferences["protein_target"] * share, 1),
+            "carbs": round(user_preferences["carbs_target"] * share, 1),
+            "fat": round(user_preferences["fat_target"] * share, 1),
+        }
+
+    def generate_meal(self, meal_name, user_preferences, ai_service, targets=None, avoid_foods=(),
+                      use_cache=True):
+        """
+        Generate a single meal with a small, targeted prompt.
+        
+        Args:
+            meal_name (str): Meal name, e.g. "Lunch"
+            user_preferences (dict): User preferences and information
+            ai_service (AnthropicService): Service for AI interactions
+            targets (dict, optional): Calorie and macro targets for the meal,
+                defaults to the meal's share of the daily targets
+            avoid_foods (iterable, optional): Food names already used elsewhere
+            use_cache (bool, optional): Whether to reuse a cached response;
+                user-requested regeneration passes False to get a fresh meal
+            
+        Returns:
+            dict: Meal data or error information
+        """
+        try:
+            targets = targets or self.calculate_meal_targets(meal_name, user_preferences)
+            meal_data = {
+                "meal_name": meal_name.replace("_", " "),
+                "meal_calories": targets["calories"],
+                "protein": targets["protein"],
+                "carbs": targets["carbs"],
+                "fat": targets["fat"],
                 "dietary_type": user_preferences["dietary_type"],
                 "cusine_type": user_preferences["cusine_type"],
                 "location": user_preferences["location"],
-                "duration_weeks": user_preferences["duration_weeks"],
+                "avoid_foods": ", ".join(avoid_foods) or "none",
             }
+            system_message = self.prompt_manager.format_section_prompt("meal", meal_data)
+            user_message = f"Please create the {meal_name.replace('_', ' ')} only."
 
-            # Get nutrition-specific prompt
-            system_message = self.prompt_manager.format_nutrition_prompt(
-                user_preferences, custom_nutrition_data
-            )
+            logger.info(f"Generating meal {meal_name} with target {targets['calories']} kcal")
 
-            # Create user message
-            user_message = (
-                "Please create a personalized NUTRITION PLAN ONLY based on these "
-                f"{json.dumps(user_preferences)} user preferences. Focus exclusively on meal planning and macronutrient distribution. "
-                "Do not include any workout or exercise information."
+            response = ai_service.send_message(
+                system_message=system_message,
+                user_message=user_message,
+                use_cache=use_cache,
+                max_tokens=MEAL_MAX_TOKENS,
             )
+            if not response.get("success", False):
+                logger.error(f"Meal generation error: {response.get('error', 'Unknown error')}")
+            return response
+
+        except Exception as e:
+            logger.error(f"Error generating meal: {e}", exc_info=True)
+            return {"error": f"Error generating meal: {str(e)}"}
+
+    def generate_meal_plan(self, user_preferences, ai_service):
+        """
+        Generate the nutrition plan as one small request per meal, sent concurrently.
+
+        Each meal gets its calorie slice and macro share of the daily targets.
+        The meals are merged with recomputed totals and rescaled when the day
+        drifts from the calorie target; meals that failed are left out for the
+        repair stage to re-prompt.
+
+        Args:
+            user_preferences (dict): User preferences and information
+            ai_service (AnthropicService): Service for AI interactions, which
+                bounds how many requests are in flight
+
+        Returns:
+            dict: Nutrition plan data or error information
+        """
+        try:
+            meal_names = list(self.meal_distribution)
+            logger.info(f"Generating {len(meal_names)} meals concurrently for target "
+                       f"{user_preferences['target_daily_intake']} kcal")
+
+            with ThreadPoolExecutor(max_workers=len(meal_names)) as executor:
+                futures = {
+                    meal_name: submit_in_context(executor, self.generate_meal, meal_name, user_preferences, ai_service)
+                    for meal_name in meal_names
+                }
+                responses = {meal_name: future.result() for meal_name, future in futures.items()}
+
+            meals = {}
+            for meal_name, response in responses.items():
+                if not response.get("success", False) or not response.get("items"):
+                    logger.warning(f"Meal {meal_name} failed: {response.get('error', 'no items returned')}")
+                    continue
+                meals[meal_name] = self.meal_builder.summarize_meal(copy.deepcopy(response["items"]))
+
+            if not meals:
+                return {"error": "Error generating nutrition plan: no meal could be generated"}
+
+            nutrition_plan = {
+                "strategy": (
+                    f"Each meal is planned to its own share of your {user_preferences['target_daily_intake']:,.0f} kcal "
+                    f"target, with {user_preferences['cusine_type']} dishes suited to a "
+                    f"{user_preferences['dietary_type'].lower()} diet."
+                ),
+                "diet_preference": user_preferences["dietary_type"],
+                "meals": meals,
+            }
+            nutrition_plan["daily_calories"], nutrition_plan["macros"] = self.meal_builder.summarize_day(meals)
+
+            # Consistency check on the merged day
+            target = user_preferences["target_daily_intake"]
+            if len(meals) == len(meal_names) and target:
+                deviation = abs(nutrition_plan["daily_calories"] - target) / target
+                if deviation > CALORIE_TOLERANCE:
+                    logger.info(f"Merged meals are {deviation:.1%} off the calorie target, rescaling portions")
+                    nutrition_plan = self.meal_builder.correct_portions(
+                        nutrition_plan, self.calculate_meal_calories(target)
+                    )
+
+            logger.info(f"Merged {len(meals)}/{len(meal_names)} meals into {nutrition_plan['daily_calories']} kcal")
+            return {"nutrition_plan": nutrition_plan, "success": True}
+
+        except Exception as e:
+            logger.error(f"Error generating meal plan: {e}", exc_info=True)
+            return {"error": f"Error generating nutrition plan: {str(e)}"}
+
+    def build_nutrition_request(self, user_preferences):
+        """
+        Build the AI request for the nutrition plan without sending it.
+        
+        Args:
+            user_preferences (dict): User preferences and information
+            
+        Returns:
+            dict: Request with system_message, user_message and max_tokens
+        """
+        # Macro targets come from the shared derived profile, so both prompts agree
+        macros = profile_for_preferences(user_preferences).macro_targets
+
+        # Calculate meal distribution
+        meal_calories = self.calculate_meal_calories(
+            user_preferences['target_daily_intake']
+        )
+
+        # Add calculated values to this stage's own copy of the preferences;
+        # the shared preferences are read by the workout stage at the same time
+        nutrition_preferences = {
+            **user_preferences,
+            'macro_targets': macros,
+            'meal_calories': meal_calories,
+        }
+
+        custom_nutrition_data = {
+            "weight": user_preferences["weight"],
+            "goal_weight": user_preferences["goal_weight"],
+            "daily_maintenance_calories": user_preferences[
+                "daily_maintenance_calories"
+            ],
+            "target_daily_intake": user_preferences["target_daily_intake"],
+            "protein_target": user_preferences["protein_target"],
+            "carbs_target": user_preferences["carbs_target"],
+            "fat_target": user_preferences["fat_target"],
+            "dietary_type": user_preferences["dietary_type"],
+            "cusine_type": user_preferences["cusine_type"],
+            "location": user_preferences["location"],
+            "duration_weeks": user_preferences["duration_weeks"],
+        }
+
+        # Get nutrition-specific prompt
+        system_message = self.prompt_manager.format_nutrition_prompt(
+            nutrition_preferences, custom_nutrition_data
+        )
+
+        # Create user message
+        user_message = (
+            "Please create a personalized NUTRITION PLAN ONLY based on these "
+            f"{json.dumps(nutrition_preferences)} user preferences. Focus exclusively on meal planning and macronutrient distribution. "
+            "Do not include any workout or exercise information."
+        )
+        return {
+            "system_message": system_message,
+            "user_message": user_message,
+            "max_tokens": 2500,
+        }
+
+    def complete_nutrition_plan(self, response):
+        """
+        Check the parsed AI response for the nutrition plan.
+        
+        Args:
+            response (dict): Parsed AI response
+            
+        Returns:
+            dict: Nutrition plan data or error information
+        """
+        if not response.get("success", False):
+            logger.error(f"Nutrition plan generation error: {response.get('error', 'Unknown error')}")
+            return response
+
+        logger.info("Successfully generated nutrition plan")
+        return response
+
+    def generate_nutrition_plan(self, user_preferences, ai_service, mode="ai"):
+        """
+        Generate only the nutrition portion of the plan.
+        
+        Args:
+            user_preferences (dict): User preferences and information
+            ai_service (AnthropicService): Service for AI interactions
+            mode (str, optional): "ai" to ask the AI for the plan,
+                "local" to build it offline from the food composition table,
+                "meals" to ask for each meal separately and concurrently
+            
+        Returns:
+            dict: Nutrition plan data or error information
+        """
+        if mode == "local":
+            return self.build_local_nutrition_plan(user_preferences)
+        if mode == "meals":
+            return self.generate_meal_plan(user_preferences, ai_service)
+
+        try:
+            request = self.build_nutrition_request(user_preferences)
 
             # Log the request
             logger.info(f"Generating nutrition plan for user with diet preference {user_preferences['dietary_type']}, " 
@@ -134,16 +387,11 @@ class NutritionModel:
 
             # Get response from AI service
             response = ai_service.send_message(
-                system_message=system_message,
-                user_message=user_message,
+                system_message=request["system_message"],
+                user_message=request["user_message"],
+                max_tokens=request["max_tokens"],
             )
-            # Check for errors
-            if not response.get("success", False):
-                logger.error(f"Nutrition plan generation error: {response.get('error', 'Unknown error')}")
-                return response
-
-            logger.info("Successfully generated nutrition plan")
-            return response
+            return self.complete_nutrition_plan(response)
 
         except Exception as e:
             logger.error(f"Error generating nutrition plan: {e}", exc_info=True)
@@ -0,0 +1,165 @@
+"""
+Stage scheduler for plan generation.
+Runs the plan stages as a dependency graph on a shared, bounded worker pool,
+records per-stage timings and stops the remaining stages on the first failure.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from utils import stage_context, submit_in_context, span, metrics_registry
+
+logger = logging.getLogger(__name__)
+
+STAGE_LATENCY = metrics_registry.histogram(
+    "plan_stage_seconds", "Plan generation stage latency", ("stage",))
+STAGE_FAILURES = metrics_registry.counter(
+    "plan_stage_failures_total", "Plan generation stages that raised or returned an error", ("stage",))
+
+DEFAULT_MAX_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor(max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Get the worker pool shared by all planners in this process.
+
+    The pool is created on first use; later calls reuse it regardless of
+    the requested size.
+
+    Args:
+        max_workers (int): Pool size used when the pool is created
+
+    Returns:
+        ThreadPoolExecutor: Shared worker pool
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan-stage")
+            logger.info(f"Started plan worker pool with {max_workers} workers")
+        return _executor
+
+class Stage:
+    """A named unit of work with the stages it depends on."""
+
+    def __init__(self, name, func, deps=()):
+        """
+        Initialize the stage.
+
+        Args:
+            name (str): Stage name
+            func (callable): Called with a dict of dependency outputs by name
+            deps (iterable): Names of the stages whose outputs are needed
+        """
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+class StagePipeline:
+    """Schedules stages on the shared pool as soon as their inputs are ready."""
+
+    def __init__(self, stages, executor=None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages (list): Stage objects
+            executor (Executor, optional): Pool to run on, the shared pool by default
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        self.executor = executor or get_executor()
+
+    def _required(self, targets, seed):
+        """Collect the stages needed for the targets that are not seeded."""
+        required = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name in required or name in seed:
+                continue
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage: {name}")
+            required.add(name)
+            pending.extend(self.stages[name].deps)
+        return required
+
+    def _run_stage(self, stage, inputs):
+        """Run one stage and time it."""
+        with stage_context(stage.name), span(f"stage:{stage.name}"):
+            start = time.perf_counter()
+            result = stage.func(inputs)
+            elapsed = time.perf_counter() - start
+            STAGE_LATENCY.observe(elapsed, stage=stage.name)
+            logger.info(f"Stage {stage.name} finished in {elapsed * 1000:.0f}ms",
+                        extra={"latency_ms": round(elapsed * 1000, 1)})
+        return result, elapsed
+
+    def run(self, targets=None, seed=None):
+        """
+        Run the stages needed to produce the targets.
+
+        A stage fails when it raises or returns a dict with an "error" key;
+        stages that have not started yet are then cancelled and the failure
+        is returned.
+
+        Args:
+            targets (iterable, optional): Stage names to produce, all stages by default
+            seed (dict, optional): Outputs of stages already completed, reused as is
+
+        Returns:
+            tuple: (outputs, timings, error) where outputs maps stage names to
+                results, timings maps stage names to seconds and error is the
+                failing stage's error dict or None
+        """
+        outputs = dict(seed or {})
+        timings = {}
+        required = self._required(targets or list(self.stages), outputs)
+        running = {}
+        error = None
+
+        while required or running:
+            ready = [
+                name for name in required
+                if all(dep in outputs for dep in self.stages[name].deps)
+            ]
+            for name in ready:
+                required.discard(name)
+                stage = self.stages[name]
+                inputs = {dep: outputs[dep] for dep in stage.deps}
+                # Stages log under the request id of the caller
+                future = submit_in_context(self.executor, self._run_stage, stage, inputs)
+                running[future] = name
+
+            if not running:
+                # Remaining stages depend on something that can never complete
+                error = {"error": f"Unresolvable plan stages: {sorted(required)}"}
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    result, elapsed = future.result()
+                except Exception as e:
+                    logger.error(f"Stage {name} failed: {e}", exc_info=True)
+                    result, elapsed = {"error": f"Stage {name} failed: {str(e)}"}, None
+
+                if elapsed is not None:
+                    timings[name] = elapsed
+                if isinstance(result, dict) and "error" in result:
+                    STAGE_FAILURES.inc(stage=name)
+                    error = error or result
+                else:
+                    outputs[name] = result
+
+            if error:
+                # Stages already running cannot be interrupted and finish in the background
+                for future, name in running.items():
+                    if future.cancel():
+                        logger.info(f"Cancelled stage {name}")
+                break
+
+        logger.info("Stage timings: " + ", ".join(f"{name}={secs * 1000:.0f}ms" for name, secs in timings.items()))
+        return outputs, timings, error
@@ -1,79 +1,208 @@
+import copy
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from models import WorkoutModel, NutritionModel
-from utils import FitnessCalculator
+import time
+from data.catalog import MAX_DAILY_WORKOUT_CALORIES
+from models import WorkoutModel, NutritionModel, ProgressionEngine
+from models.pipeline import Stage, StagePipeline, get_executor, DEFAULT_MAX_WORKERS
+from models.plan_repair import PlanRepairer, repair_stats
+from models.preflight import check_request, preflight_stats
+from utils import FitnessCalculator, with_request_context, metrics_registry, plan_profiler, get_request_id
 
 logger = logging.getLogger(__name__)
 
+PLAN_LATENCY = metrics_registry.histogram(
+    "plan_run_seconds", "Plan generation and update latency by generation modes and outcome",
+    ("workout_mode", "nutrition_mode", "outcome"))
+PLANS_IN_FLIGHT = metrics_registry.gauge(
+    "plan_runs_in_flight", "Plan generations and updates currently running")
+
+# Form fields each half of the plan depends on; anything else is recomputed locally
+WORKOUT_INPUT_FIELDS = (
+    "height_cm", "weight", "goal_weight", "time_frame", "age", "gender",
+    "activity_level", "time_constraint", "location", "workout_mode",
+)
+NUTRITION_INPUT_FIELDS = (
+    "height_cm", "weight", "goal_weight", "time_frame", "age", "gender",
+    "activity_level", "location", "diet_preference", "food_type", "nutrition_mode",
+)
+
 class PlanGenerator:
-    def __init__(self, exercise_data=None):
+    def __init__(self, exercise_data=None, workout_mode="full", food_data=None, nutrition_mode="ai",
+                 max_workers=DEFAULT_MAX_WORKERS):
         self.exercise_data = exercise_data
-        self.nutrition_model = NutritionModel()
+        self.workout_mode = workout_mode
+        self.nutrition_mode = nutrition_mode
+        self.nutrition_model = NutritionModel(food_data)
         self.calculator = FitnessCalculator()
-    
-    def generate_plan(self, user_info, ai_service):
+        self.executor = get_executor(max_workers)
+
+    def prepare_preferences(self, user_info):
         """
-        Generate a complete fitness plan with parallel API calls.
-        
+        Derive the user preferences shared by all stages.
+
+        Args:
+            user_info (dict): User information and preferences
+
+        Returns:
+            tuple: (workout_model, user_preferences)
+        """
+        # Initialize workout model with user's weight
+        workout_model = WorkoutModel(
+            weight=user_info["weight"],
+            exercise_data=self.exercise_data
+        )
+
+        # Prepare user preferences
+        user_preferences = workout_model.prepare_user_preferences(
+            height=user_info["height_cm"],
+            weight=user_info["weight"],
+            goal_weight=user_info["goal_weight"],
+            duration_weeks=user_info["time_frame"],
+            location=user_info["location"],
+            diet_preference=user_info["diet_preference"],
+            time_constraint=user_info["time_constraint"],
+            age=user_info["age"],
+            gender=user_info["gender"],
+            activity_level=user_info["activity_level"],
+            food_type=user_info["food_type"]
+        )
+        return workout_model, user_preferences
+
+    def add_progression(self, plan, workout_model, user_preferences):
+        """
+        Attach the locally derived multi-week progression to a plan.
+
+        Args:
+            plan (dict): Combined plan with a base week
+            workout_model (WorkoutModel): Model holding the exercise data
+            user_preferences (dict): User preferences and information
+
+        Returns:
+            dict: Plan whose workout_plan carries a "progression" list
+        """
+        workout_plan = plan.get("workout_plan")
+        if not workout_plan or not workout_plan.get("weekly_plan"):
+            return plan
+        progression = ProgressionEngine(workout_model).build_program(workout_plan["weekly_plan"], user_preferences)
+        # New dicts so a plan reused from session state is not modified
+        return {**plan, "workout_plan": {**workout_plan, "progression": progression}}
+
+    def expected_api_calls(self, seed=None):
+        """
+        Count the API calls a run would make, not counting repairs.
+
+        Args:
+            seed (dict, optional): Stage outputs the run would reuse
+
+        Returns:
+            int: Number of API calls
+        """
+        seed = seed or {}
+        calls = 0
+        if "workout_checked" not in seed:
+            calls += 1
+        if "nutrition_checked" not in seed:
+            if self.nutrition_mode == "ai":
+                calls += 1
+            elif self.nutrition_mode == "meals":
+                calls += len(self.nutrition_model.meal_distribution)
+        return calls
+
+    def build_stages(self, user_info, ai_service, seeded=()):
+        """
+        Build the plan generation stages for one user.
+
+        The stages check the request, derive the metrics, build both
+        prompts, call the AI, parse the responses, validate and repair both
+        plans and combine them. Independent stages run in parallel on the shared pool.
+
         Args:
             user_info (dict): User information and preferences
             ai_service (AnthropicService): Service for AI interactions
-            
+            seeded (iterable): Names of stages whose outputs are reused rather than run
+
         Returns:
-            dict: Complete fitness plan
+            list: Stage objects
         """
-        try:
-            # Initialize workout model with user's weight
-            workout_model = WorkoutModel(
-                weight=user_info["weight"],
-                exercise_data=self.exercise_data
-            )
-            
-            # Prepare user preferences
-            user_preferences = workout_model.prepare_user_preferences(
-                height=user_info["height_cm"],
-                weight=user_info["weight"],
-                goal_weight=user_info["goal_weight"],
-                duration_weeks=user_info["time_frame"],
-                location=user_info["location"],
-                diet_preference=user_info["diet_preference"],
-                time_constraint=user_info["time_constraint"],
-                age=user_info["age"],
-                gender=user_info["gender"],
-                activity_level=user_info["activity_level"],
-                food_type=user_info["food_type"]
+        def preflight(inputs):
+            result = check_request(user_info)
+            if not result["passed"]:
+                messages = "; ".join(reason["message"] for reason in result["reasons"])
+                return {"error": f"Plan request failed pre-flight checks: {messages}", "preflight": result}
+            return result
+
+        def metrics(inputs):
+            workout_model, user_preferences = self.prepare_preferences(user_info)
+            return {"workout_model": workout_model, "user_preferences": user_preferences}
+
+        def workout_request(inputs):
+            if self.exercise_data is None:
+                return {"error": "Exercise data not available"}
+            workout_model = inputs["metrics"]["workout_model"]
+            return workout_model.build_workout_request(inputs["metrics"]["user_preferences"], self.workout_mode)
+
+        def nutrition_request(inputs):
+            if self.nutrition_mode in ("local", "meals"):
+                # Built locally or fanned out per meal in the response stage
+                return None
+            return self.nutrition_model.build_nutrition_request(inputs["metrics"]["user_preferences"])
+
+        def workout_response(inputs):
+            request = inputs["workout_request"]
+            logger.info(f"Generating workout plan ({self.workout_mode})")
+            return ai_service.send_message(
+                system_message=request["system_message"],
+                user_message=request["user_message"],
+                max_tokens=request["max_tokens"],
             )
-            # Use ThreadPoolExecutor for parallel API calls
-            with ThreadPoolExecutor(max_workers=2) as executor:
-                # Submit both API calls in parallel
-                workout_future = executor.submit(
-                    workout_model.generate_workout_plan,
-                    user_preferences,
-                    ai_service
+
+        def nutrition_response(inputs):
+            request = inputs["nutrition_request"]
+            if request is None:
+                return self.nutrition_model.generate_nutrition_plan(
+                    inputs["metrics"]["user_preferences"], ai_service, self.nutrition_mode
                 )
-                
-                nutrition_future = executor.submit(
-                    self.nutrition_model.generate_nutrition_plan,
-                    user_preferences,
-                    ai_service
+            logger.info(f"Generating nutrition plan ({self.nutrition_mode})")
+            return ai_service.send_message(
+                system_message=request["system_message"],
+                user_message=request["user_message"],
+                max_tokens=request["max_tokens"],
+            )
+
+        def workout_plan(inputs):
+            return inputs["metrics"]["workout_model"].complete_workout_plan(
+                inputs["workout_response"], inputs["metrics"]["user_preferences"], inputs["workout_request"]
+            )
+
+        def nutrition_plan(inputs):
+            return self.nutrition_model.complete_nutrition_plan(inputs["nutrition_response"])
+
+        def workout_checked(inputs):
+            repairer = PlanRepairer(inputs["metrics"]["workout_model"], self.nutrition_model, self.workout_mode)
+            return repairer.repair_workout(inputs["workout_plan"], inputs["metrics"]["user_preferences"], ai_service)
+
+        def nutrition_checked(inputs):
+            repairer = PlanRepairer(inputs["metrics"]["workout_model"], self.nutrition_model)
+            return repairer.repair_nutrition(inputs["nutrition_plan"], inputs["metrics"]["user_preferences"], ai_service)
+
+        def combined(inputs):
+            user_preferences = inputs["metrics"]["user_preferences"]
+            workout, workout_repaired, workout_reprompts, workout_failures = inputs["workout_checked"]
+            nutrition, nutrition_repaired, nutrition_reprompts, nutrition_failures = inputs["nutrition_checked"]
+            # A plan whose halves were both reused was not checked in this run
+            if not {"workout_checked", "nutrition_checked"}.issubset(seeded):
+                repair_stats.record(
+                    repaired=workout_repaired or nutrition_repaired,
+                    reprompted_sections=workout_reprompts + nutrition_reprompts,
+                    failed_sections=workout_failures + nutrition_failures
                 )
-                
-                # Wait for both to complete
-                workout_plan = workout_future.result()
-                nutrition_plan = nutrition_future.result()
-            
-            # Check for errors
-            if "error" in workout_plan:
-                logger.error(f"Failed to generate workout plan: {workout_plan['error']}")
-                return workout_plan
-                
-            if "error" in nutrition_plan:
-                logger.error(f"Failed to generate nutrition plan: {nutrition_plan['error']}")
-                return nutrition_plan
-                
+                repairer = PlanRepairer(inputs["metrics"]["workout_model"], self.nutrition_model)
+                repairer.log_remaining_issues(workout, nutrition, user_preferences)
+                logger.info(f"Plan repair stats: {repair_stats.rates()}")
+
             # Combine plans
-            combined_plan = self.nutrition_model.combine_plans(workout_plan, nutrition_plan)
-            logger.info("Successfully generated complete fitness plan using parallel processing")
+            combined_plan = self.nutrition_model.combine_plans(workout, nutrition)
+            combined_plan = self.add_progression(combined_plan, inputs["metrics"]["workout_model"], user_preferences)
             combined_plan['weight_loss_calculation'] = {
                     'total_calories_to_burn': user_preferences.get('total_calories_to_burn'),
                     'daily_calorie_deficit': user_preferences.get('daily_calorie_deficit'),
@@ -85,128 +214,337 @@ class PlanGenerator:
                 'diet_calorie_deficit': user_preferences.get('diet_portion_calories'),
                 'target_daily_intake': user_preferences.get('target_daily_intake'),
             }
+            combined_plan['plan_inputs'] = self.plan_inputs(user_info)
+            return combined_plan
+
+        return [
+            Stage("preflight", preflight),
+            Stage("metrics", metrics, ["preflight"]),
+            Stage("workout_request", workout_request, ["metrics"]),
+            Stage("nutrition_request", nutrition_request, ["metrics"]),
+            Stage("workout_response", workout_response, ["workout_request"]),
+            Stage("nutrition_response", nutrition_response, ["nutrition_request", "metrics"]),
+            Stage("workout_plan", workout_plan, ["metrics", "workout_request", "workout_response"]),
+            Stage("nutrition_plan", nutrition_plan, ["nutrition_response"]),
+            Stage("workout_checked", workout_checked, ["metrics", "workout_plan"]),
+            Stage("nutrition_checked", nutrition_checked, ["metrics", "nutrition_plan"]),
+            Stage("combined", combined, ["metrics", "workout_checked", "nutrition_checked"]),
+        ]
+
+    def plan_inputs(self, user_info):
+        """
+        Capture the inputs a plan is built from.
+
+        Args:
+            user_info (dict): User information and preferences
+
+        Returns:
+            dict: Input field values, including the generation modes
+        """
+        inputs = {"workout_mode": self.workout_mode, "nutrition_mode": self.nutrition_mode}
+        for field in WORKOUT_INPUT_FIELDS + NUTRITION_INPUT_FIELDS:
+            if field in user_info:
+                inputs[field] = user_info[field]
+        return inputs
+
+    def changed_fields(self, user_info, current_plan):
+        """
+        Diff the current form values against the inputs of an existing plan.
+
+        Args:
+            user_info (dict): User information and preferences
+            current_plan (dict): Plan previously returned by this generator
+
+        Returns:
+            set: Names of the input fields that changed
+        """
+        previous = current_plan.get("plan_inputs", {})
+        current = self.plan_inputs(user_info)
+        return {field for field, value in current.items() if previous.get(field) != value}
+
+    @with_request_context
+    def update_plan(self, user_info, current_plan, ai_service):
+        """
+        Bring an existing plan in line with changed form values.
+
+        Only the halves of the plan whose input fields changed are
+        regenerated; when neither did, the calorie targets and summaries are
+        recomputed locally without any API call.
+
+        Args:
+            user_info (dict): User information and preferences
+            current_plan (dict, optional): Plan currently shown to the user
+            ai_service (AnthropicService): Service for AI interactions
+
+        Returns:
+            dict: Updated complete plan
+        """
+        if not current_plan or "error" in current_plan or "plan_inputs" not in current_plan:
+            return self.generate_plan(user_info, ai_service)
+
+        changed = self.changed_fields(user_info, current_plan)
+        workout_stale = bool(changed.intersection(WORKOUT_INPUT_FIELDS))
+        nutrition_stale = bool(changed.intersection(NUTRITION_INPUT_FIELDS))
+        logger.info(f"Plan inputs changed: {sorted(changed) or 'none'}; "
+                    f"workout stale: {workout_stale}, nutrition stale: {nutrition_stale}")
+
+        if workout_stale and nutrition_stale:
+            return self.generate_plan(user_info, ai_service)
+        if workout_stale:
+            return self.regenerate_workout_plan(user_info, current_plan, ai_service)
+        if nutrition_stale:
+            return self.regenerate_nutrition_plan(user_info, current_plan, ai_service)
+
+        try:
+            # Reuse both halves and only recompute the local numbers
+            seed = {
+                "workout_checked": ({
+                    "user_profile": current_plan.get("user_profile", {}),
+                    "workout_plan": current_plan.get("workout_plan", {})
+                }, False, 0, 0),
+                "nutrition_checked": ({"nutrition_plan": current_plan.get("nutrition_plan", {})}, False, 0, 0),
+            }
+            return self.run_stages(user_info, ai_service, seed)
+
+        except Exception as e:
+            logger.error(f"Error updating plan: {e}", exc_info=True)
+            return {"error": f"Failed to update fitness plan: {str(e)}"}
+
+    def run_stages(self, user_info, ai_service, seed=None):
+        """
+        Run the stage graph up to the combined plan.
+
+        Args:
+            user_info (dict): User information and preferences
+            ai_service (AnthropicService): Service for AI interactions
+            seed (dict, optional): Stage outputs to reuse instead of recomputing
+
+        Returns:
+            dict: Combined plan or error information
+        """
+        pipeline = StagePipeline(self.build_stages(user_info, ai_service, set(seed or ())), self.executor)
+        start = time.perf_counter()
+        with PLANS_IN_FLIGHT.track_inprogress(), plan_profiler.profile(get_request_id()):
+            outputs, _, error = pipeline.run(["combined"], seed)
+        rejected = bool(error and "preflight" in error)
+        PLAN_LATENCY.observe(time.perf_counter() - start, workout_mode=self.workout_mode,
+                             nutrition_mode=self.nutrition_mode,
+                             outcome="rejected" if rejected else "error" if error else "ok")
+        if "preflight" not in (seed or {}):
+            # A seeded pre-flight result was already recorded by the caller
+            preflight_stats.record(rejected, self.expected_api_calls(seed) if rejected else 0)
+        if rejected:
+            logger.info(f"Pre-flight rejected the request: {preflight_stats.summary()}")
+        if error:
+            return error
+        return outputs["combined"]
+
+    @with_request_context
+    def generate_plan(self, user_info, ai_service, preflight=None):
+        """
+        Generate a complete fitness plan with parallel API calls.
+
+        Args:
+            user_info (dict): User information and preferences
+            ai_service (AnthropicService): Service for AI interactions
+            preflight (dict, optional): Passing pre-flight result the caller
+                already checked and recorded; the check is then not repeated
+
+        Returns:
+            dict: Complete fitness plan
+        """
+        try:
+            seed = {"preflight": preflight} if preflight else None
+            combined_plan = self.run_stages(user_info, ai_service, seed)
+            if "error" in combined_plan:
+                logger.error(f"Failed to generate plan: {combined_plan['error']}")
+                return combined_plan
+
+            logger.info("Successfully generated complete fitness plan using parallel processing")
             return combined_plan
-            
+
         except Exception as e:
             logger.error(f"Error generating plan: {e}", exc_info=True)
             return {"error": f"Failed to generate fitness plan: {str(e)}"}
-    
+
+    @with_request_context
     def regenerate_workout_plan(self, user_info, current_plan, ai_service):
         """
         Regenerate only the workout portion of an existing plan.
-        
+
         Args:
             user_info (dict): User information and preferences
             current_plan (dict): Current complete plan
             ai_service (AnthropicService): Service for AI interactions
-            
+
         Returns:
             dict: Updated complete plan
         """
         try:
-            # Initialize workout model with user's weight
-            workout_model = WorkoutModel(
-                weight=user_info["weight"],
-                exercise_data=self.exercise_data
-            )
-            
-            # Prepare user preferences
-            user_preferences = workout_model.prepare_user_preferences(
-                height=user_info["height_cm"],
-                weight=user_info["weight"],
-                goal_weight=user_info["goal_weight"],
-                duration_weeks=user_info["time_frame"],
-                location=user_info["location"],
-                diet_preference=user_info["diet_preference"],
-                time_constraint=user_info["time_constraint"],
-                age=user_info["age"],
-                gender=user_info["gender"],
-                activity_level=user_info["activity_level"],
-                food_type=user_info["food_type"]
-            )
-            
-            # Generate workout plan
             logger.info("Regenerating workout plan...")
-            workout_plan = workout_model.generate_workout_plan(user_preferences, ai_service)
-            
-            # Check for errors in workout plan
-            if "error" in workout_plan:
-                logger.error(f"Failed to regenerate workout plan: {workout_plan['error']}")
-                return workout_plan
-                
-            # Create updated plan (keep existing nutrition plan)
-            updated_plan = self.nutrition_model.combine_plans(
-                workout_plan,
-                {"nutrition_plan": current_plan.get("nutrition_plan", {})}
-            )
-            
+            # Keep the existing nutrition plan as a completed stage
+            seed = {
+                "nutrition_checked": ({"nutrition_plan": current_plan.get("nutrition_plan", {})}, False, 0, 0),
+            }
+            updated_plan = self.run_stages(user_info, ai_service, seed)
+            if "error" in updated_plan:
+                logger.error(f"Failed to regenerate workout plan: {updated_plan['error']}")
+                return updated_plan
+
             logger.info("Successfully regenerated workout plan")
             return updated_plan
-            
+
         except Exception as e:
             logger.error(f"Error regenerating workout plan: {e}", exc_info=True)
             return {"error": f"Failed to regenerate workout plan: {str(e)}"}
-    
+
+    @with_request_context
     def regenerate_nutrition_plan(self, user_info, current_plan, ai_service):
         """
         Regenerate only the nutrition portion of an existing plan.
-        
+
         Args:
             user_info (dict): User information and preferences
             current_plan (dict): Current complete plan
             ai_service (AnthropicService): Service for AI interactions
-            
+
         Returns:
             dict: Updated complete plan
         """
         try:
-            # Initialize workout model to prepare user preferences
-            workout_model = WorkoutModel(
-                weight=user_info["weight"],
-                exercise_data=self.exercise_data
-            )
-            
-            # Prepare user preferences
-            user_preferences = workout_model.prepare_user_preferences(
-                height=user_info["height_cm"],
-                weight=user_info["weight"],
-                goal_weight=user_info["goal_weight"],
-                duration_weeks=user_info["time_frame"],
-                location=user_info["location"],
-                diet_preference=user_info["diet_preference"],
-                time_constraint=user_info["time_constraint"],
-                age=user_info["age"],
-                gender=user_info["gender"],
-                activity_level=user_info["activity_level"],
-                food_type=user_info["food_type"]
-            )
-            
-            # Generate nutrition plan
             logger.info("Regenerating nutrition plan...")
-            nutrition_plan = self.nutrition_model.generate_nutrition_plan(user_preferences, ai_service)
-            
-            # Check for errors in nutrition plan
-            if "error" in nutrition_plan:
-                logger.error(f"Failed to regenerate nutrition plan: {nutrition_plan['error']}")
-                return nutrition_plan
-                
-            # Create a mock workout plan with just the structure components
+            # Keep the existing workout plan as a completed stage
             workout_structure = {
                 "user_profile": current_plan.get("user_profile", {}),
-                "weight_loss_calculation": current_plan.get("weight_loss_calculation", {}),
-                "daily_calorie_intake": current_plan.get("daily_calorie_intake", {}),
                 "workout_plan": current_plan.get("workout_plan", {})
             }
-            
-            # Create updated plan (keep existing workout plan)
-            updated_plan = self.nutrition_model.combine_plans(
-                workout_structure,
-                nutrition_plan
-            )
-            
+            seed = {"workout_checked": (workout_structure, False, 0, 0)}
+            updated_plan = self.run_stages(user_info, ai_service, seed)
+            if "error" in updated_plan:
+                logger.error(f"Failed to regenerate nutrition plan: {updated_plan['error']}")
+                return updated_plan
+
             logger.info("Successfully regenerated nutrition plan")
             return updated_plan
-            
+
         except Exception as e:
             logger.error(f"Error regenerating nutrition plan: {e}", exc_info=True)
-            return {"error": f"Failed to regenerate nutrition plan: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Failed to regenerate nutrition plan: {str(e)}"}
+
+    @with_request_context
+    def regenerate_workout_day(self, current_plan, day, ai_service):
+        """
+        Regenerate a single workout day and splice it into the plan.
+
+        The day's calorie target is whatever the other days leave of the
+        weekly exercise budget, capped at the daily maximum. The new day is
+        held to the time constraint and the daily calorie cap.
+
+        Args:
+            current_plan (dict): Current complete plan
+            day (str): Day of the week to regenerate
+            ai_service (AnthropicService): Service for AI interactions
+
+        Returns:
+            dict: Updated complete plan or error information
+        """
+        try:
+            weekly_plan = current_plan.get("workout_plan", {}).get("weekly_plan", {})
+            if day not in weekly_plan:
+                return {"error": f"No workout planned for {day}"}
+
+            workout_model, user_preferences = self.prepare_preferences(current_plan["plan_inputs"])
+            other_calories = sum(
+                float(info.get("total_calories") or 0) for other, info in weekly_plan.items() if other != day
+            )
+            weekly_budget = user_preferences["exercise_portion_calories"] * len(weekly_plan)
+            calorie_target = min(max(weekly_budget - other_calories, 0), MAX_DAILY_WORKOUT_CALORIES)
+
+            # Plans built from the catalog get a day picked by catalog id and hydrated from it
+            workout_mode = current_plan["plan_inputs"].get("workout_mode", self.workout_mode)
+            day_mode = "ids" if workout_mode in ("ids", "hybrid") else "full"
+
+            logger.info(f"Regenerating workout day {day}...")
+            # Skip the response cache so each click asks for a fresh day
+            response = workout_model.generate_workout_day(
+                day, user_preferences, ai_service, calorie_target, day_mode, use_cache=False
+            )
+            if "error" in response:
+                return response
+            if not response.get("workouts"):
+                return {"error": f"No workouts returned for {day}"}
+
+            # Copy so the cached response stays untouched
+            new_day = {k: v for k, v in copy.deepcopy(response).items() if k != "success"}
+            PlanRepairer(workout_model, self.nutrition_model, workout_mode).repair_day(new_day, user_preferences)
+
+            updated_plan = copy.deepcopy(current_plan)
+            updated_plan["workout_plan"]["weekly_plan"][day] = new_day
+            updated_plan = self.add_progression(updated_plan, workout_model, user_preferences)
+            logger.info(f"Successfully regenerated workout day {day}")
+            return updated_plan
+
+        except Exception as e:
+            logger.error(f"Error regenerating workout day: {e}", exc_info=True)
+            return {"error": f"Failed to regenerate {day}: {str(e)}"}
+
+    @with_request_context
+    def regenerate_meal(self, current_plan, meal_name, ai_service):
+        """
+        Regenerate a single meal and splice it into the plan.
+
+        The meal's targets are the daily calories and macros left after the
+        other meals, and foods used in the other meals are avoided.
+
+        Args:
+            current_plan (dict): Current complete plan
+            meal_name (str): Meal to regenerate, e.g. "Lunch"
+            ai_service (AnthropicService): Service for AI interactions
+
+        Returns:
+            dict: Updated complete plan or error information
+        """
+        try:
+            meals = current_plan.get("nutrition_plan", {}).get("meals", {})
+            if meal_name not in meals:
+                return {"error": f"No {meal_name.replace('_', ' ')} in the meal plan"}
+
+            _, user_preferences = self.prepare_preferences(current_plan["plan_inputs"])
+            builder = self.nutrition_model.meal_builder
+            other_meals = {name: meal for name, meal in meals.items() if name != meal_name}
+            other_calories, other_macros = builder.summarize_day(other_meals)
+            targets = {
+                "calories": max(round(user_preferences["target_daily_intake"] - other_calories), 0),
+                "protein": max(round(user_preferences["protein_target"] - other_macros["protein"], 1), 0),
+                "carbs": max(round(user_preferences["carbs_target"] - other_macros["carbs"], 1), 0),
+                "fat": max(round(user_preferences["fat_target"] - other_macros["fat"], 1), 0),
+            }
+            avoid_foods = list(dict.fromkeys(
+                item.get("name") for meal in other_meals.values() for item in meal.get("items", [])
+            ))
+
+            logger.info(f"Regenerating meal {meal_name}...")
+            # Skip the response cache so each click asks for a fresh meal
+            response = self.nutrition_model.generate_meal(
+                meal_name, user_preferences, ai_service, targets, avoid_foods, use_cache=False
+            )
+            if "error" in response:
+                return response
+            if not response.get("items"):
+                return {"error": f"No items returned for {meal_name.replace('_', ' ')}"}
+
+            # Fix portions against the food table and scale to the remaining calories
+            corrected = builder.correct_portions(
+                {"meals": {meal_name: response}}, {meal_name: targets["calories"]}
+            )
+
+            updated_plan = copy.deepcopy(current_plan)
+            nutrition_plan = updated_plan["nutrition_plan"]
+            nutrition_plan["meals"][meal_name] = corrected["meals"][meal_name]
+            nutrition_plan["daily_calories"], nutrition_plan["macros"] = builder.summarize_day(nutrition_plan["meals"])
+            logger.info(f"Successfully regenerated meal {meal_name}")
+            return updated_plan
+
+        except Exception as e:
+            logger.error(f"Error regenerating meal: {e}", exc_info=True)
+            return {"error": f"Failed to regenerate {meal_name.replace('_', ' ')}: {str(e)}"}
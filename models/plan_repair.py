@@ -0,0 +1,284 @@
+"""
+Validate-and-repair stage for generated plans.
+Fixes what can be fixed deterministically and re-prompts only the
+sections that cannot be repaired locally.
+"""
+import copy
+import logging
+import threading
+from data.catalog import TIME_BUFFER_MINS, MAX_DAILY_WORKOUT_CALORIES
+
+logger = logging.getLogger(__name__)
+
+# A meal plan within this fraction of the calorie target is left as is
+CALORIE_TOLERANCE = 0.02
+
+class RepairStats:
+    """Thread-safe counters for repairs and targeted re-prompts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.plans_checked = 0
+        self.plans_repaired = 0
+        self.plans_reprompted = 0
+        self.sections_reprompted = 0
+        self.reprompt_failures = 0
+
+    def record(self, repaired, reprompted_sections, failed_sections):
+        """
+        Record the outcome of one plan.
+
+        Args:
+            repaired (bool): Whether anything was repaired locally
+            reprompted_sections (int): Sections sent back to the AI
+            failed_sections (int): Re-prompts that did not succeed
+        """
+        with self._lock:
+            self.plans_checked += 1
+            self.plans_repaired += int(repaired)
+            self.plans_reprompted += int(reprompted_sections > 0)
+            self.sections_reprompted += reprompted_sections
+            self.reprompt_failures += failed_sections
+
+    def rates(self):
+        """
+        Get repair and re-prompt rates.
+
+        Returns:
+            dict: Counters and rates per checked plan
+        """
+        with self._lock:
+            checked = self.plans_checked or 1
+            return {
+                "plans_checked": self.plans_checked,
+                "repair_rate": round(self.plans_repaired / checked, 3),
+                "reprompt_rate": round(self.plans_reprompted / checked, 3),
+                "sections_reprompted": self.sections_reprompted,
+                "reprompt_failures": self.reprompt_failures,
+            }
+
+# Shared across planners for the lifetime of the process
+repair_stats = RepairStats()
+
+def _number(value):
+    """Coerce a model-provided number to float, treating junk as 0."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+class PlanRepairer:
+    """Runs the plan validators and repairs failing sections."""
+
+    def __init__(self, workout_model, nutrition_model, workout_mode="full"):
+        """
+        Initialize the repairer.
+
+        Args:
+            workout_model (WorkoutModel): Model used for validation and day re-prompts
+            nutrition_model (NutritionModel): Model used for validation, portion
+                correction and meal re-prompts
+            workout_mode (str): Workout generation mode, so day re-prompts ask
+                for catalog ids in "ids" mode
+        """
+        self.workout_model = workout_model
+        self.nutrition_model = nutrition_model
+        self.workout_mode = workout_mode
+
+    def repair_day(self, day_plan, user_preferences):
+        """
+        Make one day fit the time constraint and the daily calorie cap and
+        recompute its totals.
+
+        Exercises with the lowest calorie efficiency are dropped first; a
+        single remaining exercise that is still too long is shortened and its
+        calories scaled down accordingly. Calories above the cap are taken
+        off the most intense exercises, dropping those that fall entirely
+        within the excess and shortening the last one.
+
+        Args:
+            day_plan (dict): Day entry of the weekly plan, modified in place
+            user_preferences (dict): User preferences and constraints
+
+        Returns:
+            bool: True if anything changed
+        """
+        max_time = user_preferences["time_constraint_in_mins"] + TIME_BUFFER_MINS
+        workouts = day_plan.get("workouts") or []
+        changed = False
+
+        while len(workouts) > 1 and sum(_number(w.get("duration_mins")) for w in workouts) > max_time:
+            least_efficient = min(
+                workouts,
+                key=lambda w: _number(w.get("calories_burned")) / max(_number(w.get("duration_mins")), 1)
+            )
+            workouts.remove(least_efficient)
+            logger.info(f"Dropped {least_efficient.get('name')} to fit the time constraint")
+            changed = True
+
+        if len(workouts) == 1 and _number(workouts[0].get("duration_mins")) > max_time:
+            workout = workouts[0]
+            factor = max_time / _number(workout["duration_mins"])
+            workout["duration_mins"] = max_time
+            workout["calories_burned"] = round(_number(workout.get("calories_burned")) * factor, 1)
+            logger.info(f"Shortened {workout.get('name')} to {max_time} minutes")
+            changed = True
+
+        excess = sum(_number(w.get("calories_burned")) for w in workouts) - MAX_DAILY_WORKOUT_CALORIES
+        for workout in sorted(
+            workouts,
+            key=lambda w: _number(w.get("calories_burned")) / max(_number(w.get("duration_mins")), 1),
+            reverse=True
+        ):
+            if excess <= 0:
+                break
+            calories = _number(workout.get("calories_burned"))
+            if calories <= excess and len(workouts) > 1:
+                workouts.remove(workout)
+                logger.info(f"Dropped {workout.get('name')} to fit the daily calorie cap")
+            else:
+                factor = (calories - excess) / calories
+                workout["duration_mins"] = max(round(_number(workout.get("duration_mins")) * factor), 1)
+                workout["calories_burned"] = round(calories - excess, 1)
+                logger.info(f"Shortened {workout.get('name')} to fit the daily calorie cap")
+            excess -= calories
+            changed = True
+
+        total_time = sum(_number(w.get("duration_mins")) for w in workouts)
+        total_calories = round(sum(_number(w.get("calories_burned")) for w in workouts), 1)
+        if day_plan.get("total_time") != total_time or day_plan.get("total_calories") != total_calories:
+            changed = True
+        day_plan["workouts"] = workouts
+        day_plan["total_time"] = int(total_time) if float(total_time).is_integer() else total_time
+        day_plan["total_calories"] = total_calories
+        return changed
+
+    def repair_workout(self, plan_data, user_preferences, ai_service):
+        """
+        Validate and repair a workout plan.
+
+        Args:
+            plan_data (dict): Generated workout plan
+            user_preferences (dict): User preferences and constraints
+            ai_service (AnthropicService): Service for targeted re-prompts
+
+        Returns:
+            tuple: (plan_data, repaired, reprompted_sections, failed_sections)
+        """
+        # Work on a copy so cached AI responses stay untouched
+        plan_data = copy.deepcopy(plan_data)
+        is_valid, issues = self.workout_model.validate_workout_plan(plan_data, user_preferences)
+        weekly_plan = plan_data.get("workout_plan", {}).get("weekly_plan")
+        if weekly_plan is None:
+            # Nothing to repair section by section
+            logger.warning(f"Workout plan cannot be repaired: {issues}")
+            return plan_data, False, 0, 0
+
+        repaired = False
+        reprompted = failed = 0
+        for day, day_plan in weekly_plan.items():
+            if not day_plan.get("workouts"):
+                reprompted += 1
+                new_day = self.workout_model.generate_workout_day(
+                    day, user_preferences, ai_service, mode=self.workout_mode
+                )
+                if new_day.get("success", False) and new_day.get("workouts"):
+                    # Copy so the cached response stays untouched
+                    new_day = {k: v for k, v in copy.deepcopy(new_day).items() if k != "success"}
+                    day_plan = weekly_plan[day] = new_day
+                else:
+                    failed += 1
+
+            # A day whose re-prompt failed still gets its stale totals cleared
+            repaired = self.repair_day(day_plan, user_preferences) or repaired
+
+        if not is_valid:
+            logger.info(f"Workout plan issues before repair: {issues}")
+        return plan_data, repaired, reprompted, failed
+
+    def repair_nutrition(self, plan_data, user_preferences, ai_service):
+        """
+        Validate and repair a nutrition plan.
+
+        Args:
+            plan_data (dict): Generated nutrition plan
+            user_preferences (dict): User preferences and constraints
+            ai_service (AnthropicService): Service for targeted re-prompts
+
+        Returns:
+            tuple: (plan_data, repaired, reprompted_sections, failed_sections)
+        """
+        plan_data = copy.deepcopy(plan_data)
+        is_valid, issues = self.nutrition_model.validate_nutrition_plan(plan_data, user_preferences)
+        meals = plan_data.get("nutrition_plan", {}).get("meals")
+        if meals is None:
+            logger.warning(f"Nutrition plan cannot be repaired: {issues}")
+            return plan_data, False, 0, 0
+
+        reprompted = failed = 0
+        used_foods = [item.get("name") for meal in meals.values() for item in meal.get("items", [])]
+        for meal_name in self.nutrition_model.meal_distribution:
+            if meals.get(meal_name, {}).get("items"):
+                continue
+            reprompted += 1
+            new_meal = self.nutrition_model.generate_meal(
+                meal_name, user_preferences, ai_service, avoid_foods=used_foods
+            )
+            if not new_meal.get("success", False) or not new_meal.get("items"):
+                failed += 1
+                continue
+            # Copy so the cached response stays untouched
+            meals[meal_name] = {k: v for k, v in copy.deepcopy(new_meal).items() if k != "success"}
+
+        # Judge the calories the items actually add up to, not the stated totals
+        target = user_preferences["target_daily_intake"]
+        actual = sum(_number(item.get("calories")) for meal in meals.values() for item in meal.get("items", []))
+        needs_rescale = bool(target) and abs(actual - target) / target > CALORIE_TOLERANCE
+
+        if needs_rescale or reprompted:
+            corrected = self.nutrition_model.correct_portions(plan_data, user_preferences)
+        else:
+            corrected = self.recompute_nutrition_totals(plan_data)
+        repaired = corrected["nutrition_plan"] != plan_data["nutrition_plan"]
+
+        if not is_valid:
+            logger.info(f"Nutrition plan issues before repair: {issues}")
+        return corrected, repaired, reprompted, failed
+
+    def recompute_nutrition_totals(self, plan_data):
+        """
+        Recompute meal and daily totals from the items without rescaling.
+
+        Args:
+            plan_data (dict): Generated nutrition plan
+
+        Returns:
+            dict: Copy of the plan with consistent totals
+        """
+        builder = self.nutrition_model.meal_builder
+        nutrition_plan = dict(plan_data["nutrition_plan"])
+        nutrition_plan["meals"] = {
+            meal_name: {**meal, **builder.summarize_meal(meal.get("items", []))}
+            for meal_name, meal in nutrition_plan["meals"].items()
+        }
+        nutrition_plan["daily_calories"], nutrition_plan["macros"] = builder.summarize_day(nutrition_plan["meals"])
+        return {**plan_data, "nutrition_plan": nutrition_plan}
+
+    def log_remaining_issues(self, workout_plan, nutrition_plan, user_preferences):
+        """
+        Re-run the validators on repaired plans and log what is still wrong.
+
+        Args:
+            workout_plan (dict): Repaired workout plan, or None to skip it
+            nutrition_plan (dict): Repaired nutrition plan, or None to skip it
+            user_preferences (dict): User preferences and constraints
+        """
+        for name, validator, plan in (
+            ("Workout", self.workout_model.validate_workout_plan, workout_plan),
+            ("Nutrition", self.nutrition_model.validate_nutrition_plan, nutrition_plan),
+        ):
+            if plan is None:
+                continue
+            is_valid, issues = validator(plan, user_preferences)
+            if not is_valid:
+                logger.warning(f"{name} plan still has issues after repair: {issues}")
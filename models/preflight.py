@@ -0,0 +1,101 @@
+"""
+Pre-flight checks for plan requests.
+Runs input validation and the calculator-based safety checks before any
+API call, so requests that would be rejected or produce an unsafe plan
+are answered instantly with reasons and suggested corrections.
+"""
+import logging
+import threading
+from utils import InputValidator, assess_feasibility, suggest_corrections
+from utils.feasibility import (FEASIBILITY_CODES, FEASIBILITY_REASONS, NO_LOSS, RATE_TOO_FAST,
+                               DIET_DEFICIT_TOO_HIGH, INTAKE_BELOW_FLOOR)
+
+logger = logging.getLogger(__name__)
+
+# The validator already reports goals above the current weight and over-fast loss
+SAFETY_FLAGS_IGNORED = NO_LOSS | RATE_TOO_FAST
+# Failures a different goal weight or time frame can fix
+GOAL_FLAGS = RATE_TOO_FAST | DIET_DEFICIT_TOO_HIGH | INTAKE_BELOW_FLOOR
+
+class PreflightStats:
+    """Thread-safe counters for pre-flight checks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests_checked = 0
+        self.requests_rejected = 0
+        self.api_calls_prevented = 0
+
+    def record(self, rejected, api_calls=0):
+        """
+        Record the outcome of one check.
+
+        Args:
+            rejected (bool): Whether the request was stopped
+            api_calls (int): API calls the request would have made
+        """
+        with self._lock:
+            self.requests_checked += 1
+            if rejected:
+                self.requests_rejected += 1
+                self.api_calls_prevented += api_calls
+
+    def summary(self):
+        """
+        Get the counters.
+
+        Returns:
+            dict: Requests checked and rejected and API calls prevented
+        """
+        with self._lock:
+            return {
+                "requests_checked": self.requests_checked,
+                "requests_rejected": self.requests_rejected,
+                "api_calls_prevented": self.api_calls_prevented,
+            }
+
+preflight_stats = PreflightStats()
+
+def check_request(user_info, validated=False):
+    """
+    Check a plan request before generation.
+
+    Args:
+        user_info (dict): User information and preferences
+        validated (bool): Skip input validation because the caller already
+            ran it, e.g. in bulk with BulkValidator
+
+    Returns:
+        dict: "passed", plus "reasons" as {"code", "message"} dicts and
+            "suggestions" as {"field", "value", "message"} dicts
+    """
+    errors = [] if validated else InputValidator.validate_user_inputs(user_info)[1]
+    reasons = [{"code": "invalid_input", "message": error} for error in errors]
+    suggestions = []
+
+    try:
+        inputs = (
+            float(user_info["weight"]), float(user_info["height_cm"]), float(user_info["age"]),
+            user_info["gender"], user_info.get("activity_level", "Sedentary"),
+            float(user_info["goal_weight"]), float(user_info["time_frame"])
+        )
+        weight, height_cm, _, gender, _, goal_weight, weeks = inputs
+        # Goals at or above the current weight have no deficit to check
+        checkable = gender.lower() in ("male", "female") and height_cm > 0 and weeks > 0 and 0 < goal_weight < weight
+        flags = int(assess_feasibility(*inputs)["flags"]) if checkable else 0
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        flags = 0
+        if not reasons:
+            # Inputs the validator let through but the calculators cannot use
+            reasons.append({"code": "invalid_input", "message": f"Inputs could not be checked: {e}"})
+
+    reasons.extend(
+        {"code": FEASIBILITY_CODES[bit], "message": message}
+        for bit, message in FEASIBILITY_REASONS.items()
+        if flags & bit and not bit & SAFETY_FLAGS_IGNORED
+    )
+    # Input errors alone, e.g. an age out of range, have no goal to correct
+    if flags & GOAL_FLAGS:
+        suggestions = suggest_corrections(*inputs)
+
+    return {"passed": not reasons, "reasons": reasons, "suggestions": suggestions}
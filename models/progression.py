@@ -0,0 +1,194 @@
+"""
+Local progression engine for multi-week workout plans.
+Derives every week after the first from the base week by rule, so a
+plan covering the full duration costs no extra API calls.
+"""
+import copy
+import logging
+from data import ExerciseCatalog
+from data.catalog import TIME_BUFFER_MINS, MAX_DAILY_WORKOUT_CALORIES
+from utils import derive_profile
+
+logger = logging.getLogger(__name__)
+
+# Workout durations grow by this fraction per regular week
+DURATION_RAMP_PER_WEEK = 0.05
+
+# Every fourth week is a lighter recovery week
+DELOAD_EVERY_WEEKS = 4
+DELOAD_FACTOR = 0.7
+
+# Every second regular week the least intense exercise of each day is swapped
+SWAP_EVERY_WEEKS = 2
+
+class ProgressionEngine:
+    """Builds the weeks after the base week from progression rules."""
+
+    def __init__(self, workout_model):
+        """
+        Initialize the engine.
+
+        Args:
+            workout_model (WorkoutModel): Model holding the exercise data and HIIT rules
+        """
+        self.workout_model = workout_model
+        self.df = workout_model.df
+
+    def build_program(self, weekly_plan, user_preferences):
+        """
+        Derive the full program from the base week.
+
+        Each week starts from the projected weight on a straight line to the
+        goal; calorie targets are recomputed for that weight and the weeks
+        left. Regular weeks ramp up durations and periodically swap the
+        lowest-MET exercise of each day for a more intense one; deload weeks
+        cut durations back. Days always stay within the time and calorie caps.
+
+        Args:
+            weekly_plan (dict): Base week keyed by day
+            user_preferences (dict): User preferences and information
+
+        Returns:
+            list: One entry per week with the projected weight, calorie
+                targets and that week's weekly_plan
+        """
+        if self.df is None or not weekly_plan:
+            return []
+
+        start_weight = user_preferences["weight"]
+        goal_weight = user_preferences["goal_weight"]
+        duration_weeks = int(user_preferences["duration_weeks"])
+        weekly_loss = max(start_weight - goal_weight, 0) / max(duration_weeks, 1)
+        max_time = user_preferences["time_constraint_in_mins"] + TIME_BUFFER_MINS
+
+        # Exercises per day, matched to catalog entries where possible
+        base_catalog = ExerciseCatalog(self.df, start_weight)
+        current_days = {
+            day: [self._match(base_catalog, workout) for workout in info.get("workouts", [])]
+            for day, info in weekly_plan.items()
+        }
+
+        weeks = []
+        level = 0
+        for week in range(1, duration_weeks + 1):
+            weight = round(start_weight - weekly_loss * (week - 1), 1)
+            profile = derive_profile(
+                user_preferences["height_cm"], weight, goal_weight, duration_weeks - week + 1,
+                user_preferences["age"], user_preferences["gender"], user_preferences["activity_level"]
+            )
+            deload = week % DELOAD_EVERY_WEEKS == 0
+
+            if week == 1:
+                days = copy.deepcopy(weekly_plan)
+            else:
+                catalog = ExerciseCatalog(self.df, weight)
+                if not deload:
+                    level += 1
+                    if level % SWAP_EVERY_WEEKS == 0:
+                        pool = catalog.eligible(self.workout_model.allows_hiit({
+                            "age": user_preferences["age"], "BMI": profile.bmi
+                        }))
+                        for day, workouts in current_days.items():
+                            self._swap_least_intense(workouts, pool)
+
+                factor = DELOAD_FACTOR if deload else 1 + DURATION_RAMP_PER_WEEK * level
+                days = {
+                    day: self._build_day(catalog, workouts, weekly_plan[day], factor, max_time,
+                                         weight / start_weight)
+                    for day, workouts in current_days.items()
+                }
+
+            weeks.append({
+                "week": week,
+                "deload": deload,
+                "projected_weight": weight,
+                "exercise_calorie_target": profile.exercise_portion_calories,
+                "target_daily_intake": profile.target_daily_intake,
+                "weekly_plan": days,
+            })
+
+        logger.info(f"Built {len(weeks)}-week progression from the base week")
+        return weeks
+
+    @staticmethod
+    def _match(catalog, workout):
+        """Pair a plan workout with its catalog entry, if the catalog has it."""
+        entry = catalog.get(workout["id"]) if workout.get("id") is not None else None
+        if entry is None:
+            name = str(workout.get("name", "")).strip().lower()
+            entry = next((e for e in catalog.by_id.values() if e["name"].lower() == name), None)
+        return {"workout": workout, "entry": entry}
+
+    @staticmethod
+    def _swap_least_intense(workouts, pool):
+        """
+        Replace the lowest-MET catalog exercise of a day with a higher-MET one,
+        preferring the same exercise type.
+        """
+        matched = [w for w in workouts if w["entry"] is not None]
+        if not matched:
+            return
+        weakest = min(matched, key=lambda w: w["entry"]["met_value"])
+        used_ids = {w["entry"]["id"] for w in matched}
+        candidates = [
+            e for e in pool
+            if e["met_value"] > weakest["entry"]["met_value"] and e["id"] not in used_ids
+            and e["duration_mins"] <= weakest["entry"]["duration_mins"] + TIME_BUFFER_MINS
+        ]
+        if not candidates:
+            return
+        candidates.sort(key=lambda e: (e["type"] != weakest["entry"]["type"], -e["met_value"]))
+        replacement = candidates[0]
+        weakest["entry"] = replacement
+        weakest["workout"] = {
+            "id": replacement["id"],
+            "name": replacement["name"],
+            "type": replacement["type"],
+            "alternatives": weakest["workout"].get("alternatives", []),
+        }
+
+    @staticmethod
+    def _build_day(catalog, workouts, base_day, factor, max_time, weight_ratio):
+        """
+        Build one day of a derived week.
+
+        Args:
+            catalog (ExerciseCatalog): Catalog at the week's projected weight
+            workouts (list): Matched workouts of the day
+            base_day (dict): Day entry of the base week
+            factor (float): Duration factor for the week
+            max_time (float): Maximum minutes per day
+            weight_ratio (float): Projected weight over starting weight
+
+        Returns:
+            dict: Day entry in the plan schema
+        """
+        entries = []
+        for item in workouts:
+            workout = item["workout"]
+            entry = catalog.get(item["entry"]["id"]) if item["entry"] else None
+            if entry is not None:
+                duration = entry["duration_mins"]
+                calories = entry["calories_burned"]
+            else:
+                duration = float(workout.get("duration_mins") or 0)
+                calories = float(workout.get("calories_burned") or 0) * weight_ratio
+            entries.append((workout, duration, calories))
+
+        base_time = sum(duration for _, duration, _ in entries)
+        base_calories = sum(calories for _, _, calories in entries)
+        # Keep the ramp within the time and calorie caps
+        day_factor = factor
+        if base_time:
+            day_factor = min(day_factor, max_time / base_time)
+        if base_calories:
+            day_factor = min(day_factor, MAX_DAILY_WORKOUT_CALORIES / base_calories)
+
+        day_workouts = []
+        for workout, duration, calories in entries:
+            day_workout = dict(workout)
+            day_workout["duration_mins"] = round(duration * day_factor)
+            day_workout["calories_burned"] = round(calories * day_factor, 1)
+            day_workouts.append(day_workout)
+
+        return ExerciseCatalog.summarize_day(day_workouts, base_day.get("focus"))
@@ -0,0 +1,280 @@
+"""
+Response cache warm-up for frequently requested profiles.
+Submitted profiles are appended to a request log; the warmer pre-generates
+plans for the most common ones so their AI responses are already cached.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Form fields that identify a profile; height_cm is derived from feet and inches
+PROFILE_FIELDS = (
+    "height_ft", "height_inch", "weight", "goal_weight", "time_frame", "age", "gender",
+    "activity_level", "time_constraint", "location", "diet_preference", "food_type",
+)
+
+# Requests older than this are ignored when ranking profiles
+DEFAULT_LOOKBACK_DAYS = 7
+
+def canonical_profile(user_info):
+    """
+    Reduce form values to the fields that identify a profile.
+
+    Args:
+        user_info (dict): User information from the form
+
+    Returns:
+        dict: Profile fields with numbers normalized, so equal inputs compare equal
+    """
+    profile = {}
+    for field in PROFILE_FIELDS:
+        value = user_info.get(field)
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        profile[field] = value
+    return profile
+
+def profile_to_user_info(profile):
+    """
+    Expand a canonical profile back into the user info the planner expects.
+
+    Args:
+        profile (dict): Canonical profile
+
+    Returns:
+        dict: User information including height_cm
+    """
+    user_info = dict(profile)
+    user_info["height_cm"] = (profile["height_ft"] * 30.48) + (profile["height_inch"] * 2.54)
+    return user_info
+
+def parse_hours(window):
+    """
+    Parse an off-peak window such as "2-6" (local hours, end exclusive).
+    A window whose start is after its end, such as "22-4", wraps past midnight.
+
+    Args:
+        window (str): Start and end hour separated by a dash
+
+    Returns:
+        tuple: (start_hour, end_hour)
+    """
+    start, end = (int(part) for part in window.split("-"))
+    if not (0 <= start <= 23 and 0 <= end <= 24) or start == end:
+        raise ValueError(f"Invalid off-peak window: {window}")
+    return start, end
+
+class RequestLog:
+    """Append-only JSONL log of the canonical profiles users submit."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, path):
+        """
+        Initialize the log.
+
+        Args:
+            path (str): JSONL file, one request per line
+        """
+        self.path = Path(path)
+
+    def record(self, user_info):
+        """
+        Append a submitted profile.
+
+        Args:
+            user_info (dict): User information from the form
+        """
+        entry = {"at": datetime.now().isoformat(timespec="seconds"), "profile": canonical_profile(user_info)}
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not record request: {e}")
+
+    def profile_counts(self, lookback_days=DEFAULT_LOOKBACK_DAYS):
+        """
+        Count how often each profile was requested recently.
+
+        Args:
+            lookback_days (int): Only requests newer than this are counted
+
+        Returns:
+            Counter: Request counts keyed by the profile's JSON text
+        """
+        counts = Counter()
+        if not self.path.exists():
+            return counts
+        since = (datetime.now() - timedelta(days=lookback_days)).isoformat(timespec="seconds")
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get("at", "") >= since and "profile" in entry:
+                    counts[json.dumps(entry["profile"], sort_keys=True)] += 1
+        return counts
+
+class CacheWarmer:
+    """Pre-generates plans for popular profiles into the AI response cache."""
+
+    def __init__(self, planner, ai_service, request_log, budget=10, default_profile=None,
+                 off_peak_hours="2-6", lookback_days=DEFAULT_LOOKBACK_DAYS):
+        """
+        Initialize the warmer.
+
+        Args:
+            planner (PlanGenerator): Planner used to generate the plans
+            ai_service (AnthropicService): Service whose response cache is warmed
+            request_log (RequestLog): Log of submitted profiles
+            budget (int): Maximum number of profiles warmed per run
+            default_profile (dict, optional): Profile warmed first when the log is
+                empty, normally the sidebar defaults
+            off_peak_hours (str): Local hours in which scheduled runs happen, e.g. "2-6"
+            lookback_days (int): Age limit for the requests that are ranked
+        """
+        self.planner = planner
+        self.ai_service = ai_service
+        self.request_log = request_log
+        self.budget = budget
+        self.default_profile = canonical_profile(default_profile) if default_profile else None
+        self.off_peak = parse_hours(off_peak_hours)
+        self.lookback_days = lookback_days
+        self.warm_set = []
+        self.last_report = {}
+        self._thread = None
+
+    def select_profiles(self):
+        """
+        Pick the profiles to warm, most requested first.
+
+        Returns:
+            tuple: (list of canonical profiles within the budget, Counter of request counts)
+        """
+        counts = self.request_log.profile_counts(self.lookback_days)
+        ranked = [json.loads(key) for key, _ in counts.most_common()]
+        if self.default_profile and self.default_profile not in ranked:
+            ranked.append(self.default_profile)
+        return ranked[:self.budget], counts
+
+    def warm(self):
+        """
+        Generate plans for the selected profiles so their responses are cached.
+
+        Returns:
+            dict: Report with the number of profiles warmed and failed, the API
+                calls spent and the share of logged requests the warm set covers
+        """
+        profiles, counts = self.select_profiles()
+        hits_before, misses_before = self.ai_service.cache_hits, self.ai_service.cache_misses
+        start = time.time()
+        warmed, failed = [], 0
+        for profile in profiles:
+            plan = self.planner.generate_plan(profile_to_user_info(profile), self.ai_service)
+            if "error" in plan:
+                failed += 1
+                logger.warning(f"Warm-up failed for profile {profile}: {plan['error']}")
+            else:
+                warmed.append(profile)
+
+        self.warm_set = warmed
+        total_requests = sum(counts.values())
+        covered = sum(counts[json.dumps(profile, sort_keys=True)] for profile in warmed)
+        self.last_report = {
+            "warmed": len(warmed),
+            "failed": failed,
+            "api_calls": self.ai_service.cache_misses - misses_before,
+            "already_cached": self.ai_service.cache_hits - hits_before,
+            "logged_requests": total_requests,
+            "coverage": round(covered / total_requests, 3) if total_requests else 0.0,
+            "seconds": round(time.time() - start, 1),
+        }
+        logger.info(f"Cache warm-up finished: {self.last_report}")
+        return self.last_report
+
+    def hit_rate(self):
+        """
+        Report how well the warm set is serving live traffic.
+
+        Returns:
+            dict: Cache hits, misses and hit rate of the AI service since startup,
+                plus the coverage of the last warm-up
+        """
+        hits, misses = self.ai_service.cache_hits, self.ai_service.cache_misses
+        lookups = hits + misses
+        return {
+            "cache_hits": hits,
+            "cache_misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "coverage": self.last_report.get("coverage", 0.0),
+        }
+
+    def seconds_until_off_peak(self, now=None):
+        """
+        Time until the next off-peak window opens, zero if it is open now.
+
+        Args:
+            now (datetime, optional): Current local time
+
+        Returns:
+            float: Seconds to wait
+        """
+        now = now or datetime.now()
+        start_hour, end_hour = self.off_peak
+        if start_hour < end_hour:
+            is_open = start_hour <= now.hour < end_hour
+        else:
+            is_open = now.hour >= start_hour or now.hour < end_hour
+        if is_open:
+            return 0.0
+        opens = now.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+        if opens <= now:
+            opens += timedelta(days=1)
+        return (opens - now).total_seconds()
+
+    def start(self, warm_now=True):
+        """
+        Run warm-ups in a background thread: once now and then once per
+        off-peak window.
+
+        Args:
+            warm_now (bool): Warm immediately instead of waiting for the window
+        """
+        if self.budget <= 0 or self._thread is not None:
+            return
+
+        def window_day():
+            # Date the current window opened on, so "22-4" counts as one window
+            return (datetime.now() - timedelta(hours=self.off_peak[0])).date()
+
+        def loop():
+            last_day = None
+            if warm_now:
+                self._safe_warm()
+                if self.seconds_until_off_peak() == 0:
+                    last_day = window_day()
+            while True:
+                time.sleep(self.seconds_until_off_peak())
+                if window_day() == last_day:
+                    # Already warmed in this window; check again later
+                    time.sleep(3600)
+                    continue
+                last_day = window_day()
+                self._safe_warm()
+
+        self._thread = threading.Thread(target=loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+        logger.info(f"Cache warmer started (budget {self.budget}, off-peak {self.off_peak[0]}-{self.off_peak[1]}h)")
+
+    def _safe_warm(self):
+        try:
+            self.warm()
+        except Exception as e:
+            logger.error(f"Cache warm-up error: {e}", exc_info=True)
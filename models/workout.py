@@ -2,15 +2,27 @@
 Workout model for generating personalized fitness plans.
 Handles preparation of exercise data and coordinates with the AI service.
 """
+import copy
 import logging
 import json
 import hashlib
 from concurrent.futures import ThreadPoolExecutor
 from config import PromptManager
-from utils import FitnessCalculator
+from data import ExerciseCatalog, REST_DAYS
+from data.catalog import TIME_BUFFER_MINS
+from utils import FitnessCalculator, FrozenPreferences, derive_profile, profile_for_preferences, traced
 
 logger = logging.getLogger(__name__)
 
+# Output budget for the coaching-only response in hybrid mode
+COACHING_MAX_TOKENS = 800
+
+# Output budget for a single regenerated day
+DAY_MAX_TOKENS = 600
+
+# Output budget for the id-referenced workout plan
+IDS_MAX_TOKENS = 1000
+
 class WorkoutModel:
     """Model for generating personalized workout plans."""
 
@@ -26,12 +38,14 @@ class WorkoutModel:
         self.df = exercise_data
 
         if self.df is not None:
-            # Calculate total calories burned for this user's weight
-            self.df['total_calories_burned'] = self.df['calories_burned_per_kg'] * weight
+            # Calculate total calories burned for this user's weight on a copy,
+            # since the loaded data is shared by plans generated concurrently
+            self.df = self.df.assign(total_calories_burned=self.df['calories_burned_per_kg'] * weight)
 
         self.prompt_manager = PromptManager()
         self.calculator = FitnessCalculator()
 
+    @traced("prepare_user_preferences")
     def prepare_user_preferences(self, height, weight, goal_weight, duration_weeks, 
                                 location, diet_preference, time_constraint, age, 
                                 gender, activity_level, food_type='Maharashtrian'):
@@ -52,50 +66,18 @@ class WorkoutModel:
             food_type (str, optional): Preferred cuisine type
             
         Returns:
-            dict: User preferences formatted for the AI service
+            FrozenPreferences: Read-only user preferences formatted for the AI service
         """
-        # Calculate BMI
-        bmi = self.calculator.calculate_bmi(weight, height)
-        bmi_category = self.calculator.get_bmi_category(bmi)
-
-        # Calculate calorie deficit
-        calorie_data = self.calculator.calculate_weight_loss_calories(
-            weight, goal_weight, duration_weeks
-        )
-
-        # Calculate BMR
-        bmr = self.calculator.calculate_bmr(weight, height, age, gender)
-
-        # Calculate TDEE
-        tdee = self.calculator.calculate_tdee(bmr, activity_level)
-
-        # Calculate target daily intake
-        diet_portion = calorie_data["diet_portion_calories"]
-        food_calories = tdee - diet_portion
-
-        # Calculate macronutrient distribution based on activity level
-        activity_multiplier = self.calculator.get_activity_multiplier(activity_level)
-
-        if activity_multiplier <= 1.55:  # Low to moderate activity
-            protein_pct = 0.3
-            carbs_pct = 0.45
-            fat_pct = 0.25
-        else:  # High activity
-            protein_pct = 0.3
-            carbs_pct = 0.5
-            fat_pct = 0.2
-
-        amount_of_protein = round((food_calories * protein_pct) / 4, 2)  # 4 cal/g
-        amount_of_carbs = round((food_calories * carbs_pct) / 4, 2)      # 4 cal/g
-        amount_of_fat = round((food_calories * fat_pct) / 9, 2)          # 9 cal/g
+        # Shared, memoized derivation of BMI, BMR, TDEE, calorie split and macros
+        profile = derive_profile(height, weight, goal_weight, duration_weeks, age, gender, activity_level)
 
         # Compile user preferences
         user_preferences = {
             'weight': weight,
             'height_cm': height,
             'time_constraint_in_mins': time_constraint,
-            'BMI': bmi,
-            'bmi_category': bmi_category,
+            'BMI': profile.bmi,
+            'bmi_category': profile.bmi_category,
             'dietary_type': diet_preference,
             'cusine_type': food_type, 
             'location': location,
@@ -104,49 +86,296 @@ class WorkoutModel:
             'age': age,
             'gender': gender,
             'activity_level': activity_level,
-            'daily_maintenance_calories': tdee,
-            'total_calories_to_burn': calorie_data["total_calories_to_burn"],
-            'daily_calorie_deficit': calorie_data["daily_calorie_deficit"],
-            'exercise_portion_calories': calorie_data["exercise_portion_calories"],
-            'diet_portion_calories': calorie_data["diet_portion_calories"],
-            'target_daily_intake': food_calories,
-            'protein_target': amount_of_protein,
-            'carbs_target': amount_of_carbs,
-            'fat_target': amount_of_fat
+            'daily_maintenance_calories': profile.tdee,
+            'total_calories_to_burn': profile.total_calories_to_burn,
+            'daily_calorie_deficit': profile.daily_calorie_deficit,
+            'exercise_portion_calories': profile.exercise_portion_calories,
+            'diet_portion_calories': profile.diet_portion_calories,
+            'target_daily_intake': profile.target_daily_intake,
+            'protein_target': profile.protein_target,
+            'carbs_target': profile.carbs_target,
+            'fat_target': profile.fat_target
         }
 
         logger.info(f"Prepared user preferences for workout plan")
-        return user_preferences
+        # Shared by parallel stages, so hand out a read-only snapshot
+        return FrozenPreferences(user_preferences)
 
-    def generate_workout_plan(self, user_preferences, ai_service):
+    def build_user_profile(self, user_preferences):
         """
-        Generate only the workout portion of the plan.
+        Build the user profile summary attached to workout plans.
+        
+        Args:
+            user_preferences (dict): User preferences and information
+            
+        Returns:
+            dict: User profile summary
+        """
+        return {
+            "height_cm": user_preferences["height_cm"],
+            "current_weight": user_preferences["weight"],
+            "goal_weight": user_preferences["goal_weight"],
+            "duration_weeks": user_preferences["duration_weeks"],
+            "time_constraint_minutes": user_preferences["time_constraint_in_mins"],
+            "bmi": user_preferences["BMI"],
+            "bmi_category": user_preferences["bmi_category"],
+            "bmr": profile_for_preferences(user_preferences).bmr,
+        }
+
+    def allows_hiit(self, user_preferences):
+        """
+        Check whether HIIT is safe for the user (age 40 or under and BMI below 25).
+        
+        Args:
+            user_preferences (dict): User preferences and information
+            
+        Returns:
+            bool: True if HIIT exercises may be scheduled
+        """
+        return user_preferences["age"] <= 40 and user_preferences["BMI"] < 25
+
+    def build_workout_skeleton(self, user_preferences):
+        """
+        Build the workout plan locally: exercise selection, durations and calories.
+        
+        Args:
+            user_preferences (dict): User preferences and information
+            
+        Returns:
+            dict: Workout plan without coaching text
+        """
+        catalog = ExerciseCatalog(self.df, user_preferences["weight"])
+        weekly_plan = catalog.build_weekly_plan(
+            time_constraint=user_preferences["time_constraint_in_mins"],
+            daily_calorie_target=user_preferences["exercise_portion_calories"],
+            allow_hiit=self.allows_hiit(user_preferences)
+        )
+        return {
+            "workout_plan": {
+                "strategy": "",
+                "weekly_plan": weekly_plan,
+                "rest_days": list(REST_DAYS),
+            }
+        }
+
+    def format_weekly_schedule(self, weekly_plan):
+        """
+        Render a weekly plan as compact text for the coaching prompt.
+        
+        Args:
+            weekly_plan (dict): Weekly plan keyed by day
+            
+        Returns:
+            str: One line per day listing its exercises
+        """
+        lines = []
+        for day, day_plan in weekly_plan.items():
+            exercises = "; ".join(
+                f"{w['name']} ({w['type']}, {w['duration_mins']} mins)"
+                for w in day_plan.get("workouts", [])
+            )
+            lines.append(f"- {day}: {exercises}")
+        return "\n".join(lines)
+
+    def merge_coaching(self, skeleton, coaching):
+        """
+        Merge coaching text from the AI into a locally built workout plan.
+        
+        Args:
+            skeleton (dict): Locally built workout plan
+            coaching (dict): Parsed coaching response
+            
+        Returns:
+            dict: Workout plan with strategy, focus labels and form tips
+        """
+        workout_plan = skeleton["workout_plan"]
+        workout_plan["strategy"] = coaching.get("strategy") or workout_plan["strategy"]
+
+        coaching_days = coaching.get("days") or {}
+        for day, day_plan in workout_plan["weekly_plan"].items():
+            day_coaching = coaching_days.get(day) or {}
+            if day_coaching.get("focus"):
+                day_plan["focus"] = day_coaching["focus"]
+
+            tips = day_coaching.get("tips") or []
+            for workout, tip in zip(day_plan["workouts"], tips):
+                if tip:
+                    workout["form_tip"] = tip
+
+        return skeleton
+
+    def generate_workout_day(self, day, user_preferences, ai_service, calorie_target=None, mode="full",
+                             use_cache=True):
+        """
+        Generate a single workout day with a small, targeted prompt.
         
         Args:
+            day (str): Day of the week to generate
             user_preferences (dict): User preferences and information
             ai_service (AnthropicService): Service for AI interactions
+            calorie_target (float, optional): Calories the day should burn,
+                defaults to the daily exercise portion
+            mode (str, optional): Workout generation mode; in "ids" mode the AI
+                picks exercise ids that are hydrated from the catalog
+            use_cache (bool, optional): Whether to reuse a cached response;
+                user-requested regeneration passes False to get a fresh day
             
         Returns:
-            dict: Workout plan data or error information
+            dict: Day plan data or error information
         """
         try:
             if self.df is None:
                 return {"error": "Exercise data not available"}
 
-            # Prepare exercise data
-            exercise_data = self.df.to_dict(orient='records')
-            user_profile = {
-                "height_cm": user_preferences["height_cm"],
-                "current_weight": user_preferences["weight"],
-                "goal_weight": user_preferences["goal_weight"],
-                "duration_weeks": user_preferences["duration_weeks"],
-                "time_constraint_minutes": user_preferences["time_constraint_in_mins"],
-                "bmi": user_preferences["BMI"],
-                "bmi_category": user_preferences["bmi_category"],
+            if calorie_target is None:
+                calorie_target = user_preferences["exercise_portion_calories"]
+
+            catalog = ExerciseCatalog(self.df, user_preferences["weight"])
+            max_time = user_preferences["time_constraint_in_mins"] + TIME_BUFFER_MINS
+            exercise_data = [
+                {k: e[k] for k in ("id", "name", "type", "duration_mins", "calories_burned")}
+                for e in catalog.eligible(self.allows_hiit(user_preferences))
+                if e["duration_mins"] <= max_time
+            ]
+            day_data = {
+                'day': day,
+                'weight': user_preferences['weight'],
+                'bmi': user_preferences['BMI'],
+                'bmi_category': user_preferences['bmi_category'],
+                'age': user_preferences['age'],
+                'gender': user_preferences['gender'],
+                'constraint_time': user_preferences['time_constraint_in_mins'],
+                'calorie_target': round(calorie_target),
+                'exercise_data': exercise_data,
             }
-            custom_workout_changes = {
+            prompt_name = "workout_day_ids" if mode == "ids" else "workout_day"
+            system_message = self.prompt_manager.format_section_prompt(prompt_name, day_data)
+            user_message = f"Please create the workout for {day} only."
+
+            logger.info(f"Generating workout day {day} with calorie target {round(calorie_target)}")
+
+            response = ai_service.send_message(
+                system_message=system_message,
+                user_message=user_message,
+                use_cache=use_cache,
+                max_tokens=DAY_MAX_TOKENS,
+            )
+            if not response.get("success", False):
+                logger.error(f"Workout day generation error: {response.get('error', 'Unknown error')}")
+                return response
+            if mode == "ids":
+                return self.hydrate_workout_day(response, user_preferences, calorie_target)
+            return response
+
+        except Exception as e:
+            logger.error(f"Error generating workout day: {e}", exc_info=True)
+            return {"error": f"Error generating workout day: {str(e)}"}
+
+    def build_exercise_reference(self, user_preferences):
+        """
+        Build the compact exercise list sent with the id-referenced prompt.
+        
+        Args:
+            user_preferences (dict): User preferences and information
+            
+        Returns:
+            list: Exercises the user may do with id, name, type, duration and calories
+        """
+        catalog = ExerciseCatalog(self.df, user_preferences["weight"])
+        return [
+            {k: e[k] for k in ("id", "name", "type", "duration_mins", "calories_burned")}
+            for e in catalog.eligible(self.allows_hiit(user_preferences))
+        ]
+
+    def hydrate_workout_plan(self, response, user_preferences):
+        """
+        Fill an id-referenced workout plan with names, durations and calories
+        from the catalog. Unknown or disallowed ids are rejected and their
+        slot is refilled locally.
+        
+        Args:
+            response (dict): Parsed AI response with exercise ids per day
+            user_preferences (dict): User preferences and information
+            
+        Returns:
+            dict: Workout plan in the standard schema
+        """
+        catalog = ExerciseCatalog(self.df, user_preferences["weight"])
+        pool = catalog.eligible(self.allows_hiit(user_preferences), unique=False)
+        source_plan = response.get("workout_plan", {})
+        weekly_usage = {}
+        weekly_plan = {}
+        rejected_ids = []
+
+        for day, day_plan in (source_plan.get("weekly_plan") or {}).items():
+            workouts, rejected = catalog.hydrate_day(
+                day_plan.get("exercise_ids"),
+                pool,
+                user_preferences["time_constraint_in_mins"],
+                user_preferences["exercise_portion_calories"],
+                weekly_usage
+            )
+            rejected_ids.extend(rejected)
+            weekly_plan[day] = catalog.summarize_day(workouts, day_plan.get("focus"))
+
+        if rejected_ids:
+            logger.warning(f"Rejected {len(rejected_ids)} unknown or disallowed exercise ids: {rejected_ids}")
+
+        return {
+            "workout_plan": {
+                "strategy": source_plan.get("strategy", ""),
+                "weekly_plan": weekly_plan,
+                "rest_days": source_plan.get("rest_days") or list(REST_DAYS),
+            },
+            "success": True
+        }
+
+    def hydrate_workout_day(self, response, user_preferences, calorie_target):
+        """
+        Fill an id-referenced workout day from the catalog. Unknown,
+        disallowed and duplicate ids are rejected and their slot is refilled
+        locally.
+        
+        Args:
+            response (dict): Parsed AI response with the day's exercise ids
+            user_preferences (dict): User preferences and information
+            calorie_target (float): Calories the day should burn
+            
+        Returns:
+            dict: Day plan in the standard schema
+        """
+        catalog = ExerciseCatalog(self.df, user_preferences["weight"])
+        pool = catalog.eligible(self.allows_hiit(user_preferences), unique=False)
+        workouts, rejected = catalog.hydrate_day(
+            response.get("exercise_ids"),
+            pool,
+            user_preferences["time_constraint_in_mins"],
+            calorie_target
+        )
+        if rejected:
+            logger.warning(f"Rejected {len(rejected)} unknown or disallowed exercise ids: {rejected}")
+
+        return {**catalog.summarize_day(workouts, response.get("focus")), "success": True}
+
+    def build_workout_request(self, user_preferences, mode="full"):
+        """
+        Build the AI request for the workout plan without sending it.
+        
+        Args:
+            user_preferences (dict): User preferences and information
+            mode (str, optional): "full" to let the AI build the whole plan,
+                "hybrid" to build it locally and ask only for coaching text,
+                "ids" to let the AI pick exercise ids that are hydrated from the catalog
+            
+        Returns:
+            dict: Request with system_message, user_message, max_tokens and mode,
+                plus the local skeleton in hybrid mode
+        """
+        if mode == "hybrid":
+            skeleton = self.build_workout_skeleton(user_preferences)
+            weekly_schedule = self.format_weekly_schedule(skeleton["workout_plan"]["weekly_plan"])
+            coaching_data = {
                 'weight': user_preferences['weight'],
-                'height_cm': user_preferences['height_cm'],
                 'goal_weight': user_preferences['goal_weight'],
                 'bmi': user_preferences['BMI'],
                 'bmi_category': user_preferences['bmi_category'],
@@ -157,32 +386,114 @@ class WorkoutModel:
                 'age': user_preferences['age'],
                 'gender': user_preferences['gender'],
             }
-            # Get workout-specific prompt
-            system_message = self.prompt_manager.format_workout_prompt(exercise_data, user_preferences, custom_workout_changes)
-            # Create user message
-            user_message = (
-                "Please create a personalized WORKOUT PLAN ONLY based on these "
-                f"{json.dumps(user_preferences, indent=2)} user preferences. Focus exclusively on the exercise plan with a 5-day schedule."
-                "Do not include any nutrition or diet information."
-            )
+            return {
+                "mode": mode,
+                "skeleton": skeleton,
+                "system_message": self.prompt_manager.format_coaching_prompt(weekly_schedule, coaching_data),
+                "user_message": (
+                    "Please write the coaching notes (strategy, daily focus and form tips) "
+                    "for the weekly schedule above."
+                ),
+                "max_tokens": COACHING_MAX_TOKENS,
+            }
+
+        # Prepare exercise data
+        if mode == "ids":
+            exercise_data = self.build_exercise_reference(user_preferences)
+            prompt_name = "workout_ids"
+            max_tokens = IDS_MAX_TOKENS
+        else:
+            exercise_data = self.df.to_dict(orient='records')
+            prompt_name = "workout_plan"
+            max_tokens = 2500
+        custom_workout_changes = {
+            'weight': user_preferences['weight'],
+            'height_cm': user_preferences['height_cm'],
+            'goal_weight': user_preferences['goal_weight'],
+            'bmi': user_preferences['BMI'],
+            'bmi_category': user_preferences['bmi_category'],
+            'duration_weeks': user_preferences['duration_weeks'],
+            'constraint_time': user_preferences['time_constraint_in_mins'],
+            'activity_level': user_preferences['activity_level'],
+            'location': user_preferences['location'],
+            'age': user_preferences['age'],
+            'gender': user_preferences['gender'],
+            'exercise_portion_calories': user_preferences['exercise_portion_calories'],
+        }
+        # Get workout-specific prompt
+        system_message = self.prompt_manager.format_workout_prompt(
+            exercise_data, user_preferences, custom_workout_changes, prompt_name
+        )
+        # Create user message
+        user_message = (
+            "Please create a personalized WORKOUT PLAN ONLY based on these "
+            f"{json.dumps(user_preferences, indent=2)} user preferences. Focus exclusively on the exercise plan with a 5-day schedule."
+            "Do not include any nutrition or diet information."
+        )
+        return {
+            "mode": mode,
+            "system_message": system_message,
+            "user_message": user_message,
+            "max_tokens": max_tokens,
+        }
+
+    def complete_workout_plan(self, response, user_preferences, request):
+        """
+        Turn the parsed AI response into the final workout plan.
+        
+        Args:
+            response (dict): Parsed AI response
+            user_preferences (dict): User preferences and information
+            request (dict): Request built by build_workout_request
+            
+        Returns:
+            dict: Workout plan data or error information
+        """
+        if not response.get("success", False):
+            logger.error(f"Workout plan generation error: {response.get('error', 'Unknown error')}")
+            return response
+
+        if request["mode"] == "hybrid":
+            response = self.merge_coaching(copy.deepcopy(request["skeleton"]), response)
+            response["success"] = True
+        elif request["mode"] == "ids":
+            response = self.hydrate_workout_plan(response, user_preferences)
+
+        logger.info("Successfully generated workout plan")
+        response['user_profile'] = self.build_user_profile(user_preferences)
+        return response
+
+    def generate_workout_plan(self, user_preferences, ai_service, mode="full"):
+        """
+        Generate only the workout portion of the plan.
+        
+        Args:
+            user_preferences (dict): User preferences and information
+            ai_service (AnthropicService): Service for AI interactions
+            mode (str, optional): "full" to let the AI build the whole plan,
+                "hybrid" to build it locally and ask only for coaching text,
+                "ids" to let the AI pick exercise ids that are hydrated from the catalog
+            
+        Returns:
+            dict: Workout plan data or error information
+        """
+        try:
+            if self.df is None:
+                return {"error": "Exercise data not available"}
+
+            request = self.build_workout_request(user_preferences, mode)
 
             # Log the request
-            logger.info(f"Generating workout plan for user with BMI {user_preferences['BMI']}, " 
+            logger.info(f"Generating workout plan ({mode}) for user with BMI {user_preferences['BMI']}, " 
                        f"time constraint {user_preferences['time_constraint_in_mins']} minutes")
 
             # Get response from AI service
             response = ai_service.send_message(
-                system_message=system_message,
-                user_message=user_message,
-            )        
-            # Check for errors
-            if not response.get("success", False):
-                logger.error(f"Workout plan generation error: {response.get('error', 'Unknown error')}")
-                return response
-
-            logger.info("Successfully generated workout plan")
-            response['user_profile'] = user_profile
-            return response
+                system_message=request["system_message"],
+                user_message=request["user_message"],
+                max_tokens=request["max_tokens"],
+            )
+            return self.complete_workout_plan(response, user_preferences, request)
 
         except Exception as e:
             logger.error(f"Error generating workout plan: {e}", exc_info=True)
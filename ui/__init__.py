@@ -1,3 +1,4 @@
-from .components import (render_header, user_info_form, user_profile_card, weight_loss_chart, display_workout_day, render_meal_table, render_macros_chart, render_progress_tracker, export_plan_button)
+from .components import (render_header, user_info_form, user_profile_card, weight_loss_chart, display_workout_day, render_meal_table, render_calorie_summary, render_macros_chart, render_progress_tracker, render_feasibility_panel, saved_plans_browser, profiling_controls, export_plan_button)
 from .styles import load_custom_css
-from .visualization import (create_calendar_heatmap, create_workout_comparison_chart, create_nutrition_breakdown)
\ No newline at end of file
+from .visualization import (create_calendar_heatmap, create_workout_comparison_chart, create_nutrition_breakdown, create_feasibility_heatmap)
+from .render_cache import render_cache, plan_fingerprint
@@ -1,14 +1,23 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime
 import json
 import os
 import logging
+import numpy as np
+from utils import simulate_weight_trajectories, assess_feasibility, describe_flags, traced
+from ui.visualization import create_feasibility_heatmap
+from ui.render_cache import render_cache, html_table
 
 logger = logging.getLogger(__name__)
 
+ACTIVITY_LEVELS = ("Sedentary", "Lightly active", "Moderately active", "Very active", "Extra active")
+
+# Input ranges of the sidebar form, shared with the what-if panel
+GOAL_WEIGHT_RANGE = (40, 200)
+TIME_FRAME_RANGE = (4, 30)
+
 
 def render_header():
     """
@@ -30,13 +39,15 @@ def user_info_form():
     with st.sidebar:
         st.markdown("## User Information")
         
+        user_id = st.text_input("User ID", value="guest", help="Your plans are saved under this name")
+        
         height_ft = st.number_input("Height (feet)", min_value=4, max_value=7, value=5)
         height_inch = st.number_input("Height (inches)", min_value=0, max_value=11, value=10)
         height_cm = (height_ft * 30.48) + (height_inch * 2.54)
         
         weight = st.number_input("Current Weight (kg)", min_value=40, max_value=200, value=73)
-        goal_weight = st.number_input("Goal Weight (kg)", min_value=40, max_value=200, value=71)
-        time_frame = st.slider("Time Frame (weeks)", min_value=4, max_value=30, value=4)
+        goal_weight = st.number_input("Goal Weight (kg)", min_value=GOAL_WEIGHT_RANGE[0], max_value=GOAL_WEIGHT_RANGE[1], value=71)
+        time_frame = st.slider("Time Frame (weeks)", min_value=TIME_FRAME_RANGE[0], max_value=TIME_FRAME_RANGE[1], value=4)
         
         st.markdown("## Additional Information")
         age = st.number_input("Age", min_value=18, max_value=80, value=22)
@@ -44,7 +55,7 @@ def user_info_form():
         
         activity_level = st.selectbox(
             "Activity Level", 
-            ["Sedentary", "Lightly active", "Moderately active", "Very active", "Extra active"],
+            list(ACTIVITY_LEVELS),
             index=0
         )
         
@@ -57,6 +68,7 @@ def user_info_form():
         
         return {
             "submit": submit_button,
+            "user_id": user_id.strip() or "guest",
             "height_ft": height_ft,
             "height_inch": height_inch,
             "height_cm": height_cm,
@@ -158,17 +170,20 @@ def weight_loss_chart(weight_loss_calc):
         )
         st.plotly_chart(fig, use_container_width=True)
 
-def display_workout_day(day, info, workout_index):
+def workout_day_html(day, info, workout_index):
     """
-    Display a single workout day's details.
-    
+    Build the HTML for a single workout day.
+
     Args:
         day (str): Day of the week
         info (dict): Workout information for the day
         workout_index (int): Index for the HTML ID
+
+    Returns:
+        str: Header, exercise table, alternatives and form tips
     """
-    st.markdown(f'<div class="day-header" id="workout-day-{workout_index}">{day}: {info.get("focus")}</div>', unsafe_allow_html=True)
-    
+    parts = [f'<div class="day-header" id="workout-day-{workout_index}">{day}: {info.get("focus")}</div>']
+
     # Create workout table
     workout_data = []
     for i, workout in enumerate(info.get("workouts", [])):
@@ -177,36 +192,57 @@ def display_workout_day(day, info, workout_index):
             f"{workout.get('duration_mins')} mins",
             f"{workout.get('calories_burned'):,.0f} calories"
         ])
-    
+
     # Add totals
     workout_data.append([
         "<strong>Total</strong>",
         f"<strong>{info.get('total_time')} mins</strong>",
         f"<strong>{info.get('total_calories'):,.0f} calories</strong>"
     ])
-    
-    # Create DataFrame and display
-    df = pd.DataFrame(workout_data, columns=["Exercise", "Duration", "Calories Burned"])
-    st.write(df.to_html(escape=False, index=False), unsafe_allow_html=True)
-    
-    # Display alternatives
+    parts.append(html_table(["Exercise", "Duration", "Calories Burned"], workout_data))
+
+    # Add alternatives
     alternatives = []
     for workout in info.get("workouts", []):
         alternatives.extend(workout.get("alternatives", []))
-    
-    st.markdown(f"<p><strong>Alternatives:</strong> {', '.join(alternatives)}</p>", unsafe_allow_html=True)
-    
-def render_meal_table(meal_name, meal_data):
+    parts.append(f"<p><strong>Alternatives:</strong> {', '.join(alternatives)}</p>")
+
+    # Add form tips when the plan includes them
+    tips = [f"{w.get('name')}: {w.get('form_tip')}" for w in info.get("workouts", []) if w.get("form_tip")]
+    if tips:
+        parts.append(f"<p><strong>Form Tips:</strong></p><ul>{''.join(f'<li>{tip}</li>' for tip in tips)}</ul>")
+    return "\n".join(parts)
+
+@traced("display_workout_day")
+def display_workout_day(day, info, workout_index, cache_key=None):
     """
-    Render a single meal table with details.
+    Display a single workout day's details.
     
+    Args:
+        day (str): Day of the week
+        info (dict): Workout information for the day
+        workout_index (int): Index for the HTML ID
+        cache_key (tuple, optional): (plan fingerprint, section) under which the
+            HTML is memoized; built every time when omitted
+    """
+    build = lambda: workout_day_html(day, info, workout_index)
+    html = render_cache.get_or_build(cache_key, build) if cache_key else build()
+    st.markdown(html, unsafe_allow_html=True)
+
+def meal_table_html(meal_name, meal_data):
+    """
+    Build the HTML for a single meal.
+
     Args:
         meal_name (str): Name of the meal
         meal_data (dict): Nutritional data for the meal
+
+    Returns:
+        str: Header and food item table
     """
     display_name = meal_name.replace("_", " ")
-    st.markdown(f'<div class="day-header">{display_name} ({meal_data.get("calories"):,.0f} kcal)</div>', unsafe_allow_html=True)
-    
+    header = f'<div class="day-header">{display_name} ({meal_data.get("calories"):,.0f} kcal)</div>'
+
     # Create meal table
     meal_items = []
     for item in meal_data.get("items", []):
@@ -218,7 +254,7 @@ def render_meal_table(meal_name, meal_data):
             f"{item.get('carbs')}g",
             f"{item.get('fat')}g"
         ])
-    
+
     # Add totals
     meal_items.append([
         "<strong>Total</strong>",
@@ -228,10 +264,57 @@ def render_meal_table(meal_name, meal_data):
         f"<strong>{meal_data.get('total_carbs')}g</strong>",
         f"<strong>{meal_data.get('total_fat')}g</strong>"
     ])
+    table = html_table(["Food Item", "Quantity", "Calories", "Protein", "Carbs", "Fat"], meal_items)
+    return header + "\n" + table
+
+@traced("render_meal_table")
+def render_meal_table(meal_name, meal_data, cache_key=None):
+    """
+    Render a single meal table with details.
     
-    # Create DataFrame and display
-    df = pd.DataFrame(meal_items, columns=["Food Item", "Quantity", "Calories", "Protein", "Carbs", "Fat"])
-    st.write(df.to_html(escape=False, index=False), unsafe_allow_html=True)
+    Args:
+        meal_name (str): Name of the meal
+        meal_data (dict): Nutritional data for the meal
+        cache_key (tuple, optional): (plan fingerprint, section) under which the
+            HTML is memoized; built every time when omitted
+    """
+    build = lambda: meal_table_html(meal_name, meal_data)
+    html = render_cache.get_or_build(cache_key, build) if cache_key else build()
+    st.markdown(html, unsafe_allow_html=True)
+
+def calorie_summary_html(user_profile, calorie_intake):
+    """
+    Build the daily calorie intake summary box.
+
+    Args:
+        user_profile (dict): User profile of the plan
+        calorie_intake (dict): Daily calorie intake of the plan
+
+    Returns:
+        str: Summary box HTML
+    """
+    return f"""
+        <div class="summary-box">
+            <p><strong>Basal Metabolic Rate:</strong> {user_profile.get('bmr', 0):,.0f} kcal</p>
+            <p><strong>Baseline Calories:</strong> {calorie_intake.get('baseline_calories'):,.0f} kcal</p>
+            <p><strong>Diet Calorie Deficit:</strong> {calorie_intake.get('diet_calorie_deficit'):,.0f} kcal</p>
+            <p><strong>Target Daily Intake:</strong> {calorie_intake.get('target_daily_intake'):,.0f} kcal</p>
+        </div>
+        """
+
+def render_calorie_summary(user_profile, calorie_intake, cache_key=None):
+    """
+    Render the daily calorie intake summary box.
+
+    Args:
+        user_profile (dict): User profile of the plan
+        calorie_intake (dict): Daily calorie intake of the plan
+        cache_key (tuple, optional): (plan fingerprint, section) under which the
+            HTML is memoized; built every time when omitted
+    """
+    build = lambda: calorie_summary_html(user_profile, calorie_intake)
+    html = render_cache.get_or_build(cache_key, build) if cache_key else build()
+    st.markdown(html, unsafe_allow_html=True)
 
 def render_macros_chart(macros, daily_calories):
     """
@@ -302,14 +385,19 @@ def render_macros_chart(macros, daily_calories):
     </div>
     """, unsafe_allow_html=True)
 
-def render_progress_tracker(current_weight, goal_weight, duration_weeks):
+def render_progress_tracker(current_weight, goal_weight, duration_weeks, profile=None):
     """
     Render a progress tracker showing expected weight loss trajectory.
     
+    With a derived profile the trajectory is simulated day by day, with
+    BMR and TDEE falling as weight drops, for every activity level at the
+    chosen plan adherence; otherwise a straight line to the goal is shown.
+    
     Args:
         current_weight (float): Starting weight in kg
         goal_weight (float): Target weight in kg
         duration_weeks (int): Time frame in weeks
+        profile (DerivedProfile, optional): Derived profile with the plan's calorie targets
     """
     # Generate expected progress data
     weight_to_lose = current_weight - goal_weight
@@ -326,10 +414,38 @@ def render_progress_tracker(current_weight, goal_weight, duration_weeks):
         labels={"x": "Week", "y": "Weight (kg)"},
         title="Expected Weight Loss Trajectory"
     )
+    lowest_weight = min(expected_weights)
+    
+    if profile is not None:
+        adherence = st.slider("Plan adherence (%)", min_value=0, max_value=100, value=100, step=5,
+                              key="progress_adherence")
+        activity_levels = list(ACTIVITY_LEVELS)
+        simulation = simulate_weight_trajectories(
+            current_weight, profile.height_cm, profile.age, profile.gender, activity_levels,
+            profile.target_daily_intake, profile.exercise_portion_calories, duration_weeks * 7,
+            adherence=adherence / 100, diet_deficit=profile.diet_portion_calories
+        )
+        fig.data[0].name = "Straight line to goal"
+        fig.data[0].showlegend = True
+        fig.data[0].line.dash = "dot"
+        week_axis = simulation["day"] / 7
+        for level, trajectory in zip(activity_levels, simulation["weight"]):
+            own_level = level.lower() == profile.activity_level.lower()
+            fig.add_scatter(
+                x=week_axis, y=trajectory, mode="lines",
+                name=f"{level}{' (you)' if own_level else ''}",
+                line=dict(width=3 if own_level else 1),
+                opacity=1 if own_level else 0.5
+            )
+        lowest_weight = min(lowest_weight, float(simulation["weight"].min()))
+        own_index = next(
+            (i for i, level in enumerate(activity_levels) if level.lower() == profile.activity_level.lower()), 0
+        )
+        projected_weight = simulation["weight"][own_index, -1]
     
     fig.update_layout(
         xaxis=dict(tickmode='linear', tick0=0, dtick=1),
-        yaxis=dict(range=[min(goal_weight * 0.95, min(expected_weights)), current_weight * 1.02])
+        yaxis=dict(range=[min(goal_weight * 0.95, lowest_weight), current_weight * 1.02])
     )
     
     # Add goal line
@@ -344,13 +460,110 @@ def render_progress_tracker(current_weight, goal_weight, duration_weeks):
     st.plotly_chart(fig, use_container_width=True)
     
     # Add weekly breakdown
+    projection = ""
+    if profile is not None:
+        projection = (
+            f"<p><strong>Projected Weight After {duration_weeks} Weeks:</strong> {projected_weight:.1f} kg "
+            f"at {adherence}% adherence, as your TDEE falls with your weight</p>"
+        )
     st.markdown(f"""
     <div class="info-box">
         <p><strong>Weekly Weight Loss Goal:</strong> {weekly_loss:.2f} kg per week</p>
         <p><strong>Daily Calorie Deficit Needed:</strong> {(weekly_loss * 7700 / 7):.0f} calories per day</p>
+        {projection}
     </div>
     """, unsafe_allow_html=True)
 
+def render_feasibility_panel(user_info):
+    """
+    Render a what-if heatmap of every goal weight and time frame the form
+    allows, computed locally so a viable goal can be picked before generating.
+    
+    Args:
+        user_info (dict): User input values from the sidebar form
+    """
+    # Goals at or above the current weight are never feasible, so the axis stops below it
+    top = int(min(GOAL_WEIGHT_RANGE[1], max(user_info["weight"] - 1, GOAL_WEIGHT_RANGE[0])))
+    goal_weights = np.arange(GOAL_WEIGHT_RANGE[0], top + 1)
+    weeks = np.arange(TIME_FRAME_RANGE[0], TIME_FRAME_RANGE[1] + 1)
+    grid = assess_feasibility(
+        user_info["weight"], user_info["height_cm"], user_info["age"], user_info["gender"],
+        user_info["activity_level"], goal_weights[:, None], weeks[None, :]
+    )
+    
+    st.plotly_chart(
+        create_feasibility_heatmap(goal_weights, weeks, grid, user_info["goal_weight"], user_info["time_frame"]),
+        use_container_width=True
+    )
+    
+    current = assess_feasibility(
+        user_info["weight"], user_info["height_cm"], user_info["age"], user_info["gender"],
+        user_info["activity_level"], user_info["goal_weight"], user_info["time_frame"]
+    )
+    problems = describe_flags(current["flags"])
+    if problems:
+        st.warning("Your current goal is not feasible: " + "; ".join(problems))
+    else:
+        st.success(
+            f"Your current goal is feasible: {current['daily_calorie_deficit']:,.0f} kcal daily deficit, "
+            f"{current['target_daily_intake']:,.0f} kcal intake (floor {current['calorie_floor']:,.0f} kcal)"
+        )
+
+def saved_plans_browser(fetch_page, page_size=10):
+    """
+    Render a paginated list of saved plans in the sidebar.
+
+    Args:
+        fetch_page (callable): Returns (plans, total) for a page number starting at 1
+        page_size (int): Plans per page
+
+    Returns:
+        int or None: Id of the plan to open, if the user asked to open one
+    """
+    with st.sidebar:
+        st.markdown("## Saved Plans")
+        plans, total = fetch_page(st.session_state.get("saved_plans_page", 1))
+        if not total:
+            st.caption("No saved plans yet")
+            return None
+
+        pages = (total + page_size - 1) // page_size
+        if pages > 1:
+            page = st.number_input("Page", min_value=1, max_value=pages, value=1, key="saved_plans_page")
+            plans, total = fetch_page(page)
+
+        labels = {
+            plan["id"]: (
+                f"{plan['created_at'].replace('T', ' ')} - {plan['weight']}→{plan['goal_weight']} kg, "
+                f"{plan['time_frame']} weeks, {plan['food_type']}"
+            )
+            for plan in plans
+        }
+        plan_id = st.selectbox("Plan", list(labels), format_func=labels.get)
+        if st.button("Open Plan"):
+            return plan_id
+        return None
+
+def profiling_controls(status):
+    """
+    Render the admin profiling toggle in the sidebar.
+
+    Args:
+        status (dict): Profiler state from PlanProfiler.status
+
+    Returns:
+        int or None: Number of plan generations to profile, if the user armed the profiler
+    """
+    with st.sidebar.expander("Diagnostics"):
+        state = "running" if status["active"] else f"{status['remaining']} generations left"
+        st.caption(f"Profiler: {state}")
+        count = st.number_input("Plan generations to profile", min_value=0, max_value=20, value=1,
+                                key="profile_count")
+        armed = st.button("Profile Next Plans")
+        for path in status["last_files"]:
+            st.caption(path)
+        return int(count) if armed else None
+
 def export_plan_button(plan_data):
     """
     Create buttons to export the plan in different formats.
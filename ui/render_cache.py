@@ -0,0 +1,121 @@
+"""
+Memoized HTML fragments for plan display.
+A plan does not change once generated (updates produce a new plan), so the
+HTML of each section is built once per plan content and section and reused
+on every rerun and by every session showing the same plan.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from utils import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# Fragments kept before the least recently used are dropped
+MAX_FRAGMENTS = 2000
+# Plans whose fingerprint is remembered by identity
+MAX_FINGERPRINTS = 64
+
+RENDER_CACHE_LOOKUPS = metrics_registry.counter(
+    "render_cache_lookups_total", "Plan HTML fragment cache lookups by result", ("result",))
+
+class RenderCache:
+    """Bounded LRU cache of HTML fragments keyed by (plan fingerprint, section)."""
+
+    def __init__(self, max_fragments=MAX_FRAGMENTS):
+        """
+        Initialize the cache.
+
+        Args:
+            max_fragments (int): Fragments kept
+        """
+        self.max_fragments = max_fragments
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """
+        Return the cached fragment for a key, building it on a miss.
+
+        Args:
+            key (tuple): (plan fingerprint, section name)
+            build (callable): Returns the HTML for the section
+
+        Returns:
+            str: HTML fragment
+        """
+        with self._lock:
+            html = self._fragments.get(key)
+            if html is not None:
+                self._fragments.move_to_end(key)
+        if html is not None:
+            RENDER_CACHE_LOOKUPS.inc(result="hit")
+            return html
+
+        RENDER_CACHE_LOOKUPS.inc(result="miss")
+        html = build()
+        with self._lock:
+            self._fragments[key] = html
+            while len(self._fragments) > self.max_fragments:
+                self._fragments.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+render_cache = RenderCache()
+
+_fingerprints = OrderedDict()
+_fingerprints_lock = threading.Lock()
+
+def plan_fingerprint(plan):
+    """
+    Hash the content of a plan.
+
+    The hash is remembered for the plan object itself, so a plan kept in
+    session state is only serialized once.
+
+    Args:
+        plan (dict): Complete plan
+
+    Returns:
+        str: Short hex digest of the plan content
+    """
+    with _fingerprints_lock:
+        entry = _fingerprints.get(id(plan))
+        if entry is not None and entry[0] is plan:
+            return entry[1]
+
+    fingerprint = hashlib.sha256(json.dumps(plan, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    with _fingerprints_lock:
+        # The plan is kept in the entry so its id cannot be reused while remembered
+        _fingerprints[id(plan)] = (plan, fingerprint)
+        while len(_fingerprints) > MAX_FINGERPRINTS:
+            _fingerprints.popitem(last=False)
+    return fingerprint
+
+def html_table(columns, rows):
+    """
+    Build an HTML table in the same shape as DataFrame.to_html(escape=False, index=False).
+
+    Cell values are inserted as is, so they may contain markup.
+
+    Args:
+        columns (list): Header labels
+        rows (list): Rows of cell values
+
+    Returns:
+        str: Table HTML
+    """
+    parts = ['<table border="1" class="dataframe">', '  <thead>', '    <tr style="text-align: right;">']
+    parts.extend(f"      <th>{column}</th>" for column in columns)
+    parts.extend(['    </tr>', '  </thead>', '  <tbody>'])
+    for row in rows:
+        parts.append('    <tr>')
+        parts.extend(f"      <td>{value}</td>" for value in row)
+        parts.append('    </tr>')
+    parts.extend(['  </tbody>', '</table>'])
+    return "\n".join(parts)
@@ -3,6 +3,7 @@ import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 import streamlit as st
+from utils import FEASIBILITY_REASONS, describe_flags
 
 def create_calendar_heatmap(weekly_plan):
     """
@@ -161,4 +162,68 @@ def create_nutrition_breakdown(meals):
         height=400
     )
     
-    return fig
\ No newline at end of file
+    return fig
+
+def create_feasibility_heatmap(goal_weights, weeks, grid, current_goal=None, current_weeks=None):
+    """
+    Create a heatmap of which (goal weight, time frame) pairs are feasible.
+    
+    Args:
+        goal_weights (array): Goal weights on the y axis
+        weeks (array): Time frames on the x axis
+        grid (dict): Result of assess_feasibility over the goal/weeks grid
+        current_goal (float, optional): Goal weight currently selected
+        current_weeks (int, optional): Time frame currently selected
+        
+    Returns:
+        plotly.graph_objects.Figure: Feasibility heatmap
+    """
+    flags = grid["flags"]
+    # Number of failed checks per cell
+    failures = np.zeros(flags.shape, dtype=int)
+    for bit in FEASIBILITY_REASONS:
+        failures += (flags & bit) > 0
+    
+    hover_texts = [
+        [
+            f"Goal {goal:g} kg in {week} weeks<br>"
+            f"{grid['weekly_loss'][i, j]:.2f} kg/week, deficit {grid['daily_calorie_deficit'][i, j]:,.0f} kcal/day<br>"
+            f"Exercise {grid['exercise_portion_calories'][i, j]:,.0f} kcal, intake {grid['target_daily_intake'][i, j]:,.0f} kcal<br>"
+            + ("<br>".join(describe_flags(flags[i, j])) or "Feasible")
+            for j, week in enumerate(weeks)
+        ]
+        for i, goal in enumerate(goal_weights)
+    ]
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=failures,
+        x=weeks,
+        y=goal_weights,
+        colorscale=[[0, "#43A047"], [0.25, "#FFEB3B"], [1, "#E53935"]],
+        zmin=0,
+        zmax=max(len(FEASIBILITY_REASONS) - 1, 1),
+        text=hover_texts,
+        hoverinfo="text",
+        colorbar=dict(title="Failed checks")
+    ))
+    
+    if current_goal is not None and current_weeks is not None:
+        fig.add_trace(go.Scatter(
+            x=[current_weeks],
+            y=[current_goal],
+            mode="markers",
+            marker=dict(symbol="x", size=12, color="black"),
+            name="Your selection",
+            hoverinfo="skip"
+        ))
+    
+    fig.update_layout(
+        title="Goal Feasibility (green: safe)",
+        xaxis=dict(title="Time Frame (weeks)"),
+        yaxis=dict(title="Goal Weight (kg)"),
+        showlegend=False,
+        height=450,
+        margin=dict(l=10, r=10, t=40, b=10)
+    )
+    
+    return fig
@@ -1,3 +1,10 @@
 from .calculators import FitnessCalculator
-from .logger import setup_logging
-from .validators import InputValidator
\ No newline at end of file
+from .profile import DerivedProfile, FrozenPreferences, derive_profile, profile_for_preferences
+from .logger import (setup_logging, request_context, stage_context, with_request_context, submit_in_context,
+                     get_request_id, get_stage)
+from .metrics import registry as metrics_registry, start_metrics_server
+from .profiling import plan_profiler
+from .tracing import span, traced, enable_tracing, tracing_enabled, export_chrome_trace
+from .validators import InputValidator, BulkValidator
+from .simulation import simulate_weight_trajectories
+from .feasibility import assess_feasibility, describe_flags, suggest_corrections, FEASIBILITY_REASONS, FEASIBILITY_CODES
\ No newline at end of file
@@ -1,20 +1,61 @@
 import logging
+import numpy as np
+import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Activity level multipliers applied to BMR, keyed by lowercase activity level
+ACTIVITY_MULTIPLIERS = {
+    'sedentary': 1.2,
+    'lightly active': 1.375,
+    'moderately active': 1.55,
+    'very active': 1.725,
+    'extra active': 1.9
+}
+
+def round_like_builtin(values, decimals=2):
+    """
+    Round an array the way the built-in round() rounds a float.
+
+    round() rounds the exact binary value half to even. Scaling in extended
+    precision keeps the scaled value exact, so ties and near-ties resolve the
+    same way; np.round scales in float64 and can differ in the last digit.
+
+    Args:
+        values (array-like): Values to round
+        decimals (int): Decimal places
+
+    Returns:
+        ndarray: Rounded float64 values
+    """
+    scale = 10 ** decimals
+    scaled = np.asarray(values, dtype=np.longdouble) * scale
+    return np.rint(scaled).astype(float) / scale
+
+def map_distinct(values, func):
+    """
+    Apply a scalar function once per distinct value of an array.
+
+    Args:
+        values (array-like or scalar): Values such as gender or activity level labels
+        func (callable): Scalar function
+
+    Returns:
+        ndarray: func applied to every value, in the input shape
+    """
+    flat = np.asarray(values, dtype=object).ravel()
+    # Missing values get a code of their own instead of the -1 sentinel
+    codes, uniques = pd.factorize(flat, use_na_sentinel=False)
+    results = np.array([func(value) for value in uniques])
+    return results[codes].reshape(np.shape(values))
+
 class FitnessCalculator:
     """Handles all fitness-related calculations."""
     
     def __init__(self):
         """Initialize the fitness calculator with standard reference values."""
         # Activity level multipliers
-        self.activity_multipliers = {
-            'sedentary': 1.2,
-            'lightly active': 1.375,
-            'moderately active': 1.55,
-            'very active': 1.725,
-            'extra active': 1.9
-        }
+        self.activity_multipliers = dict(ACTIVITY_MULTIPLIERS)
         
         # BMI category thresholds
         self.bmi_categories = {
@@ -131,6 +172,31 @@ class FitnessCalculator:
         tdee = bmr * multiplier
         return round(tdee, 2)
     
+    def calculate_macro_targets(self, daily_calories, activity_level):
+        """
+        Calculate macronutrient targets for a daily calorie intake.
+        
+        Args:
+            daily_calories (float): Total daily calorie target
+            activity_level (str): Activity level descriptor
+            
+        Returns:
+            dict: Macronutrient targets in grams (1 decimal) and percentages
+        """
+        if self.get_activity_multiplier(activity_level) <= 1.55:  # Low to moderate activity
+            protein_pct, carbs_pct, fat_pct = 0.30, 0.45, 0.25
+        else:  # High activity
+            protein_pct, carbs_pct, fat_pct = 0.30, 0.50, 0.20
+            
+        return {
+            "protein": round((daily_calories * protein_pct) / 4, 1),  # 4 cal/g
+            "carbs": round((daily_calories * carbs_pct) / 4, 1),      # 4 cal/g
+            "fat": round((daily_calories * fat_pct) / 9, 1),          # 9 cal/g
+            "protein_pct": round(protein_pct * 100),
+            "carbs_pct": round(carbs_pct * 100),
+            "fat_pct": round(fat_pct * 100)
+        }
+    
     def calculate_weight_loss_calories(self, current_weight, goal_weight, timeframe_weeks):
         """
         Calculate the calories needed to reach a weight loss goal.
@@ -180,4 +246,169 @@ class FitnessCalculator:
             float: Total calories burned
         """
         total_calories = calories_per_kg * weight_kg
-        return round(total_calories, 2)
\ No newline at end of file
+        return round(total_calories, 2)
+
+    # Batch versions of the calculations above for cohort analytics. They
+    # take NumPy arrays, lists or DataFrame columns, validate all rows at
+    # once and round like the scalar methods.
+
+    def calculate_bmi_batch(self, weight_kg, height_cm):
+        """
+        Calculate BMI for many people at once.
+
+        Args:
+            weight_kg (array-like): Weights in kilograms
+            height_cm (array-like): Heights in centimeters
+
+        Returns:
+            ndarray: BMI values rounded to 2 decimal places
+        """
+        weight_kg = np.asarray(weight_kg, dtype=float)
+        height_cm = np.asarray(height_cm, dtype=float)
+
+        invalid = ~(height_cm > 0)
+        if invalid.any():
+            logger.error(f"Invalid height in {int(invalid.sum())} rows")
+            raise ValueError("Height must be greater than 0")
+
+        invalid = ~(weight_kg > 0)
+        if invalid.any():
+            logger.error(f"Invalid weight in {int(invalid.sum())} rows")
+            raise ValueError("Weight must be greater than 0")
+
+        height_m = height_cm / 100
+        return round_like_builtin(weight_kg / (height_m ** 2), 2)
+
+    def get_bmi_category_batch(self, bmi):
+        """
+        Determine BMI categories for many BMI values.
+
+        Args:
+            bmi (array-like): BMI values
+
+        Returns:
+            ndarray: BMI category names
+        """
+        bounds = sorted(self.bmi_categories)
+        edges = np.array([upper for _, upper in bounds[:-1]])
+        names = np.array([self.bmi_categories[bound] for bound in bounds], dtype=object)
+        return names[np.searchsorted(edges, np.asarray(bmi, dtype=float), side="right")]
+
+    def calculate_bmr_batch(self, weight_kg, height_cm, age, gender):
+        """
+        Calculate BMR with the Harris-Benedict formula for many people at once.
+
+        Args:
+            weight_kg (array-like): Weights in kilograms
+            height_cm (array-like): Heights in centimeters
+            age (array-like): Ages in years
+            gender (array-like or str): 'male' or 'female' per row, or one value for all
+
+        Returns:
+            ndarray: BMR values rounded to 2 decimal places
+        """
+        weight_kg = np.asarray(weight_kg, dtype=float)
+        height_cm = np.asarray(height_cm, dtype=float)
+        age = np.asarray(age, dtype=float)
+        gender = map_distinct(gender, lambda value: str(value).lower())
+
+        is_male = gender == 'male'
+        invalid = ~is_male & (gender != 'female')
+        if invalid.any():
+            logger.error(f"Invalid gender in {int(invalid.sum())} rows: {sorted(set(np.atleast_1d(gender[invalid])))}")
+            raise ValueError("Gender must be 'male' or 'female'")
+
+        bmr = np.where(
+            is_male,
+            88.362 + (13.397 * weight_kg) + (4.799 * height_cm) - (5.677 * age),
+            447.593 + (9.247 * weight_kg) + (3.098 * height_cm) - (4.330 * age)
+        )
+        return round_like_builtin(bmr, 2)
+
+    def get_activity_multiplier_batch(self, activity_level):
+        """
+        Get the activity multipliers for many activity levels.
+
+        Each distinct level is resolved once with the scalar lookup, so
+        partial matching and the sedentary default behave the same.
+
+        Args:
+            activity_level (array-like or str): Activity level descriptors
+
+        Returns:
+            ndarray: Activity multipliers
+        """
+        return map_distinct(activity_level, lambda level: self.get_activity_multiplier(str(level))).astype(float)
+
+    def calculate_tdee_batch(self, bmr, activity_level):
+        """
+        Calculate TDEE for many people at once.
+
+        Args:
+            bmr (array-like): Basal Metabolic Rates
+            activity_level (array-like or str): Activity level descriptors
+
+        Returns:
+            ndarray: TDEE values rounded to 2 decimal places
+        """
+        return round_like_builtin(np.asarray(bmr, dtype=float) * self.get_activity_multiplier_batch(activity_level), 2)
+
+    def calculate_weight_loss_calories_batch(self, current_weight, goal_weight, timeframe_weeks):
+        """
+        Calculate the calories needed to reach many weight loss goals.
+
+        Args:
+            current_weight (array-like): Current weights in kg
+            goal_weight (array-like): Target weights in kg
+            timeframe_weeks (array-like): Weeks to achieve each goal
+
+        Returns:
+            dict: Calorie deficit arrays under the same keys as the scalar method
+        """
+        current_weight = np.asarray(current_weight, dtype=float)
+        goal_weight = np.asarray(goal_weight, dtype=float)
+        days = np.asarray(timeframe_weeks, dtype=float) * 7
+
+        no_loss = current_weight <= goal_weight
+        if no_loss.any():
+            logger.warning(f"Goal weight is not less than current weight in {int(no_loss.sum())} rows")
+        weight_to_lose = np.where(no_loss, 0.0, current_weight - goal_weight)
+
+        total_calorie_deficit = weight_to_lose * self.calories_per_kg_fat
+        daily_deficit = np.divide(
+            total_calorie_deficit, days,
+            out=np.zeros(np.broadcast(total_calorie_deficit, days).shape), where=days > 0
+        )
+
+        return {
+            "total_calories_to_burn": round_like_builtin(total_calorie_deficit, 2),
+            "daily_calorie_deficit": round_like_builtin(daily_deficit, 2),
+            "exercise_portion_calories": round_like_builtin(daily_deficit * 0.25, 2),
+            "diet_portion_calories": round_like_builtin(daily_deficit * 0.75, 2)
+        }
+
+    def calculate_cohort_metrics(self, profiles):
+        """
+        Calculate BMI, BMR, TDEE and deficits for a table of profiles.
+
+        Args:
+            profiles (DataFrame): Columns weight, height_cm, age, gender and
+                activity_level, plus goal_weight and time_frame for the deficits
+
+        Returns:
+            DataFrame: One row per profile, indexed like the input
+        """
+        metrics = pd.DataFrame(index=profiles.index)
+        metrics["bmi"] = self.calculate_bmi_batch(profiles["weight"], profiles["height_cm"])
+        metrics["bmi_category"] = self.get_bmi_category_batch(metrics["bmi"])
+        metrics["bmr"] = self.calculate_bmr_batch(
+            profiles["weight"], profiles["height_cm"], profiles["age"], profiles["gender"]
+        )
+        metrics["tdee"] = self.calculate_tdee_batch(metrics["bmr"], profiles["activity_level"])
+        if "goal_weight" in profiles and "time_frame" in profiles:
+            deficits = self.calculate_weight_loss_calories_batch(
+                profiles["weight"], profiles["goal_weight"], profiles["time_frame"]
+            )
+            for key, values in deficits.items():
+                metrics[key] = values
+        return metrics
@@ -0,0 +1,165 @@
+"""
+Local feasibility checks for weight loss goals.
+Flags goals that are too fast or need an unsafe deficit, using only the
+calculator formulas, so unworkable requests are caught without an API call.
+Every check works on arrays, so whole grids of goals are assessed at once.
+"""
+import logging
+import numpy as np
+from utils.calculators import FitnessCalculator
+
+logger = logging.getLogger(__name__)
+
+# Safety limits, matching the validator and the prompt guidelines
+MAX_WEEKLY_LOSS_KG = 1.0
+MAX_EXERCISE_PORTION_CALORIES = 300
+MAX_DIET_DEFICIT_CALORIES = 800
+
+# Intake must stay above this share of BMR and above the absolute minimum
+INTAKE_FLOOR_BMR_FRACTION = 0.8
+MIN_DAILY_INTAKE = {"male": 1500, "female": 1200}
+
+# Bit flags for the failed checks
+NO_LOSS = 1
+RATE_TOO_FAST = 2
+EXERCISE_TOO_HIGH = 4
+DIET_DEFICIT_TOO_HIGH = 8
+INTAKE_BELOW_FLOOR = 16
+
+FEASIBILITY_REASONS = {
+    NO_LOSS: "Goal weight is not below current weight",
+    RATE_TOO_FAST: f"Weight loss is faster than {MAX_WEEKLY_LOSS_KG:g} kg per week",
+    EXERCISE_TOO_HIGH: f"Exercise portion exceeds {MAX_EXERCISE_PORTION_CALORIES} calories per day",
+    DIET_DEFICIT_TOO_HIGH: f"Diet deficit exceeds {MAX_DIET_DEFICIT_CALORIES} calories per day",
+    INTAKE_BELOW_FLOOR: "Daily intake falls below the safe minimum for your BMR",
+}
+
+# Short codes for the failed checks, used in structured responses
+FEASIBILITY_CODES = {
+    NO_LOSS: "no_loss",
+    RATE_TOO_FAST: "rate_too_fast",
+    EXERCISE_TOO_HIGH: "exercise_too_high",
+    DIET_DEFICIT_TOO_HIGH: "diet_deficit_too_high",
+    INTAKE_BELOW_FLOOR: "intake_below_floor",
+}
+
+# Search space for suggested corrections
+MAX_SUGGESTED_WEEKS = 52
+GOAL_WEIGHT_STEP_KG = 0.5
+
+_calculator = FitnessCalculator()
+
+def assess_feasibility(weight, height_cm, age, gender, activity_level, goal_weight, weeks, calculator=None):
+    """
+    Assess weight loss goals for one person.
+
+    goal_weight and weeks broadcast against each other, so passing a column
+    of goal weights and a row of durations assesses the whole grid.
+
+    Args:
+        weight (float): Current weight in kg
+        height_cm (float): Height in centimeters
+        age (int): Age in years
+        gender (str): 'male' or 'female'
+        activity_level (str): Activity level descriptor
+        goal_weight (array-like): Goal weights in kg
+        weeks (array-like): Durations in weeks
+        calculator (FitnessCalculator, optional): Calculator supplying the formulas
+
+    Returns:
+        dict: Arrays of weekly_loss, daily_calorie_deficit, exercise_portion_calories,
+            diet_portion_calories, target_daily_intake and the per-cell failure
+            "flags" (0 when feasible), plus the scalar "calorie_floor"
+    """
+    calculator = calculator or _calculator
+    goal_weight, weeks = np.broadcast_arrays(np.asarray(goal_weight, dtype=float), np.asarray(weeks, dtype=float))
+
+    bmr = calculator.calculate_bmr(weight, height_cm, age, gender)
+    tdee = calculator.calculate_tdee(bmr, activity_level)
+    calorie_floor = max(bmr * INTAKE_FLOOR_BMR_FRACTION, MIN_DAILY_INTAKE[gender.lower()])
+
+    calories = calculator.calculate_weight_loss_calories_batch(np.full(goal_weight.shape, weight), goal_weight, weeks)
+    weekly_loss = np.divide(weight - goal_weight, weeks, out=np.zeros(goal_weight.shape), where=weeks > 0)
+    target_daily_intake = tdee - calories["diet_portion_calories"]
+
+    flags = np.zeros(goal_weight.shape, dtype=np.int64)
+    flags |= np.where(goal_weight >= weight, NO_LOSS, 0)
+    flags |= np.where(weekly_loss > MAX_WEEKLY_LOSS_KG, RATE_TOO_FAST, 0)
+    flags |= np.where(calories["exercise_portion_calories"] > MAX_EXERCISE_PORTION_CALORIES, EXERCISE_TOO_HIGH, 0)
+    flags |= np.where(calories["diet_portion_calories"] > MAX_DIET_DEFICIT_CALORIES, DIET_DEFICIT_TOO_HIGH, 0)
+    flags |= np.where(target_daily_intake < calorie_floor, INTAKE_BELOW_FLOOR, 0)
+
+    return {
+        "weekly_loss": weekly_loss,
+        "daily_calorie_deficit": calories["daily_calorie_deficit"],
+        "exercise_portion_calories": calories["exercise_portion_calories"],
+        "diet_portion_calories": calories["diet_portion_calories"],
+        "target_daily_intake": target_daily_intake,
+        "calorie_floor": calorie_floor,
+        "flags": flags,
+    }
+
+def describe_flags(flags):
+    """
+    Turn failure flags into messages.
+
+    Args:
+        flags (int): Bit flags from assess_feasibility
+
+    Returns:
+        list: Message for every failed check
+    """
+    return [message for bit, message in FEASIBILITY_REASONS.items() if int(flags) & bit]
+
+def suggest_corrections(weight, height_cm, age, gender, activity_level, goal_weight, weeks,
+                        ignore=NO_LOSS, calculator=None):
+    """
+    Suggest the smallest changes that make a goal feasible.
+
+    Each search is a single vectorized sweep: the shortest time frame that
+    works for the goal weight, and the lowest goal weight that works in the
+    time frame.
+
+    Args:
+        weight (float): Current weight in kg
+        height_cm (float): Height in centimeters
+        age (int): Age in years
+        gender (str): 'male' or 'female'
+        activity_level (str): Activity level descriptor
+        goal_weight (float): Requested goal weight in kg
+        weeks (int): Requested time frame in weeks
+        ignore (int): Flags that do not count as failures
+        calculator (FitnessCalculator, optional): Calculator supplying the formulas
+
+    Returns:
+        list: Suggestions as {"field", "value", "message"} dicts
+    """
+    suggestions = []
+    if goal_weight >= weight:
+        return suggestions
+
+    candidate_weeks = np.arange(1, MAX_SUGGESTED_WEEKS + 1)
+    by_weeks = assess_feasibility(weight, height_cm, age, gender, activity_level, goal_weight,
+                                  candidate_weeks, calculator)
+    feasible_weeks = candidate_weeks[(by_weeks["flags"] & ~ignore) == 0]
+    feasible_weeks = feasible_weeks[feasible_weeks > weeks]
+    if feasible_weeks.size:
+        suggestions.append({
+            "field": "time_frame",
+            "value": int(feasible_weeks[0]),
+            "message": f"Allow {int(feasible_weeks[0])} weeks to reach {goal_weight:g} kg",
+        })
+
+    candidate_goals = np.arange(weight - GOAL_WEIGHT_STEP_KG, goal_weight, -GOAL_WEIGHT_STEP_KG)
+    if candidate_goals.size:
+        by_goal = assess_feasibility(weight, height_cm, age, gender, activity_level, candidate_goals,
+                                     weeks, calculator)
+        feasible = candidate_goals[(by_goal["flags"] & ~ignore) == 0]
+        if feasible.size:
+            # Candidates run from the current weight down, so the last feasible one loses the most
+            suggestions.append({
+                "field": "goal_weight",
+                "value": float(feasible[-1]),
+                "message": f"Aim for {feasible[-1]:g} kg in {int(weeks)} weeks",
+            })
+    return suggestions
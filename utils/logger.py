@@ -1,52 +1,262 @@
+import atexit
+import contextvars
+import functools
+import json
 import logging
 import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
-def setup_logging(log_dir='logs', level=logging.INFO):
+LOG_FILE_NAME = "workout_companion.log"
+
+# Defaults for rotation and retention
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_ROTATE_HOURS = 24
+DEFAULT_BACKUP_COUNT = 10
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+
+# Structured fields passed with extra={...} that are copied into JSON logs
+STRUCTURED_FIELDS = (
+    "attempt", "latency_ms", "input_tokens", "output_tokens", "cache_hit",
+    "status_code", "cost_usd", "model",
+)
+
+# Correlation id of the plan being generated and the stage that is running
+request_id_var = contextvars.ContextVar("request_id", default=None)
+stage_var = contextvars.ContextVar("stage", default=None)
+
+_listener = None
+_setup_lock = threading.Lock()
+
+def new_request_id():
+    """Create a short random request id."""
+    return uuid.uuid4().hex[:12]
+
+def get_request_id():
+    """Return the request id of the current context, or None outside a request."""
+    return request_id_var.get()
+
+def get_stage():
+    """Return the plan stage running in the current context, or None."""
+    return stage_var.get()
+
+@contextmanager
+def request_context(request_id=None):
+    """
+    Tag every log record in the block with a request id.
+
+    An enclosing request keeps its id, so nested calls log under one id.
+
+    Args:
+        request_id (str, optional): Id to use instead of a new one
+
+    Yields:
+        str: The request id in effect
+    """
+    current = request_id_var.get()
+    if current is not None and request_id is None:
+        yield current
+        return
+    token = request_id_var.set(request_id or new_request_id())
+    try:
+        yield request_id_var.get()
+    finally:
+        request_id_var.reset(token)
+
+@contextmanager
+def stage_context(stage):
+    """
+    Tag every log record in the block with a stage name.
+
+    Args:
+        stage (str): Stage name
+    """
+    token = stage_var.set(stage)
+    try:
+        yield
+    finally:
+        stage_var.reset(token)
+
+def with_request_context(func):
+    """Decorator running the function inside request_context()."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with request_context():
+            return func(*args, **kwargs)
+    return wrapper
+
+def submit_in_context(executor, func, *args, **kwargs):
+    """
+    Submit work to an executor so it runs with the caller's request id and stage.
+
+    Args:
+        executor (Executor): Pool to run on
+        func (callable): Function to call
+        *args, **kwargs: Arguments for the function
+
+    Returns:
+        Future: Future of the call
+    """
+    return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+class ContextFilter(logging.Filter):
     """
-    Configure application logging.
-    
+    Stamps records with the request id and stage of the logging thread and
+    samples debug records.
+
+    Debug records are kept for a fixed share of requests, decided by the
+    request id, so a sampled request keeps all of its debug lines.
+    """
+
+    def __init__(self, debug_sample_rate=1.0):
+        """
+        Initialize the filter.
+
+        Args:
+            debug_sample_rate (float): Share of requests whose debug records are kept, 0-1
+        """
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record):
+        record.request_id = request_id_var.get() or "-"
+        if not hasattr(record, "stage"):
+            record.stage = stage_var.get()
+        if record.levelno <= logging.DEBUG and self.debug_sample_rate < 1.0:
+            if record.request_id == "-":
+                return random.random() < self.debug_sample_rate
+            return int(record.request_id[:8], 16) / 0xFFFFFFFF < self.debug_sample_rate
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "stage": getattr(record, "stage", None),
+            "thread": record.threadName,
+        }
+        for field in STRUCTURED_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SizedTimedRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotating file handler that rolls over when the file reaches a size or
+    age limit, whichever comes first, and keeps a fixed number of backups.
+    """
+
+    def __init__(self, filename, max_bytes=DEFAULT_MAX_BYTES, rotate_hours=DEFAULT_ROTATE_HOURS,
+                 backup_count=DEFAULT_BACKUP_COUNT, encoding='utf-8'):
+        """
+        Open the log file.
+
+        Args:
+            filename (str): Log file path
+            max_bytes (int): Size at which the file is rotated, 0 for no limit
+            rotate_hours (float): Age at which the file is rotated, 0 for no limit
+            backup_count (int): Rotated files kept; older ones are deleted
+            encoding (str): File encoding
+        """
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.interval = rotate_hours * 3600
+        self.rollover_at = self._next_rollover(self._opened_at())
+
+    def _opened_at(self):
+        # An existing file keeps its age across restarts
+        try:
+            return os.stat(self.baseFilename).st_mtime if os.path.getsize(self.baseFilename) else time.time()
+        except OSError:
+            return time.time()
+
+    def _next_rollover(self, start):
+        return start + self.interval if self.interval > 0 else float("inf")
+
+    def shouldRollover(self, record):
+        if time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover(time.time())
+
+def setup_logging(log_dir='logs', level=logging.INFO, console=True, max_bytes=DEFAULT_MAX_BYTES,
+                  rotate_hours=DEFAULT_ROTATE_HOURS, backup_count=DEFAULT_BACKUP_COUNT,
+                  json_format=False, debug_sample_rate=1.0):
+    """
+    Configure application logging once per process.
+
+    Log calls only put the record on a queue; a background listener thread
+    writes it to the rotating log file and the console. Later calls, such as
+    Streamlit reruns, return the root logger without touching the handlers.
+
     Args:
         log_dir (str): Directory to store log files
-        level (int): Logging level
-        
+        level (int or str): Logging level
+        console (bool): Whether to also log to the console
+        max_bytes (int): Size at which the log file is rotated, 0 for no limit
+        rotate_hours (float): Age at which the log file is rotated, 0 for no limit
+        backup_count (int): Rotated log files kept
+        json_format (bool): Write the log file as JSON lines instead of text
+        debug_sample_rate (float): Share of requests whose debug records are kept
+
     Returns:
         logger: Configured logger instance
     """
-    # Create logs directory if it doesn't exist
-    log_path = Path(log_dir)
-    log_path.mkdir(exist_ok=True, parents=True)
-    
-    # Create a unique log filename based on timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = log_path / f"workout_companion_{timestamp}.log"
-    
-    # Configure the root logger
+    global _listener
     logger = logging.getLogger()
-    logger.setLevel(level)
-    
-    # Remove existing handlers to avoid duplicate logs
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Create file handler
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(level)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(level)
-    
-    # Create formatter and add it to the handlers
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
-    
-    # Add the handlers to the logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+    with _setup_lock:
+        if _listener is not None:
+            return logger
+
+        # Create logs directory if it doesn't exist
+        log_path = Path(log_dir)
+        log_path.mkdir(exist_ok=True, parents=True)
+        log_file = log_path / LOG_FILE_NAME
+
+        logger.setLevel(level)
+
+        # Remove existing handlers to avoid duplicate logs
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+
+        formatter = logging.Formatter(TEXT_FORMAT)
+        file_handler = SizedTimedRotatingFileHandler(log_file, max_bytes, rotate_hours, backup_count)
+        file_handler.setLevel(level)
+        file_handler.setFormatter(JsonFormatter() if json_format else formatter)
+        handlers = [file_handler]
+
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(level)
+            console_handler.setFormatter(formatter)
+            handlers.append(console_handler)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        # The context is read here, on the thread that logs, not on the listener
+        queue_handler.addFilter(ContextFilter(debug_sample_rate))
+        logger.addHandler(queue_handler)
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # Drain the queue on exit so the last records are written
+        atexit.register(_listener.stop)
+
     logger.info(f"Logging initialized. Log file: {log_file}")
-    
-    return logger
\ No newline at end of file
+
+    return logger
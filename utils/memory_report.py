@@ -0,0 +1,27 @@
+"""
+Diff the top allocators between two saved tracemalloc snapshots.
+
+Usage:
+    python -m utils.memory_report before.snapshot after.snapshot [--top 20]
+"""
+import argparse
+import sys
+import tracemalloc
+from utils.profiling import DEFAULT_TOP, diff_snapshots
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m utils.memory_report",
+                                     description="Diff the top allocators between two tracemalloc snapshots.")
+    parser.add_argument("before", help="Earlier snapshot file")
+    parser.add_argument("after", help="Later snapshot file")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Allocation sites listed")
+    parser.add_argument("--key", choices=["lineno", "filename", "traceback"], default="lineno",
+                        help="Group allocations by line, file or traceback")
+    args = parser.parse_args(argv)
+    before = tracemalloc.Snapshot.load(args.before)
+    after = tracemalloc.Snapshot.load(args.after)
+    sys.stdout.write(diff_snapshots(before, after, args.top, args.key))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
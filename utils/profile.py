@@ -0,0 +1,161 @@
+"""
+Derived user profile shared by the workout, nutrition and UI code.
+BMI, BMR, TDEE, the calorie split and macro targets are computed once per
+distinct input and memoized, so every consumer sees the same numbers.
+"""
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from utils.calculators import FitnessCalculator
+
+logger = logging.getLogger(__name__)
+
+# Distinct profiles kept in memory
+PROFILE_CACHE_SIZE = 256
+
+_calculator = FitnessCalculator()
+
+@dataclass(frozen=True)
+class DerivedProfile:
+    """Immutable body metrics and calorie targets for one set of inputs."""
+
+    height_cm: float
+    weight: float
+    goal_weight: float
+    duration_weeks: int
+    age: int
+    gender: str
+    activity_level: str
+    bmi: float
+    bmi_category: str
+    bmr: float
+    tdee: float
+    total_calories_to_burn: float
+    daily_calorie_deficit: float
+    exercise_portion_calories: float
+    diet_portion_calories: float
+    target_daily_intake: float
+    protein_target: float
+    carbs_target: float
+    fat_target: float
+    protein_pct: int
+    carbs_pct: int
+    fat_pct: int
+
+    @property
+    def macro_targets(self):
+        """Macro targets in the shape used by the nutrition prompts."""
+        return {
+            "protein": self.protein_target,
+            "carbs": self.carbs_target,
+            "fat": self.fat_target,
+            "protein_pct": self.protein_pct,
+            "carbs_pct": self.carbs_pct,
+            "fat_pct": self.fat_pct,
+        }
+
+class FrozenPreferences(dict):
+    """
+    Read-only user preferences handed to parallel plan stages.
+
+    Still a dict, so it serializes and indexes like one, but any attempt to
+    modify it raises TypeError. Stages add their own values with with_updates,
+    which returns a new snapshot and leaves the shared one untouched.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("User preferences are read-only; use with_updates() for stage-specific values")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def with_updates(self, **changes):
+        """
+        Create a new snapshot with some values added or replaced.
+
+        Args:
+            **changes: Values to add or replace
+
+        Returns:
+            FrozenPreferences: New snapshot
+        """
+        return FrozenPreferences({**self, **changes})
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (FrozenPreferences, (dict(self),))
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def derive_profile(height_cm, weight, goal_weight, duration_weeks, age, gender, activity_level):
+    """
+    Compute the derived profile for a set of user inputs.
+
+    Args:
+        height_cm (float): Height in centimeters
+        weight (float): Current weight in kilograms
+        goal_weight (float): Target weight in kilograms
+        duration_weeks (int): Target timeframe in weeks
+        age (int): Age in years
+        gender (str): 'male' or 'female'
+        activity_level (str): Activity level descriptor
+
+    Returns:
+        DerivedProfile: Frozen profile, shared between callers with the same inputs
+    """
+    bmi = _calculator.calculate_bmi(weight, height_cm)
+    calorie_data = _calculator.calculate_weight_loss_calories(weight, goal_weight, duration_weeks)
+    bmr = _calculator.calculate_bmr(weight, height_cm, age, gender)
+    tdee = _calculator.calculate_tdee(bmr, activity_level)
+    target_daily_intake = round(tdee - calorie_data["diet_portion_calories"], 2)
+    macros = _calculator.calculate_macro_targets(target_daily_intake, activity_level)
+
+    logger.info(f"Derived profile for BMI {bmi}, TDEE {tdee}")
+    return DerivedProfile(
+        height_cm=height_cm,
+        weight=weight,
+        goal_weight=goal_weight,
+        duration_weeks=duration_weeks,
+        age=age,
+        gender=gender,
+        activity_level=activity_level,
+        bmi=bmi,
+        bmi_category=_calculator.get_bmi_category(bmi),
+        bmr=bmr,
+        tdee=tdee,
+        total_calories_to_burn=calorie_data["total_calories_to_burn"],
+        daily_calorie_deficit=calorie_data["daily_calorie_deficit"],
+        exercise_portion_calories=calorie_data["exercise_portion_calories"],
+        diet_portion_calories=calorie_data["diet_portion_calories"],
+        target_daily_intake=target_daily_intake,
+        protein_target=macros["protein"],
+        carbs_target=macros["carbs"],
+        fat_target=macros["fat"],
+        protein_pct=macros["protein_pct"],
+        carbs_pct=macros["carbs_pct"],
+        fat_pct=macros["fat_pct"],
+    )
+
+def profile_for_preferences(user_preferences):
+    """
+    Look up the derived profile behind a user preferences dict.
+
+    Args:
+        user_preferences (dict): Preferences built by WorkoutModel.prepare_user_preferences
+
+    Returns:
+        DerivedProfile: Memoized profile for the same inputs
+    """
+    return derive_profile(
+        user_preferences["height_cm"],
+        user_preferences["weight"],
+        user_preferences["goal_weight"],
+        user_preferences["duration_weeks"],
+        user_preferences["age"],
+        user_preferences["gender"],
+        user_preferences["activity_level"],
+    )
@@ -0,0 +1,240 @@
+"""
+On-demand CPU and memory profiling of plan generations.
+Once armed, the next plan generations are profiled one at a time: a
+sampling thread reads every thread's stack through sys._current_frames and
+tracemalloc snapshots are taken before and after. Results are written to
+the log directory under the request id.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+DEFAULT_TOP = 20
+# Frames stored per allocation; more frames cost more memory while tracing
+TRACEMALLOC_FRAMES = 10
+
+# Innermost frames of threads that are waiting rather than working
+IDLE_FUNCTIONS = {"wait", "_wait_for_tstate_lock", "select", "poll", "accept", "get", "_worker", "serve_forever",
+                  "_monitor"}
+IDLE_MODULES = ("threading.py", "queue.py", "selectors.py", "socket.py", "socketserver.py", "thread.py",
+                "handlers.py")
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _is_idle(frame):
+    code = frame.f_code
+    return code.co_name in IDLE_FUNCTIONS and code.co_filename.endswith(IDLE_MODULES)
+
+class SamplingProfiler:
+    """Samples the stacks of all threads at a fixed interval."""
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        Initialize the profiler.
+
+        Args:
+            interval (float): Seconds between samples
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def top_functions(self, top=DEFAULT_TOP):
+        """
+        Rank functions by samples in which they were running or on the stack.
+
+        Args:
+            top (int): Number of functions listed
+
+        Returns:
+            tuple: (list of (function, self samples), list of (function, total samples))
+        """
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if frames:
+                own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        return own.most_common(top), total.most_common(top)
+
+    def write(self, path_prefix, top=DEFAULT_TOP):
+        """
+        Write the collapsed stacks (for flame graph tools) and a text summary.
+
+        Args:
+            path_prefix (Path): Output path without extension
+
+        Returns:
+            list: Files written
+        """
+        folded = path_prefix.with_suffix(".folded")
+        with open(folded, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        own, total = self.top_functions(top)
+        busy = sum(self.stacks.values())
+        lines = [f"{self.samples} samples every {self.interval * 1000:g}ms, {busy} busy thread samples", "",
+                 "Top functions by self samples:"]
+        lines += [f"{count:8d}  {count / max(busy, 1):6.1%}  {name}" for name, count in own]
+        lines += ["", "Top functions by total samples:"]
+        lines += [f"{count:8d}  {count / max(busy, 1):6.1%}  {name}" for name, count in total]
+        summary = path_prefix.with_suffix(".txt")
+        summary.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return [folded, summary]
+
+def diff_snapshots(before, after, top=DEFAULT_TOP, key_type="lineno"):
+    """
+    Report the allocation sites that grew the most between two snapshots.
+
+    Args:
+        before (Snapshot): Earlier tracemalloc snapshot
+        after (Snapshot): Later tracemalloc snapshot
+        top (int): Number of sites listed
+        key_type (str): "lineno", "filename" or "traceback"
+
+    Returns:
+        str: Text report
+    """
+    stats = after.compare_to(before, key_type)
+    grown = sum(stat.size_diff for stat in stats)
+    lines = [f"Net change: {grown / 1024:+.1f} KiB across {len(stats)} allocation sites", "",
+             f"Top {top} allocation sites by growth:"]
+    for stat in stats[:top]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size_diff / 1024:+10.1f} KiB  {stat.count_diff:+8d} blocks  "
+                     f"{stat.size / 1024:10.1f} KiB now  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines) + "\n"
+
+class PlanProfiler:
+    """Profiles the next N plan generations when armed."""
+
+    def __init__(self):
+        self.remaining = 0
+        self.output_dir = Path("logs")
+        self.interval = DEFAULT_SAMPLE_INTERVAL
+        self.active = False
+        self.last_files = []
+        self._lock = threading.Lock()
+
+    def arm(self, count, output_dir, interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        Profile the next plan generations.
+
+        Args:
+            count (int): Number of generations to profile, 0 to disarm
+            output_dir (str): Directory for the profile files
+            interval (float): Seconds between stack samples
+        """
+        with self._lock:
+            self.remaining = max(int(count), 0)
+            self.output_dir = Path(output_dir)
+            self.interval = interval
+        logger.info(f"Profiling armed for the next {self.remaining} plan generations")
+
+    def status(self):
+        """
+        Report the profiler state.
+
+        Returns:
+            dict: Generations still to profile, whether one is running and the last files written
+        """
+        with self._lock:
+            return {"remaining": self.remaining, "active": self.active,
+                    "last_files": [str(path) for path in self.last_files]}
+
+    def _claim(self):
+        with self._lock:
+            # One generation at a time, since the sampler sees every thread
+            if self.remaining <= 0 or self.active:
+                return False
+            self.remaining -= 1
+            self.active = True
+            return True
+
+    @contextmanager
+    def profile(self, request_id):
+        """
+        Profile the block if armed, otherwise run it untouched.
+
+        Args:
+            request_id (str): Request id used in the file names
+        """
+        if not self._claim():
+            yield
+            return
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        prefix = self.output_dir / f"profile_{request_id or time.strftime('%Y%m%d_%H%M%S')}"
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        before = tracemalloc.take_snapshot()
+        sampler = SamplingProfiler(self.interval)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+            after = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            try:
+                files = sampler.write(prefix)
+                for name, snapshot in (("before", before), ("after", after)):
+                    path = Path(f"{prefix}_{name}.snapshot")
+                    snapshot.dump(str(path))
+                    files.append(path)
+                diff_path = Path(f"{prefix}_memory.txt")
+                diff_path.write_text(diff_snapshots(before, after), encoding="utf-8")
+                files.append(diff_path)
+                logger.info(f"Profiled plan generation in {elapsed:.2f}s: {[str(path) for path in files]}")
+            except OSError as e:
+                files = []
+                logger.error(f"Could not write profile: {e}")
+            with self._lock:
+                self.active = False
+                self.last_files = files
+
+plan_profiler = PlanProfiler()
@@ -0,0 +1,72 @@
+"""
+Day-by-day weight trajectory simulation.
+BMR and TDEE are recomputed from the current weight every day, so the
+deficit shrinks as weight falls instead of staying constant. Many
+scenarios (activity levels, adherence rates) are stepped together.
+"""
+import logging
+import numpy as np
+from utils.calculators import FitnessCalculator
+
+logger = logging.getLogger(__name__)
+
+_calculator = FitnessCalculator()
+
+def simulate_weight_trajectories(weight, height_cm, age, gender, activity_level, daily_intake,
+                                 exercise_calories, days, adherence=1.0, diet_deficit=0.0, calculator=None):
+    """
+    Simulate weight over a plan for many scenarios at once.
+
+    Each day the expenditure is the TDEE at that day's weight plus the
+    planned exercise; intake is the planned intake. With adherence below 1
+    only that share of the exercise is done and the rest of the diet
+    deficit is eaten back. The energy balance changes weight at the
+    calculator's calories per kg.
+
+    Args:
+        weight (float): Starting weight in kg
+        height_cm (float): Height in centimeters
+        age (int): Age in years
+        gender (str): 'male' or 'female'
+        activity_level (array-like or str): Activity level per scenario
+        daily_intake (float): Planned daily calorie intake
+        exercise_calories (float): Planned daily exercise calories
+        days (int): Number of days to simulate
+        adherence (array-like or float): Share of the plan followed per scenario, 0-1
+        diet_deficit (float): Planned daily diet deficit, eaten back when adherence is below 1
+        calculator (FitnessCalculator, optional): Calculator supplying the formulas
+
+    Returns:
+        dict: "day" (days + 1,), "weight" (scenarios, days + 1), "tdee" and
+            "deficit" (scenarios, days), plus the broadcast "activity_level"
+            and "adherence" of each scenario
+    """
+    calculator = calculator or _calculator
+    activity_level, adherence = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(activity_level, dtype=object)),
+        np.atleast_1d(np.asarray(adherence, dtype=float))
+    )
+    multipliers = calculator.get_activity_multiplier_batch(activity_level)
+    scenarios = multipliers.shape[0]
+
+    intake = daily_intake + (1 - adherence) * diet_deficit
+    exercise = exercise_calories * adherence
+
+    weights = np.empty((scenarios, days + 1))
+    tdee = np.empty((scenarios, days))
+    deficit = np.empty((scenarios, days))
+    weights[:, 0] = weight
+    for day in range(days):
+        bmr = calculator.calculate_bmr_batch(weights[:, day], height_cm, age, gender)
+        tdee[:, day] = bmr * multipliers
+        deficit[:, day] = tdee[:, day] + exercise - intake
+        weights[:, day + 1] = weights[:, day] - deficit[:, day] / calculator.calories_per_kg_fat
+
+    return {
+        "day": np.arange(days + 1),
+        "weight": weights,
+        "tdee": tdee,
+        "deficit": deficit,
+        "activity_level": activity_level,
+        "adherence": adherence,
+    }
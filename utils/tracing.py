@@ -0,0 +1,143 @@
+"""
+Lightweight tracing spans for the plan generation and rendering hot paths.
+Spans are recorded as Chrome trace events tagged with the request id and
+can be exported to a JSON file that opens in chrome://tracing or Perfetto.
+When tracing is off, span() and @traced cost one flag check.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from pathlib import Path
+from utils.logger import get_request_id
+
+logger = logging.getLogger(__name__)
+
+# Events kept in memory before the oldest are dropped
+MAX_TRACE_EVENTS = 100_000
+# Trace files kept in the trace directory; older ones are deleted
+MAX_TRACE_FILES = 50
+
+_enabled = False
+_events = deque(maxlen=MAX_TRACE_EVENTS)
+_events_lock = threading.Lock()
+_disabled_span = nullcontext()
+
+def enable_tracing(enabled=True):
+    """
+    Turn span recording on or off for the whole process.
+
+    Args:
+        enabled (bool): Record spans from now on
+    """
+    global _enabled
+    _enabled = enabled
+    logger.info(f"Tracing {'enabled' if enabled else 'disabled'}")
+
+def tracing_enabled():
+    """Return whether spans are being recorded."""
+    return _enabled
+
+class _Span:
+    """Records one complete event when the block exits."""
+
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        args = dict(self.args, request_id=get_request_id())
+        if exc_type is not None:
+            args["error"] = exc_type.__name__
+        _events.append({
+            "name": self.name,
+            "ph": "X",
+            "ts": self.start / 1000,
+            "dur": (end - self.start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+        return False
+
+def span(name, **args):
+    """
+    Time a block of code.
+
+    Args:
+        name (str): Span name shown in the trace viewer
+        **args: Extra values attached to the span
+
+    Returns:
+        context manager: Records the span on exit, or does nothing when tracing is off
+    """
+    if not _enabled:
+        return _disabled_span
+    return _Span(name, args)
+
+def traced(name=None):
+    """
+    Decorator recording a span for every call of the function.
+
+    Args:
+        name (str, optional): Span name, the function's qualified name by default
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def export_chrome_trace(trace_dir, request_id=None):
+    """
+    Write recorded spans to a Chrome trace file and remove them from memory.
+
+    Args:
+        trace_dir (str): Directory for the trace files
+        request_id (str, optional): Only export the spans of this request
+
+    Returns:
+        Path or None: File written, or None when there were no spans
+    """
+    with _events_lock:
+        if request_id is None:
+            selected = list(_events)
+            _events.clear()
+        else:
+            selected, kept = [], []
+            # Drain and refill so spans appended meanwhile are not lost
+            while _events:
+                event = _events.popleft()
+                (selected if event["args"].get("request_id") == request_id else kept).append(event)
+            _events.extendleft(reversed(kept))
+    if not selected:
+        return None
+
+    trace_path = Path(trace_dir)
+    trace_path.mkdir(parents=True, exist_ok=True)
+    suffix = request_id or time.strftime("%Y%m%d_%H%M%S")
+    trace_file = trace_path / f"trace_{suffix}.json"
+    with open(trace_file, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": selected, "displayTimeUnit": "ms"}, f)
+
+    for old_file in sorted(trace_path.glob("trace_*.json"), key=lambda p: p.stat().st_mtime)[:-MAX_TRACE_FILES]:
+        old_file.unlink(missing_ok=True)
+    logger.info(f"Wrote {len(selected)} spans to {trace_file}")
+    return trace_file
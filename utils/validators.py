@@ -1,8 +1,14 @@
 import logging
 import re
+import numpy as np
+import pandas as pd
+from utils.calculators import ACTIVITY_MULTIPLIERS, map_distinct
 
 logger = logging.getLogger(__name__)
 
+# Activity levels as offered in the form; matched case-insensitively
+ACTIVITY_LEVELS = tuple(level.capitalize() for level in ACTIVITY_MULTIPLIERS)
+
 class InputValidator:
     """Validates user inputs to prevent errors in calculations."""
     
@@ -65,6 +71,23 @@ class InputValidator:
             
         return True, None
     
+    @staticmethod
+    def validate_activity_level(value):
+        """
+        Validate an activity level against the known activity multipliers.
+        
+        Args:
+            value (str): Activity level, in any letter case
+            
+        Returns:
+            tuple: (is_valid, error_message)
+        """
+        if not value or not isinstance(value, str):
+            return False, "Activity level cannot be empty"
+        if value.lower() not in ACTIVITY_MULTIPLIERS:
+            return False, f"Activity level must be one of: {', '.join(ACTIVITY_LEVELS)}"
+        return True, None
+    
     @staticmethod
     def validate_user_inputs(inputs):
         """
@@ -127,6 +150,13 @@ class InputValidator:
         if not time_valid:
             errors.append(time_error)
             
+        # Validate activity level
+        activity_valid, activity_error = InputValidator.validate_activity_level(
+            inputs.get("activity_level")
+        )
+        if not activity_valid:
+            errors.append(activity_error)
+            
         # Check weight loss goal feasibility
         if weight_valid and goal_valid and timeframe_valid:
             weight = float(inputs.get("weight"))
@@ -144,4 +174,170 @@ class InputValidator:
                     errors.append(f"Weight loss goal of {weight_diff:.1f}kg in {weeks:.0f} weeks exceeds healthy rate of 1kg per week")
         
         # Return validation result
-        return (len(errors) == 0, errors)
\ No newline at end of file
+        return (len(errors) == 0, errors)
+
+class BulkValidator:
+    """
+    Applies the validate_user_inputs rules to whole columns at once.
+
+    Each row gets a bitmap of failed rules; messages, worded exactly like
+    the single-record validator, are built only for rows that fail. Unlike
+    float(), a NaN value counts as not a number.
+    """
+
+    # (field, label, min, max) in the order validate_user_inputs checks them
+    NUMERIC_RULES = (
+        ("height_cm", "Height", 100, 250),
+        ("weight", "Current weight", 30, 300),
+        ("goal_weight", "Goal weight", 30, 300),
+        ("time_frame", "Time frame", 1, 52),
+        ("age", "Age", 18, 100),
+        ("time_constraint", "Workout time constraint", 15, 120),
+    )
+    GENDER_VALUES = ("Male", "Female")
+    MAX_WEEKLY_LOSS_KG = 1
+
+    # Three bits per numeric rule: not a number, below minimum, above maximum
+    NOT_A_NUMBER, TOO_LOW, TOO_HIGH = 1, 2, 4
+    GENDER_EMPTY = 1 << (3 * len(NUMERIC_RULES))
+    GENDER_NOT_ALLOWED = GENDER_EMPTY << 1
+    GOAL_ABOVE_WEIGHT = GENDER_EMPTY << 2
+    RATE_TOO_FAST = GENDER_EMPTY << 3
+    ACTIVITY_EMPTY = GENDER_EMPTY << 4
+    ACTIVITY_NOT_ALLOWED = GENDER_EMPTY << 5
+
+    @classmethod
+    def _gender_bits(cls, value):
+        if not value or not isinstance(value, str):
+            return cls.GENDER_EMPTY
+        return 0 if value in cls.GENDER_VALUES else cls.GENDER_NOT_ALLOWED
+
+    @classmethod
+    def _activity_bits(cls, value):
+        if not value or not isinstance(value, str):
+            return cls.ACTIVITY_EMPTY
+        return 0 if value.lower() in ACTIVITY_MULTIPLIERS else cls.ACTIVITY_NOT_ALLOWED
+
+    @staticmethod
+    def _labels(frame, field):
+        # Non-string values count as empty, and unhashable ones could not be factorized
+        if field not in frame:
+            return np.full(len(frame), None, dtype=object)
+        values = frame[field].to_numpy(dtype=object)
+        is_text = np.fromiter((isinstance(value, str) for value in values), dtype=bool, count=len(values))
+        return np.where(is_text, values, None)
+
+    @classmethod
+    def _field_index(cls, field):
+        return [rule[0] for rule in cls.NUMERIC_RULES].index(field)
+
+    @classmethod
+    def rule_bit(cls, field, kind):
+        """
+        Get the bit of a numeric rule.
+
+        Args:
+            field (str): Field name from NUMERIC_RULES
+            kind (int): NOT_A_NUMBER, TOO_LOW or TOO_HIGH, or 7 for all three
+
+        Returns:
+            int: Bit in the error bitmap
+        """
+        return kind << (3 * cls._field_index(field))
+
+    @classmethod
+    def validate(cls, frame):
+        """
+        Validate every row of a table of user inputs.
+
+        Args:
+            frame (DataFrame): One row per record, columns named like the form fields
+
+        Returns:
+            tuple: (errors, messages) where errors is a uint32 array with one
+                bitmap per row (0 when valid) and messages maps the index label
+                of each failing row to its list of error messages
+        """
+        rows = len(frame)
+        errors = np.zeros(rows, dtype=np.uint32)
+        values = {}
+
+        for index, (field, _, min_value, max_value) in enumerate(cls.NUMERIC_RULES):
+            column = frame[field] if field in frame else pd.Series([None] * rows, index=frame.index)
+            numbers = pd.to_numeric(column, errors="coerce").to_numpy(dtype=float)
+            not_number = np.isnan(numbers)
+            shift = 3 * index
+            errors |= np.where(not_number, cls.NOT_A_NUMBER << shift, 0).astype(np.uint32)
+            errors |= np.where(~not_number & (numbers < min_value), cls.TOO_LOW << shift, 0).astype(np.uint32)
+            errors |= np.where(~not_number & (numbers > max_value), cls.TOO_HIGH << shift, 0).astype(np.uint32)
+            values[field] = numbers
+
+        errors |= map_distinct(cls._labels(frame, "gender"), cls._gender_bits).astype(np.uint32)
+        errors |= map_distinct(cls._labels(frame, "activity_level"), cls._activity_bits).astype(np.uint32)
+
+        # The goal is only checked when weight, goal and time frame are all valid
+        goal_fields_ok = np.ones(rows, dtype=bool)
+        for field in ("weight", "goal_weight", "time_frame"):
+            goal_fields_ok &= (errors & cls.rule_bit(field, 7)) == 0
+        weight, goal, weeks = values["weight"], values["goal_weight"], values["time_frame"]
+        above = goal_fields_ok & (goal > weight)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            too_fast = goal_fields_ok & ~above & ((weight - goal) / weeks > cls.MAX_WEEKLY_LOSS_KG)
+        errors |= np.where(above, cls.GOAL_ABOVE_WEIGHT, 0).astype(np.uint32)
+        errors |= np.where(too_fast, cls.RATE_TOO_FAST, 0).astype(np.uint32)
+
+        failing = np.flatnonzero(errors)
+        messages = {}
+        # Rows with the same bitmap share messages, except for the loss rate wording
+        shared = {}
+        for row in failing:
+            bitmap = int(errors[row])
+            if bitmap & cls.RATE_TOO_FAST:
+                messages[frame.index[row]] = cls.describe(bitmap, weight[row], goal[row], weeks[row])
+            else:
+                if bitmap not in shared:
+                    shared[bitmap] = cls.describe(bitmap)
+                messages[frame.index[row]] = list(shared[bitmap])
+        if failing.size:
+            logger.info(f"Bulk validation: {failing.size} of {rows} rows failed")
+        return errors, messages
+
+    @classmethod
+    def describe(cls, bitmap, weight=None, goal_weight=None, weeks=None):
+        """
+        Build the error messages for one row's bitmap.
+
+        Args:
+            bitmap (int): Error bitmap of the row
+            weight (float, optional): Current weight, for the loss rate message
+            goal_weight (float, optional): Goal weight, for the loss rate message
+            weeks (float, optional): Time frame, for the loss rate message
+
+        Returns:
+            list: Messages in the order validate_user_inputs reports them
+        """
+        messages = []
+        for index, (field, label, min_value, max_value) in enumerate(cls.NUMERIC_RULES):
+            bits = (bitmap >> (3 * index)) & 7
+            if bits & cls.NOT_A_NUMBER:
+                messages.append(f"{label} must be a valid number")
+            elif bits & cls.TOO_LOW:
+                messages.append(f"{label} must be at least {min_value}")
+            elif bits & cls.TOO_HIGH:
+                messages.append(f"{label} must not exceed {max_value}")
+            if field == "age":
+                # Gender is checked between age and the time constraint
+                if bitmap & cls.GENDER_EMPTY:
+                    messages.append("Gender cannot be empty")
+                elif bitmap & cls.GENDER_NOT_ALLOWED:
+                    messages.append(f"Gender must be one of: {', '.join(cls.GENDER_VALUES)}")
+        if bitmap & cls.ACTIVITY_EMPTY:
+            messages.append("Activity level cannot be empty")
+        elif bitmap & cls.ACTIVITY_NOT_ALLOWED:
+            messages.append(f"Activity level must be one of: {', '.join(ACTIVITY_LEVELS)}")
+        if bitmap & cls.GOAL_ABOVE_WEIGHT:
+            messages.append("Goal weight must be less than current weight for weight loss")
+        elif bitmap & cls.RATE_TOO_FAST:
+            weight_diff = weight - goal_weight
+            messages.append(f"Weight loss goal of {weight_diff:.1f}kg in {weeks:.0f} weeks exceeds healthy rate of 1kg per week")
+        return messages